@@ -0,0 +1,116 @@
+# Shared JWT authentication for all services
+# Verified tokens are cached so a bearer token sent on every request is only
+# HMAC-verified and decoded once per cache lifetime.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from jwt_config import SECRET_KEY, ALGORITHM, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token payloads, keyed by the token's SHA-256
+    digest. Entries expire after ttl_seconds or at the token's own exp claim,
+    whichever comes first. A max_size of 0 disables caching.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, ttl_seconds: int = TOKEN_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, token: str, payload: dict):
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, payload["exp"])
+        if expires_at <= now:
+            return
+
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+token_cache = TokenCache()
+security = HTTPBearer()
+
+
+def decode_jwt_token(token: str) -> dict:
+    """
+    Decode and validate a JWT token, using the verified-token cache.
+    Raises 401 if the token is invalid or expired.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    token_cache.put(token, payload)
+    return payload
+
+
+# Authentication dependency - validates JWT token locally
+# A coroutine, so FastAPI runs it on the event loop instead of in a threadpool thread
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Verify the JWT token locally without calling login service.
+    Returns user info if valid, raises 401 if invalid.
+    """
+    payload = decode_jwt_token(credentials.credentials)
+    return {
+        "user_id": payload.get("user_id"),
+        "username": payload.get("username"),
+        "role": payload.get("role")
+    }
@@ -0,0 +1,196 @@
+"""
+Async handler benchmark: event loop vs threadpool
+Starts the product service with uvicorn twice: once as shipped (async
+handlers and auth dependency, running on the event loop) and once with every
+route re-registered as a plain def endpoint with a sync auth dependency, so
+FastAPI runs each request in its threadpool as the service did before. Holds
+100, 1,000 and 3,000 keep-alive connections open against each, every one
+sending requests back to back (closed loop: 90% GET /products/{id}, 10%
+PATCH /products/{id}/stock), and reports requests/s and latency percentiles.
+
+Usage: python benchmarks/bench_async_handlers.py [seconds per run] [connection counts...]
+"""
+
+import asyncio
+import datetime
+import importlib
+import inspect
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from jwt_config import SECRET_KEY, ALGORITHM
+
+PRODUCTS = 1000
+WRITE_EVERY = 10
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/metrics/auth", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def call(coroutine):
+    """Run a coroutine that never suspends (the product service handlers do not await anything)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def threadpool_app():
+    """The product service app with every endpoint and the auth dependency as a sync function"""
+    from fastapi import FastAPI, Depends
+    from fastapi.routing import APIRoute
+    from fastapi.security import HTTPAuthorizationCredentials
+    import auth
+
+    main = importlib.import_module("product-service.main")
+    app = FastAPI(lifespan=main.lifespan)
+
+    def verify_token(credentials: HTTPAuthorizationCredentials = Depends(auth.security)):
+        return call(auth.verify_token(credentials))
+
+    def sync_endpoint(endpoint):
+        def run(*args, **kwargs):
+            return call(endpoint(*args, **kwargs))
+        # A signature rather than functools.wraps: FastAPI unwraps __wrapped__ to decide if an endpoint is async
+        run.__name__ = endpoint.__name__
+        run.__signature__ = inspect.signature(endpoint)
+        return run
+
+    for route in main.app.routes:
+        if isinstance(route, APIRoute):
+            app.add_api_route(
+                route.path, sync_endpoint(route.endpoint), methods=route.methods, status_code=route.status_code,
+                response_model=route.response_model, response_class=route.response_class
+            )
+    app.dependency_overrides[auth.verify_token] = verify_token
+    return app
+
+
+def start_service(variant: str, port: int) -> subprocess.Popen:
+    if variant == "async":
+        command = ["-m", "uvicorn", "product-service.main:app"]
+    else:
+        command = ["-m", "uvicorn", "--factory", "benchmarks.bench_async_handlers:threadpool_app"]
+    return subprocess.Popen(
+        [sys.executable, *command, "--host", "127.0.0.1", "--port", str(port), "--backlog", "4096",
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, "PRODUCT_SNAPSHOT_FILE": ""}
+    )
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client connection (see bench_order_reservations)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, headers: dict):
+        self.reader = reader
+        self.writer = writer
+        self.headers = f"Host: {host}\r\nContent-Length: 0\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+
+    async def request(self, method: str, path: str) -> int:
+        self.writer.write(f"{method} {path} HTTP/1.1\r\n{self.headers}\r\n".encode())
+        status_line, *header_lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        length = next(
+            int(line.split(":", 1)[1]) for line in header_lines if line.lower().startswith("content-length:")
+        )
+        await self.reader.readexactly(length)
+        return int(status_line.split(" ", 2)[1])
+
+
+async def run_load(url: str, headers: dict, product_ids: list[int], connection_count: int, seconds: float):
+    """Returns (requests/s, latencies, errors) of connection_count connections sending for seconds"""
+    host, port = url.removeprefix("http://").split(":")
+    connections = []
+    for _ in range(connection_count):
+        reader, writer = await asyncio.open_connection(host, int(port))
+        connections.append(Connection(reader, writer, f"{host}:{port}", headers))
+
+    latencies, errors = [], 0
+    stop = time.perf_counter() + seconds
+
+    async def client(connection: Connection, rng: random.Random):
+        nonlocal errors
+        n = 0
+        while time.perf_counter() < stop:
+            product_id = rng.choice(product_ids)
+            n += 1
+            if n % WRITE_EVERY == 0:
+                method, path = "PATCH", f"/products/{product_id}/stock?quantity={rng.choice((-1, 1))}"
+            else:
+                method, path = "GET", f"/products/{product_id}"
+            start = time.perf_counter()
+            status = await connection.request(method, path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(connection, random.Random(n)) for n, connection in enumerate(connections)))
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        connection.writer.close()
+    return len(latencies) / elapsed, latencies, errors
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    connection_counts = [int(arg) for arg in sys.argv[2:]] or [100, 1000, 3000]
+    token = jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin",
+         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"{seconds:g} s per run, 1 in {WRITE_EVERY} requests a stock update")
+    print(f"{'handlers':<10} | {'connections':>11} | {'requests/s':>10} | {'errors':>6} | {'p50 ms':>8} | "
+          f"{'p99 ms':>8}")
+    print("-" * 70)
+    for variant in ("threadpool", "async"):
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        service = start_service(variant, port)
+        try:
+            wait_ready(url)
+            created = httpx.post(f"{url}/products/bulk", headers=headers, timeout=30, json={"products": [
+                {"name": f"Product {i}", "price": 10.0 + i % 100, "stock": 1_000_000, "category": "Bench",
+                 "sku": f"BENCH-{i:05d}"}
+                for i in range(1, PRODUCTS + 1)
+            ]}).json()
+            product_ids = [result["id"] for result in created["results"]]
+            for connection_count in connection_counts:
+                rate, latencies, errors = asyncio.run(run_load(url, headers, product_ids, connection_count, seconds))
+                print(f"{variant:<10} | {connection_count:>11,} | {rate:>10,.0f} | {errors:>6,} | "
+                      f"{percentile(latencies, 0.5):>8.1f} | {percentile(latencies, 0.99):>8.1f}")
+        finally:
+            service.terminate()
+            service.wait()
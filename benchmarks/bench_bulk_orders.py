@@ -0,0 +1,80 @@
+"""
+Bulk order ingestion benchmark
+Compares N single POST /orders calls against one POST /orders/bulk call,
+in-process through the ASGI app (JWT auth and validation included)
+
+Usage: python benchmarks/bench_bulk_orders.py [batch sizes...]
+"""
+
+import importlib
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jwt_config import SECRET_KEY, ALGORITHM
+
+order_service = importlib.import_module("order-service.main")
+# Order ingestion only; stock reservations are measured by bench_order_reservations.py
+order_service.inventory = None
+
+DEFAULT_BATCHES = [1_000, 10_000]
+
+
+def make_client() -> TestClient:
+    token = jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin", "exp": datetime.utcnow() + timedelta(minutes=30)},
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+    client = TestClient(order_service.app)
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+def make_orders(count: int) -> list[dict]:
+    return [
+        {
+            "user_id": i % 500 + 1,
+            "items": [
+                {"product_id": 1, "product_name": "Laptop", "quantity": 1, "price": 999.99},
+                {"product_id": 2, "product_name": "Wireless Mouse", "quantity": 2, "price": 29.99}
+            ],
+            "shipping_address": "123 Main St, City, State 12345"
+        }
+        for i in range(count)
+    ]
+
+
+def bench(client: TestClient, count: int):
+    orders = make_orders(count)
+
+    client.post("/reset-db")
+    start = time.perf_counter()
+    for order in orders:
+        client.post("/orders", json=order)
+    single_s = time.perf_counter() - start
+
+    client.post("/reset-db")
+    start = time.perf_counter()
+    response = client.post("/orders/bulk", json={"orders": orders})
+    bulk_s = time.perf_counter() - start
+    assert response.json()["created"] == count
+
+    print(
+        f"{count:>8,} | {single_s:>9.2f} | {count / single_s:>10,.0f} | "
+        f"{bulk_s:>9.2f} | {count / bulk_s:>10,.0f} | {single_s / bulk_s:>6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    batches = [int(arg) for arg in sys.argv[1:]] or DEFAULT_BATCHES
+    client = make_client()
+    print(f"{'orders':>8} | {'single s':>9} | {'single/s':>10} | {'bulk s':>9} | {'bulk/s':>10} | speedup")
+    print("-" * 70)
+    for count in batches:
+        bench(client, count)
@@ -0,0 +1,65 @@
+"""
+Conditional request benchmark
+Per-request CPU time of polling GET /products (whole catalog) and
+GET /categories with and without a matching If-None-Match, through the
+product service app with TestClient.
+
+Usage: python benchmarks/bench_etags.py [catalog sizes...]
+"""
+
+import datetime
+import importlib
+import os
+import sys
+import time
+
+import jwt
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jwt_config import SECRET_KEY, ALGORITHM
+
+main = importlib.import_module("product-service.main")
+
+DEFAULT_SIZES = [1_000, 10_000]
+CATEGORIES = ["Electronics", "Accessories", "Office", "Audio", "Storage"]
+
+
+def make_catalog(size: int) -> list[dict]:
+    return [
+        {
+            "id": i, "name": f"Product {i}", "description": None, "price": 10.0 + i % 1000,
+            "stock": i % 20, "category": CATEGORIES[i % len(CATEGORIES)], "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def cpu_us(client: TestClient, path: str, headers: dict, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.process_time() - start) / requests * 1e6
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    token = jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin",
+         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    client = TestClient(main.app)
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    print(f"{'products':>9} | {'endpoint':<12} | {'200 us':>9} | {'304 us':>9}")
+    print("-" * 48)
+    for size in sizes:
+        main.products_db.load(make_catalog(size))
+        requests = max(20, 200_000 // size)
+        for path in ("/products", "/categories"):
+            etag = client.get(path).headers["ETag"]
+            assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+            full_us = cpu_us(client, path, {}, requests)
+            cached_us = cpu_us(client, path, {"If-None-Match": etag}, requests)
+            print(f"{size:>9,} | {path:<12} | {full_us:>9,.0f} | {cached_us:>9,.0f}")
@@ -0,0 +1,162 @@
+"""
+Response serialization benchmark
+Per-request CPU time for /products and /orders style list responses of
+1, 100 and 1,000 rows, served three ways from the same store rows:
+1. response_model validation + stdlib JSONResponse (the previous path)
+2. FastJSONResponse with the stdlib encoder
+3. FastJSONResponse with orjson (when installed)
+Requests go through the full ASGI stack with TestClient; auth is left out.
+A second table times only the serialization step, without the ASGI stack.
+
+Usage: python benchmarks/bench_fast_json.py [rows...]
+"""
+
+import importlib
+import os
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fast_json
+from fast_json import FastJSONResponse
+
+product_models = importlib.import_module("product-service.models")
+product_schemas = importlib.import_module("product-service.schemas")
+order_models = importlib.import_module("order-service.models")
+order_schemas = importlib.import_module("order-service.schemas")
+
+DEFAULT_ROWS = [1, 100, 1000]
+MAX_ROWS = max(DEFAULT_ROWS)
+ROUNDS = 3
+
+
+def make_products(count: int) -> list[dict]:
+    return [
+        {
+            "id": i, "name": f"Product {i}", "description": f"Description of product {i}",
+            "price": 10.0 + i / 100, "stock": i % 50, "category": "Electronics", "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def make_orders(count: int) -> list[dict]:
+    return [
+        {
+            "id": i, "user_id": i % 100 + 1,
+            "items": [
+                {"product_id": 1, "product_name": "Laptop", "quantity": 1, "price": 999.99},
+                {"product_id": 2, "product_name": "Wireless Mouse", "quantity": 2, "price": 29.99}
+            ],
+            "total_amount": 1059.97, "status": "pending", "shipping_address": f"{i} Main St, Springfield",
+            "created_at": "2025-01-10T10:00:00.123456", "updated_at": "2025-01-10T10:00:00.123456"
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def build_app() -> FastAPI:
+    products = product_models.ProductStore(make_products(MAX_ROWS))
+    orders = order_models.OrderStore(make_orders(MAX_ROWS))
+    app = FastAPI()
+    Product, Order = product_schemas.Product, order_schemas.Order
+
+    @app.get("/validated/products", response_model=list[Product])
+    def validated_products(limit: int):
+        return products.query(limit=limit)
+
+    @app.get("/fast/products", response_model=list[Product])
+    def fast_products(limit: int):
+        return FastJSONResponse(products.query(limit=limit))
+
+    @app.get("/validated/orders", response_model=list[Order])
+    def validated_orders(limit: int):
+        return [order.to_dict() for order in orders.query(limit=limit)]
+
+    @app.get("/fast/orders", response_model=list[Order])
+    def fast_orders(limit: int):
+        return FastJSONResponse([order.to_dict() for order in orders.query(limit=limit)])
+
+    return app
+
+
+def cpu_us_per_request(client: TestClient, path: str, rows: int) -> float:
+    """Best of ROUNDS runs, to keep scheduler noise out of the small responses"""
+    requests = max(20, 2_000 // rows)
+    url = f"{path}?limit={rows}"
+    body = client.get(url).json()
+    assert len(body) == rows
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        for _ in range(requests):
+            client.get(url)
+        best = min(best, (time.process_time() - start) / requests * 1e6)
+    return best
+
+
+def serialize_us(fn, rows: int) -> float:
+    calls = max(20, 20_000 // rows)
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.process_time()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.process_time() - start) / calls * 1e6)
+    return best
+
+
+def serialization_only(sizes: list[int]):
+    """response_model validation + JSONResponse rendering vs fast_json.dumps, on the same rows"""
+    orjson = fast_json.orjson
+    products = product_models.ProductStore(make_products(MAX_ROWS))
+    orders = order_models.OrderStore(make_orders(MAX_ROWS))
+    sources = {
+        "products": (TypeAdapter(list[product_schemas.Product]), lambda rows: products.query(limit=rows)),
+        "orders": (TypeAdapter(list[order_schemas.Order]),
+                   lambda rows: [order.to_dict() for order in orders.query(limit=rows)]),
+    }
+    for resource, (adapter, fetch) in sources.items():
+        print(f"/{resource}: serialization only, CPU us")
+        print(f"{'rows':>6} | {'response_model':>14} | {'fast (stdlib)':>13} | {'fast (orjson)':>13}")
+        print("-" * 56)
+        for rows in sizes:
+            validated_us = serialize_us(
+                lambda: JSONResponse(adapter.dump_python(adapter.validate_python(fetch(rows)), mode="json")), rows
+            )
+            fast_json.orjson = None
+            stdlib_us = serialize_us(lambda: fast_json.dumps(fetch(rows)), rows)
+            fast_json.orjson = orjson
+            orjson_us = serialize_us(lambda: fast_json.dumps(fetch(rows)), rows) if orjson is not None else float("nan")
+            print(f"{rows:>6} | {validated_us:>14,.0f} | {stdlib_us:>13,.0f} | {orjson_us:>13,.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS
+    orjson = fast_json.orjson
+    client = TestClient(build_app())
+
+    for resource in ("products", "orders"):
+        # Both fast variants must produce the same content as response_model
+        validated = client.get(f"/validated/{resource}?limit=10").json()
+        assert client.get(f"/fast/{resource}?limit=10").json() == validated
+
+        print(f"/{resource}: CPU us per request")
+        print(f"{'rows':>6} | {'response_model':>14} | {'fast (stdlib)':>13} | {'fast (orjson)':>13}")
+        print("-" * 56)
+        for rows in sizes:
+            validated_us = cpu_us_per_request(client, f"/validated/{resource}", rows)
+            fast_json.orjson = None
+            stdlib_us = cpu_us_per_request(client, f"/fast/{resource}", rows)
+            fast_json.orjson = orjson
+            orjson_us = cpu_us_per_request(client, f"/fast/{resource}", rows) if orjson is not None else float("nan")
+            print(f"{rows:>6} | {validated_us:>14,.0f} | {stdlib_us:>13,.0f} | {orjson_us:>13,.0f}")
+        print()
+
+    serialization_only(sizes)
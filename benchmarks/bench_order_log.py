@@ -0,0 +1,105 @@
+"""
+Order write-ahead log benchmark
+1. Write throughput with fsync: single writer vs concurrent writers sharing
+   group commits.
+2. Startup at N orders: from a snapshot, and by replaying the whole log.
+
+Crash recovery and replay correctness are covered by tests/test_order_log.py.
+
+Usage: python benchmarks/bench_order_log.py [orders] [data dir]
+(the data dir defaults to a temporary directory; point it at the disk you
+want to measure)
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+models = importlib.import_module("order-service.models")
+
+OrderStore = models.OrderStore
+
+
+def make_order(n: int) -> dict:
+    return {
+        "user_id": n % 1000 + 1,
+        "items": [
+            {"product_id": n % 50 + 1, "product_name": "Laptop", "quantity": 1, "price": 999.99},
+            {"product_id": n % 7 + 1, "product_name": "Wireless Mouse", "quantity": 2, "price": 29.99}
+        ],
+        "total_amount": 1059.97,
+        "status": "pending",
+        "shipping_address": f"{n} Main St, Springfield",
+        "created_at": "2025-01-01T10:00:00",
+        "updated_at": "2025-01-01T10:00:00"
+    }
+
+
+def write_throughput(base_dir: str, writes: int, threads: int) -> tuple[float, dict]:
+    data_dir = os.path.join(base_dir, f"throughput-{threads}")
+    store = OrderStore()
+    store.open(data_dir, snapshot_every=0)
+    per_thread = writes // threads
+
+    def writer(offset: int):
+        for n in range(per_thread):
+            store.insert(make_order(offset + n))
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(i * per_thread,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    stats = store.log_stats()
+    store.close()
+    shutil.rmtree(data_dir)
+    return per_thread * threads / elapsed, stats
+
+
+def startup(base_dir: str, count: int):
+    data_dir = os.path.join(base_dir, "startup")
+    store = OrderStore()
+    store.open(data_dir, snapshot_every=0)
+    start = time.perf_counter()
+    for first in range(0, count, 1000):
+        store.insert_many([make_order(n) for n in range(first, min(first + 1000, count))])
+    elapsed = time.perf_counter() - start
+    print(f"bulk load {count:,} orders (1000 per commit): {elapsed:.2f} s ({count / elapsed:,.0f} orders/s)")
+    store.close()
+    del store
+
+    start = time.perf_counter()
+    replayed = OrderStore()
+    replayed.open(data_dir, snapshot_every=0)
+    print(f"startup by replaying the log:        {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    replayed.snapshot()
+    print(f"snapshot:                            {time.perf_counter() - start:.2f} s")
+    replayed.close()
+    del replayed
+
+    start = time.perf_counter()
+    restored = OrderStore()
+    restored.open(data_dir, snapshot_every=0)
+    print(f"startup from snapshot:               {time.perf_counter() - start:.2f} s")
+    restored.close()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    base = sys.argv[2] if len(sys.argv) > 2 else None
+    with tempfile.TemporaryDirectory(dir=base) as tmp:
+        print(f"{'writers':>8} {'orders/s':>12} {'records/fsync':>14}")
+        for threads in (1, 8, 32):
+            rate, stats = write_throughput(tmp, 4000, threads)
+            print(f"{threads:>8} {rate:>12,.0f} {stats['records_per_fsync']:>14}")
+
+        startup(tmp, count)
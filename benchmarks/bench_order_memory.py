@@ -0,0 +1,97 @@
+"""
+Order memory benchmark
+Resident memory per order at 100k and 1M orders for:
+1. dict rows: the previous layout, an order dict per row with item dicts
+   and ISO timestamp strings
+2. OrderRecord rows: the slotted records with epoch timestamps
+3. the full OrderStore (records plus id/user/status indexes and summaries)
+and checks them against the performance spec targets (~50 MB per 100k
+orders, ~500 bytes per order). Each layout is measured in its own process
+so RSS numbers do not bleed into each other.
+
+Usage: python benchmarks/bench_order_memory.py [sizes...]
+"""
+
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+SPEC_BYTES_PER_ORDER = 500
+USERS = 50_000
+CATALOG = [("Laptop", 999.99), ("Wireless Mouse", 29.99), ("USB-C Cable", 12.99), ("Monitor", 399.99)]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def order_rows(count: int):
+    """Rows shaped like the ones the service builds; each is a fresh set of objects, as from a request"""
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    for n in range(count):
+        user_id = rng.randint(1, USERS)
+        items = []
+        for _ in range(rng.randint(1, 3)):
+            product_id = rng.randrange(len(CATALOG))
+            name, price = CATALOG[product_id]
+            items.append({
+                "product_id": product_id + 1,
+                "product_name": "".join(name),
+                "quantity": rng.randint(1, 3),
+                "price": float(str(price))
+            })
+        now = (start + timedelta(seconds=n, microseconds=rng.randrange(1_000_000))).isoformat()
+        yield {
+            "user_id": user_id,
+            "items": items,
+            "total_amount": round(sum(item["quantity"] * item["price"] for item in items), 2),
+            "status": "pending",
+            "shipping_address": f"{user_id} Main St, Springfield",
+            "created_at": now,
+            "updated_at": now
+        }
+
+
+def measure(layout: str, count: int, results):
+    models = importlib.import_module("order-service.models")
+    before = rss_mb()
+    if layout == "dict rows":
+        table = {n: {"id": n, **row} for n, row in enumerate(order_rows(count), 1)}
+    elif layout == "OrderRecord rows":
+        table = {n: models.OrderRecord.from_dict({"id": n, **row}) for n, row in enumerate(order_rows(count), 1)}
+    else:
+        table = models.OrderStore()
+        batch = []
+        for row in order_rows(count):
+            batch.append(row)
+            if len(batch) == 10_000:
+                table.insert_many(batch)
+                batch = []
+        table.insert_many(batch)
+    memory = rss_mb() - before
+    assert len(table) == count
+    results.put(memory)
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'orders':>10} | {'layout':<18} | {'RSS MB':>8} | {'bytes/order':>11} | {'spec':>4}")
+    print("-" * 64)
+    results = multiprocessing.Queue()
+    for size in sizes:
+        for layout in ("dict rows", "OrderRecord rows", "OrderStore"):
+            process = multiprocessing.Process(target=measure, args=(layout, size, results))
+            process.start()
+            memory = results.get()
+            process.join()
+            per_order = memory * 1024 * 1024 / size
+            verdict = "ok" if per_order <= SPEC_BYTES_PER_ORDER else "over"
+            print(f"{size:>10,} | {layout:<18} | {memory:>8.0f} | {per_order:>11.0f} | {verdict:>4}")
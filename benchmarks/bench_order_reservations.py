@@ -0,0 +1,199 @@
+"""
+Order reservation benchmark (two services)
+Starts the product service and the order service with uvicorn on local
+ports and sends POST /orders at a fixed arrival rate (open loop, 500
+orders/s by default), first with stock reservations turned off
+(PRODUCT_SERVICE_URL="") and then with every order reserving its stock in
+the product service. Reports achieved throughput, latency percentiles and
+how many reservation operations went out per batch request, and checks
+that the catalog's stock went down by exactly what the created orders hold.
+
+Usage: python benchmarks/bench_order_reservations.py [orders/s] [seconds]
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from jwt_config import SECRET_KEY, ALGORITHM
+
+PRODUCTS = 100
+INITIAL_STOCK = 1_000_000
+CLIENT_CONNECTIONS = 100
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(module: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, **env}
+    )
+
+
+def wait_ready(url: str):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/metrics/auth", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def make_order(rng: random.Random, product_ids: list[int]) -> dict:
+    return {
+        "user_id": rng.randint(1, 1000),
+        "items": [
+            {"product_id": product_id, "product_name": f"Product {product_id}", "quantity": rng.randint(1, 3),
+             "price": 10.0}
+            for product_id in rng.sample(product_ids, rng.randint(1, 3))
+        ],
+        "shipping_address": "1 Main St, Springfield"
+    }
+
+
+class Connection:
+    """
+    Minimal keep-alive HTTP/1.1 client connection. httpx costs about as much
+    CPU per request as the order service itself; on a small machine it would
+    measure the load generator instead of the services.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, headers: dict):
+        self.reader = reader
+        self.writer = writer
+        self.head = f"POST /orders HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+
+    async def post_order(self, order: dict) -> tuple[int, bytes]:
+        body = json.dumps(order).encode()
+        self.writer.write(f"{self.head}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        status_line, *header_lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        length = next(
+            int(line.split(":", 1)[1]) for line in header_lines if line.lower().startswith("content-length:")
+        )
+        return int(status_line.split(" ", 2)[1]), await self.reader.readexactly(length)
+
+
+async def send_orders(
+    url: str, headers: dict, product_ids: list[int], rate: int, seconds: int
+) -> tuple[list[float], list[dict], int, float]:
+    rng = random.Random(11)
+    latencies, created, errors = [], [], 0
+    host, port = url.removeprefix("http://").split(":")
+    # Latency includes time queued for one of the client's connections
+    connections = asyncio.Queue()
+    for _ in range(CLIENT_CONNECTIONS):
+        reader, writer = await asyncio.open_connection(host, int(port))
+        connections.put_nowait(Connection(reader, writer, f"{host}:{port}", headers))
+
+    async def send(order: dict):
+        nonlocal errors
+        start = time.perf_counter()
+        connection = await connections.get()
+        try:
+            status, body = await connection.post_order(order)
+        finally:
+            connections.put_nowait(connection)
+        latencies.append(time.perf_counter() - start)
+        if status == 201:
+            created.append(json.loads(body))
+        else:
+            errors += 1
+
+    tasks = []
+    start = time.perf_counter()
+    for n in range(rate * seconds):
+        # Open loop: orders arrive on schedule whether or not earlier ones have finished
+        delay = start + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(make_order(rng, product_ids))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    while not connections.empty():
+        connections.get_nowait().writer.close()
+    return latencies, created, errors, elapsed
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def total_stock(product_url: str, headers: dict) -> int:
+    products = httpx.get(f"{product_url}/products", headers=headers, params={"category": "Bench"}).json()
+    return sum(product["stock"] for product in products)
+
+
+if __name__ == "__main__":
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    token = jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin",
+         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    product_port = free_port()
+    product_url = f"http://127.0.0.1:{product_port}"
+    product_service = start_service("product-service.main", product_port, {"PRODUCT_SNAPSHOT_FILE": ""})
+    try:
+        wait_ready(product_url)
+        created_products = httpx.post(f"{product_url}/products/bulk", headers=headers, timeout=30, json={"products": [
+            {"name": f"Product {i}", "price": 10.0 + i, "stock": INITIAL_STOCK, "category": "Bench",
+             "sku": f"BENCH-{i:05d}"}
+            for i in range(1, PRODUCTS + 1)
+        ]}).json()
+        product_ids = [result["id"] for result in created_products["results"]]
+
+        print(f"{rate} orders/s for {seconds} s, 1-3 items per order")
+        print(f"{'reservations':<12} | {'orders/s':>8} | {'errors':>6} | {'p50 ms':>7} | {'p95 ms':>7} | "
+              f"{'p99 ms':>7} | {'ops/batch':>9}")
+        print("-" * 76)
+        for label, upstream in (("off", ""), ("on", product_url)):
+            order_port = free_port()
+            order_url = f"http://127.0.0.1:{order_port}"
+            order_service = start_service(
+                "order-service.main", order_port, {"ORDER_DATA_DIR": "", "PRODUCT_SERVICE_URL": upstream}
+            )
+            try:
+                wait_ready(order_url)
+                stock_before = total_stock(product_url, headers)
+                latencies, created, errors, elapsed = asyncio.run(
+                    send_orders(order_url, headers, product_ids, rate, seconds)
+                )
+                inventory = httpx.get(f"{order_url}/metrics/inventory").json()["client"]
+                per_batch = f"{inventory['operations_per_batch']:>9.1f}" if inventory else f"{'-':>9}"
+                print(f"{label:<12} | {len(created) / elapsed:>8,.0f} | {errors:>6,} | "
+                      f"{percentile(latencies, 0.5):>7.1f} | {percentile(latencies, 0.95):>7.1f} | "
+                      f"{percentile(latencies, 0.99):>7.1f} | {per_batch}")
+                if upstream:
+                    ordered = sum(item["quantity"] for order in created for item in order["items"])
+                    taken = stock_before - total_stock(product_url, headers)
+                    assert taken == ordered, f"stock went down by {taken:,} for {ordered:,} ordered units"
+            finally:
+                order_service.terminate()
+                order_service.wait()
+    finally:
+        product_service.terminate()
+        product_service.wait()
@@ -0,0 +1,67 @@
+"""
+Order store lookup benchmark
+Shows that id lookups and user/status filtered pages stay flat as the order
+table grows
+
+Usage: python benchmarks/bench_order_store.py [sizes...]
+"""
+
+import importlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OrderStore = importlib.import_module("order-service.models").OrderStore
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+STATUSES = ["pending", "processing", "shipped", "delivered", "cancelled"]
+USERS = 50_000
+OPS = 10_000
+
+
+def make_orders(size: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "user_id": random.randint(1, USERS),
+            "items": [{"product_id": 1, "product_name": "Laptop", "quantity": 1, "price": 999.99}],
+            "total_amount": 999.99,
+            "status": random.choice(STATUSES),
+            "shipping_address": "123 Main St, City, State 12345",
+            "created_at": "2025-01-10T10:00:00",
+            "updated_at": "2025-01-10T10:00:00"
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def per_op_us(fn, args) -> float:
+    start = time.perf_counter()
+    for arg in args:
+        fn(arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def bench(size: int):
+    store = OrderStore(make_orders(size))
+    ids = [random.randint(1, size) for _ in range(OPS)]
+    users = [random.randint(1, USERS) for _ in range(OPS)]
+
+    get_us = per_op_us(store.get, ids)
+    user_us = per_op_us(lambda user_id: store.query(user_id=user_id, limit=20), users)
+    status_us = per_op_us(lambda user_id: store.query(user_id=user_id, status="pending", limit=20), users)
+    transition_us = per_op_us(
+        lambda order_id: store.update(order_id, status=random.choice(STATUSES)), ids
+    )
+
+    print(f"{size:>10,} | {get_us:>8.2f} | {user_us:>10.2f} | {status_us:>12.2f} | {transition_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'orders':>10} | {'get us':>8} | {'user page':>10} | {'user+status':>12} | {'status chg':>12}")
+    print("-" * 64)
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,73 @@
+"""
+User order summary benchmark
+Compares the O(1) running summary against a full recompute for a large
+table. The consistency of the running aggregates is covered by
+tests/test_order_summary.py.
+
+Usage: python benchmarks/bench_order_summary.py [orders]
+"""
+
+import importlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OrderStore = importlib.import_module("order-service.models").OrderStore
+
+USERS = 20
+
+
+def recompute(store, user_id: int) -> dict:
+    user_orders = [o for o in store if o.user_id == user_id]
+    orders_by_status = {}
+    for order in user_orders:
+        orders_by_status[order.status] = orders_by_status.get(order.status, 0) + 1
+    return {
+        "total_orders": len(user_orders),
+        "total_spent": round(sum(o.total_amount for o in user_orders), 2),
+        "orders_by_status": orders_by_status
+    }
+
+
+def random_order() -> dict:
+    items = [
+        {"product_id": 1, "product_name": "Item", "quantity": random.randint(1, 5),
+         "price": round(random.uniform(0.01, 500), 2)}
+        for _ in range(random.randint(1, 3))
+    ]
+    return {
+        "user_id": random.randint(1, USERS),
+        "items": items,
+        "total_amount": round(sum(i["quantity"] * i["price"] for i in items), 2),
+        "status": "pending",
+        "shipping_address": "x",
+        "created_at": "2025-01-10T10:00:00",
+        "updated_at": "2025-01-10T10:00:00"
+    }
+
+
+def bench(size: int):
+    store = OrderStore()
+    for _ in range(size):
+        store.insert(random_order())
+
+    runs = 1_000
+    start = time.perf_counter()
+    for _ in range(runs):
+        store.user_summary(random.randint(1, USERS))
+    summary_us = (time.perf_counter() - start) / runs * 1e6
+
+    runs = 5
+    start = time.perf_counter()
+    for _ in range(runs):
+        recompute(store, random.randint(1, USERS))
+    recompute_us = (time.perf_counter() - start) / runs * 1e6
+
+    print(f"{size:,} orders: running summary {summary_us:.2f} us, full recompute {recompute_us:,.0f} us")
+
+
+if __name__ == "__main__":
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    bench(orders)
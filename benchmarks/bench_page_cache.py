@@ -0,0 +1,97 @@
+"""
+Product page cache benchmark
+Replays storefront-like traffic against the list_products handler: a few
+hot category / price-band filter combinations (Zipf-distributed, 20-row
+pages) with a stock update to a random product every N reads. Reports
+handler CPU per read with the page cache disabled and enabled, plus the
+cache hit rate, and checks that cached pages match uncached ones.
+
+Usage: python benchmarks/bench_page_cache.py [products] [reads per write]
+"""
+
+import importlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+main = importlib.import_module("product-service.main")
+from page_cache import PageCache
+
+CATEGORIES = [f"Category {n}" for n in range(20)]
+PRICE_BANDS = [(None, None), (0.0, 50.0), (50.0, 200.0), (200.0, None)]
+READS = 20_000
+
+
+def make_catalog(size: int) -> list[dict]:
+    rng = random.Random(3)
+    return [
+        {
+            "id": i, "name": f"Product {i}", "description": None, "price": round(rng.uniform(1, 500), 2),
+            "stock": rng.randint(0, 50), "category": CATEGORIES[i % len(CATEGORIES)], "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def workload(size: int, reads_per_write: int) -> list:
+    rng = random.Random(5)
+    combos = [(category, band, in_stock) for category in CATEGORIES for band in PRICE_BANDS for in_stock in (None, True)]
+    weights = [1 / (rank + 1) for rank in range(len(combos))]
+    operations = []
+    for n in range(READS):
+        if n % reads_per_write == 0:
+            operations.append(("write", rng.randint(1, size), rng.choice((-1, 1))))
+        operations.append(("read", *rng.choices(combos, weights)[0]))
+    return operations
+
+
+def call(coroutine):
+    """Run a coroutine that never suspends (list_products does not await anything)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def run(operations: list) -> tuple[float, list]:
+    bodies = []
+    read_time = 0.0
+    for operation in operations:
+        if operation[0] == "write":
+            product_id, delta = operation[1], operation[2]
+            stock = main.products_db.get(product_id)["stock"]
+            main.products_db.update(product_id, stock=max(0, stock + delta))
+            continue
+        _, category, (min_price, max_price), in_stock = operation
+        start = time.process_time()
+        response = call(main.list_products(
+            category=category, min_price=min_price, max_price=max_price, in_stock=in_stock,
+            limit=20, offset=None, cursor=None, if_none_match=None, current_user={}
+        ))
+        read_time += time.process_time() - start
+        bodies.append(response.body)
+    return read_time / READS * 1e6, bodies
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    reads_per_write = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    catalog = make_catalog(size)
+    operations = workload(size, reads_per_write)
+    print(f"{size:,} products, {READS:,} reads, one stock update every {reads_per_write} reads")
+    print(f"{'page cache':<12} | {'us/read':>8} | {'hit rate':>8} | {'stale':>6} | {'cache KB':>8}")
+    print("-" * 56)
+
+    results = {}
+    for label, budget in (("off", 0), ("64 MB", 64 * 1024 * 1024)):
+        main.products_db.load(catalog)
+        main.page_cache = PageCache(budget)
+        read_us, bodies = run(operations)
+        results[label] = bodies
+        stats = main.page_cache.stats()
+        print(f"{label:<12} | {read_us:>8.1f} | {stats['hit_rate']:>8.2%} | {stats['stale']:>6} | {stats['bytes'] / 1024:>8.0f}")
+
+    assert results["off"] == results["64 MB"], "cached pages differ from uncached ones"
@@ -0,0 +1,151 @@
+"""
+Order pricing benchmark: product lookups from the order service
+Starts the product service with uvicorn and prices orders (1-5 line items,
+Zipf-distributed over the catalog, 32 orders in flight) three ways:
+1. one product service request per line item (the naive approach)
+2. one batched lookup per order
+3. the order service's ProductCache, with a price change every N orders
+   moving the catalog version (as a reservation response would report it)
+Reports wall time per order, product service requests per order, and the
+cache's hit rate and fetch latency.
+
+Usage: python benchmarks/bench_product_cache.py [orders] [orders per price change]
+"""
+
+import asyncio
+import datetime
+import importlib
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from jwt_config import SECRET_KEY, ALGORITHM
+
+inventory_module = importlib.import_module("order-service.inventory")
+product_cache_module = importlib.import_module("order-service.product_cache")
+
+PRODUCTS = 1000
+IN_FLIGHT = 32
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/metrics/auth", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def make_orders(count: int, product_ids: list[int]) -> list[list[int]]:
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(product_ids))]
+    return [list(dict.fromkeys(rng.choices(product_ids, weights, k=rng.randint(1, 5)))) for _ in range(count)]
+
+
+async def price_orders(orders: list[list[int]], price, change_every: int = 0, change_price=None) -> float:
+    """Runs price(index, ids) for every order with IN_FLIGHT at a time; returns seconds"""
+    limiter = asyncio.Semaphore(IN_FLIGHT)
+
+    async def one(index: int, ids: list[int]):
+        async with limiter:
+            if change_every and index % change_every == 0:
+                await change_price(index)
+            records = await price(ids)
+            assert len(records) == len(ids)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index, ids) for index, ids in enumerate(orders)))
+    return time.perf_counter() - start
+
+
+async def run(url: str, headers: dict, product_ids: list[int], orders: list[list[int]], change_every: int):
+    client = inventory_module.InventoryClient(url, max_concurrency=IN_FLIGHT)
+    print(f"{len(orders):,} orders, {sum(map(len, orders)) / len(orders):.1f} products per order, "
+          f"{IN_FLIGHT} in flight, a price change every {change_every} orders")
+    print(f"{'lookup':<16} | {'ms/order':>8} | {'requests/order':>14} | {'hit rate':>8} | {'fetch p50 ms':>12} | "
+          f"{'fetch p95 ms':>12}")
+    print("-" * 86)
+
+    async def per_item(ids):
+        records = {}
+        for product_id in ids:
+            records.update((await client.lookup_products([product_id]))[1])
+        return records
+
+    async def per_order(ids):
+        return (await client.lookup_products(ids))[1]
+
+    for label, price in (("per line item", per_item), ("per order", per_order)):
+        seconds = await price_orders(orders, price)
+        requests = sum(map(len, orders)) if price is per_item else len(orders)
+        print(f"{label:<16} | {seconds / len(orders) * 1000:>8.2f} | {requests / len(orders):>14.2f} | "
+              f"{'-':>8} | {'-':>12} | {'-':>12}")
+
+    cache = product_cache_module.ProductCache(client.lookup_products)
+    version = [(await client.lookup_products([]))[0]]
+    rng = random.Random(3)
+
+    async def change_price(index):
+        product_id = rng.choice(product_ids)
+        async with httpx.AsyncClient(base_url=url, headers=headers) as admin:
+            await admin.put(f"/products/{product_id}", json={"price": round(rng.uniform(1, 500), 2)})
+        # The next reservation response would carry the new version
+        version[0] = (await client.lookup_products([]))[0]
+
+    async def cached(ids):
+        return await cache.get_many(ids, version[0])
+
+    seconds = await price_orders(orders, cached, change_every, change_price)
+    stats = cache.stats()
+    print(f"{'product cache':<16} | {seconds / len(orders) * 1000:>8.2f} | {stats['fetches'] / len(orders):>14.2f} | "
+          f"{stats['hit_rate']:>8.2%} | {stats['fetch_ms_p50']:>12.2f} | {stats['fetch_ms_p95']:>12.2f}")
+    print(f"\ninvalidations: {stats['invalidations']}, products per fetch: {stats['products_per_fetch']}")
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    order_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    change_every = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    token = jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin",
+         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    product_service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "product-service.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env={**os.environ, "PRODUCT_SNAPSHOT_FILE": ""}
+    )
+    try:
+        wait_ready(url)
+        created = httpx.post(f"{url}/products/bulk", headers=headers, timeout=30, json={"products": [
+            {"name": f"Product {i}", "price": 10.0 + i % 100, "stock": 100, "category": "Bench",
+             "sku": f"BENCH-{i:05d}"}
+            for i in range(1, PRODUCTS + 1)
+        ]}).json()
+        product_ids = [result["id"] for result in created["results"]]
+        asyncio.run(run(url, headers, product_ids, make_orders(order_count, product_ids), change_every))
+    finally:
+        product_service.terminate()
+        product_service.wait()
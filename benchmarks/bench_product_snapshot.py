@@ -0,0 +1,148 @@
+"""
+Product snapshot benchmark
+Writes an N-product catalog both as JSON and as a columnar snapshot, then
+loads it three ways and reports startup time, resident memory and the cost
+of a product lookup and a filtered page:
+1. list of dicts parsed from JSON (the original products_db)
+2. ProductStore loaded from the same JSON
+3. ProductStore over the memory-mapped columnar snapshot
+Each layout is measured in its own process so RSS numbers do not bleed
+into each other.
+
+Usage: python benchmarks/bench_product_snapshot.py [products]
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOOKUPS = 100_000
+QUERIES = 200
+SCAN_LOOKUPS = 20
+CATEGORIES = ["Electronics", "Accessories", "Office", "Audio", "Storage"]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def write_catalog(path: str, count: int):
+    rng = random.Random(7)
+    products = [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "description": f"Description of product {i}" if i % 3 else None,
+            "price": round(rng.uniform(1, 2000), 2),
+            "stock": rng.randint(0, 500),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, count + 1)
+    ]
+    with open(path, "w") as f:
+        json.dump(products, f)
+
+
+def time_lookups(get, count: int, lookups: int) -> float:
+    ids = [random.randint(1, count) for _ in range(lookups)]
+    start = time.perf_counter()
+    for product_id in ids:
+        get(product_id)
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def time_queries(query, queries: int) -> float:
+    start = time.perf_counter()
+    for n in range(queries):
+        query(CATEGORIES[n % len(CATEGORIES)], n * 10.0)
+    return (time.perf_counter() - start) / queries * 1e3
+
+
+def measure_list(json_path: str, snapshot_path: str, count: int, results):
+    before = rss_mb()
+    start = time.perf_counter()
+    with open(json_path) as f:
+        products = json.load(f)
+    load_s = time.perf_counter() - start
+    memory = rss_mb() - before
+
+    lookup_us = time_lookups(lambda i: next(p for p in products if p["id"] == i), count, SCAN_LOOKUPS)
+    query_ms = time_queries(
+        lambda category, min_price: [
+            p for p in products if p["category"] == category and p["price"] >= min_price and p["stock"] > 0
+        ][:20],
+        5
+    )
+    results.put(("list of dicts (JSON)", load_s, memory, lookup_us, query_ms))
+
+
+def measure_store(label: str, load, count: int, results):
+    ProductStore = importlib.import_module("product-service.models").ProductStore
+    before = rss_mb()
+    start = time.perf_counter()
+    store = ProductStore()
+    load(store)
+    load_s = time.perf_counter() - start
+    memory = rss_mb() - before
+    assert len(store) == count
+
+    lookup_us = time_lookups(store.get, count, LOOKUPS)
+    query_ms = time_queries(
+        lambda category, min_price: store.query(category=category, min_price=min_price, in_stock=True, limit=20),
+        QUERIES
+    )
+    results.put((label, load_s, memory, lookup_us, query_ms))
+
+
+def load_json(store, json_path: str):
+    with open(json_path) as f:
+        store.load(json.load(f))
+
+
+def measure_store_json(json_path: str, snapshot_path: str, count: int, results):
+    measure_store("ProductStore (JSON)", lambda store: load_json(store, json_path), count, results)
+
+
+def measure_store_snapshot(json_path: str, snapshot_path: str, count: int, results):
+    measure_store("ProductStore (snapshot)", lambda store: store.load_snapshot(snapshot_path), count, results)
+
+
+def write_snapshot(json_path: str, snapshot_path: str):
+    ProductStore = importlib.import_module("product-service.models").ProductStore
+    store = ProductStore()
+    load_json(store, json_path)
+    store.save_snapshot(snapshot_path)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "products.json")
+        snapshot_path = os.path.join(tmp, "products.snapshot")
+        write_catalog(json_path, count)
+        # Write the snapshot in a child too, so the parent stays small for the forks below
+        process = multiprocessing.Process(target=write_snapshot, args=(json_path, snapshot_path))
+        process.start()
+        process.join()
+
+        print(f"{count:,} products: JSON {os.path.getsize(json_path) / 1024 / 1024:.0f} MB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 1024 / 1024:.0f} MB")
+        print(f"{'layout':<24} | {'load s':>7} | {'RSS MB':>8} | {'get by id us':>12} | {'page ms':>8}")
+        print("-" * 72)
+        results = multiprocessing.Queue()
+        for target in (measure_list, measure_store_json, measure_store_snapshot):
+            process = multiprocessing.Process(target=target, args=(json_path, snapshot_path, count, results))
+            process.start()
+            label, load_s, memory, lookup_us, query_ms = results.get()
+            process.join()
+            print(f"{label:<24} | {load_s:>7.2f} | {memory:>8.0f} | {lookup_us:>12.2f} | {query_ms:>8.2f}")
+        print("(list of dicts: get by id and pages are linear scans)")
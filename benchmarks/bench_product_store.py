@@ -0,0 +1,77 @@
+"""
+Product store lookup benchmark
+Shows that id/SKU lookups, insert/delete and filtered listing pages stay
+flat as the catalog grows
+
+Usage: python benchmarks/bench_product_store.py [sizes...]
+"""
+
+import importlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ProductStore = importlib.import_module("product-service.models").ProductStore
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+OPS = 100_000
+QUERY_OPS = 1_000
+
+
+def make_catalog(size: int) -> list[dict]:
+    categories = ["Electronics", "Accessories", "Office", "Audio", "Storage"]
+    return [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "description": None,
+            "price": round(random.uniform(1, 2000), 2),
+            "stock": random.randint(0, 500),
+            "category": categories[i % len(categories)],
+            "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def per_op_ns(fn, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e9
+
+
+def bench(size: int):
+    store = ProductStore(make_catalog(size))
+    ids = [random.randint(1, size) for _ in range(OPS)]
+    skus = [f"SKU-{i:08d}" for i in ids]
+
+    get_ns = per_op_ns(store.get, ids)
+    sku_ns = per_op_ns(store.get_by_sku, skus)
+
+    start = time.perf_counter()
+    for i in range(OPS):
+        created = store.insert({
+            "name": "Bench", "description": None, "price": 1.0,
+            "stock": 1, "category": "Bench", "sku": f"BENCH-{i}"
+        })
+        store.delete(created["id"])
+    churn_ns = (time.perf_counter() - start) / OPS * 1e9
+
+    # One 20-row page of a narrow price band inside one category
+    start = time.perf_counter()
+    for _ in range(QUERY_OPS):
+        store.query(category="audio", min_price=100, max_price=110, in_stock=True, limit=20)
+    query_us = (time.perf_counter() - start) / QUERY_OPS * 1e6
+
+    print(f"{size:>10,} | {get_ns:>10.0f} | {sku_ns:>10.0f} | {churn_ns:>15.0f} | {query_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'products':>10} | {'get ns':>10} | {'sku ns':>10} | {'insert+del ns':>15} | {'page us':>10}")
+    print("-" * 68)
+    for size in sizes:
+        bench(size)
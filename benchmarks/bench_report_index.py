@@ -0,0 +1,93 @@
+"""
+Report index benchmark
+Builds a temporary TESTCASES_DIR with N report files spread over the test
+types and compares a dashboard refresh (summary + stats + history per type)
+using the old glob-and-parse-everything approach against the report index,
+cold and warm.
+
+Usage: python benchmarks/bench_report_index.py [reports] [results per report]
+"""
+
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import report_api
+
+
+def write_reports(root: str, count: int, results_per_report: int):
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        test_type = report_api.TEST_TYPES[i % len(report_api.TEST_TYPES)]
+        reports_dir = os.path.join(root, test_type, "reports")
+        os.makedirs(reports_dir, exist_ok=True)
+        timestamp = start + timedelta(minutes=i)
+        failed = i % 7
+        results = [
+            {"name": f"test_{n}", "status": "failed" if n < failed else "passed", "duration": 0.01}
+            for n in range(results_per_report)
+        ]
+        data = {
+            "timestamp": timestamp.isoformat(),
+            "summary": {"total": results_per_report, "passed": results_per_report - failed, "failed": failed},
+            "results": results
+        }
+        name = f"test_results_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(os.path.join(reports_dir, name), "w") as f:
+            json.dump(data, f)
+
+
+def legacy_reports_for_type(test_type: str, limit: int = 10) -> list:
+    """The pre-index implementation: glob, sort and json.load every match"""
+    reports_dir = os.path.join(report_api.TESTCASES_DIR, test_type, "reports")
+    if not os.path.exists(reports_dir):
+        return []
+    json_files = sorted(glob.glob(os.path.join(reports_dir, "test_results_*.json")), reverse=True)[:limit]
+    reports = []
+    for json_file in json_files:
+        with open(json_file, 'r') as f:
+            data = json.load(f)
+        reports.append({
+            'timestamp': data.get('timestamp', ''),
+            'summary': data.get('summary', {}),
+            'total_results': len(data.get('results', []))
+        })
+    return reports
+
+
+def dashboard_refresh(reports_for_type):
+    """Requests a dashboard makes on refresh: summary, stats and history per type"""
+    for test_type in report_api.TEST_TYPES:
+        reports_for_type(test_type, 1)
+        reports_for_type(test_type, 100)   # /summary
+        reports_for_type(test_type, 1)     # /stats
+        reports_for_type(test_type, 20)    # /history
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    results_per_report = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        write_reports(tmp, count, results_per_report)
+        # Let the files settle so the index does not treat them as still being written
+        time.sleep(report_api.ReportIndex.SETTLE_SECONDS)
+        report_api.TESTCASES_DIR = tmp
+        print(f"{count:,} reports, {results_per_report} results each")
+
+        timed("legacy dashboard refresh", lambda: dashboard_refresh(legacy_reports_for_type))
+        timed("index refresh (cold)", lambda: dashboard_refresh(report_api.get_reports_for_type))
+        timed("index refresh (warm)", lambda: dashboard_refresh(report_api.get_reports_for_type))
+        timed("index /api/reports/summary", report_api.get_summary)
+        timed("rollup build (cold)", report_api.sync_all_rollups)
+        timed("rollup /api/stats", report_api.get_stats)
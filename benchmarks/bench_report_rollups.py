@@ -0,0 +1,97 @@
+"""
+Report rollup benchmark
+Builds a temporary TESTCASES_DIR with several months of reports per test
+type, then times the initial rollup build, a long-range history request
+computed from the index (the previous implementation) against the
+precomputed series, and /api/trends windows.
+
+Usage: python benchmarks/bench_report_rollups.py [days] [reports per day] [results per report]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import report_api
+
+
+def write_reports(root: str, days: int, per_day: int, results_per_report: int):
+    rng = random.Random(7)
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for test_type in report_api.TEST_TYPES:
+        reports_dir = os.path.join(root, test_type, "reports")
+        os.makedirs(reports_dir, exist_ok=True)
+        for day in range(days):
+            for run in range(per_day):
+                timestamp = end - timedelta(days=day, hours=-run)
+                # A handful of tests fail intermittently
+                results = [
+                    {"name": f"test_{n}", "status": "failed" if n < 20 and rng.random() < 0.1 else "passed"}
+                    for n in range(results_per_report)
+                ]
+                failed = sum(1 for r in results if r["status"] == "failed")
+                data = {
+                    "timestamp": timestamp.isoformat(),
+                    "summary": {"total": results_per_report, "passed": results_per_report - failed, "failed": failed},
+                    "results": results
+                }
+                name = f"test_results_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+                with open(os.path.join(reports_dir, name), "w") as f:
+                    json.dump(data, f)
+
+
+def legacy_history(test_type: str, limit: int) -> list:
+    """The pre-rollup implementation: parse every timestamp on each call"""
+    history = []
+    for report in reversed(report_api.get_reports_for_type(test_type, limit)):
+        try:
+            timestamp = datetime.fromisoformat(report['timestamp'])
+            history.append({
+                'timestamp': report['timestamp'],
+                'formatted_time': timestamp.strftime('%m/%d %H:%M'),
+                'summary': report['summary']
+            })
+        except ValueError:
+            continue
+    return history
+
+
+def timed(label: str, fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000 / repeat:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 180
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    results_per_report = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    limit = days * per_day
+    with tempfile.TemporaryDirectory() as tmp:
+        write_reports(tmp, days, per_day, results_per_report)
+        time.sleep(report_api.ReportIndex.SETTLE_SECONDS)
+        report_api.TESTCASES_DIR = tmp
+        total = days * per_day * len(report_api.TEST_TYPES)
+        print(f"{total:,} reports over {days} days, {results_per_report} results each")
+
+        timed("index build (cold)", lambda: [report_api.get_reports_for_type(t) for t in report_api.TEST_TYPES])
+        timed("rollup build (cold)", lambda: [report_api.sync_rollups(t) for t in report_api.TEST_TYPES])
+
+        for test_type in report_api.TEST_TYPES:
+            assert report_api.get_test_history(test_type, limit)['history'] == legacy_history(test_type, limit)
+
+        timed(f"legacy history, limit {limit}", lambda: legacy_history('regression', limit), repeat=20)
+        timed(f"rollup history, limit {limit}", lambda: report_api.get_test_history('regression', limit), repeat=20)
+        timed("/api/stats", report_api.get_stats, repeat=20)
+        timed("/api/trends days=7", lambda: report_api.get_trends(days=7), repeat=20)
+        timed(f"/api/trends days={days}", lambda: report_api.get_trends(days=days), repeat=5)
+
+        trends = report_api.get_trends(days=30)
+        print(f"30-day pass rate {trends['overall']['pass_rate']}, "
+              f"flakiest: {[t['name'] for t in trends['flakiest_tests'][:3]]}")
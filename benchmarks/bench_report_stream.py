@@ -0,0 +1,86 @@
+"""
+Report streaming benchmark
+Writes one large test_results_*.json file and compares time and peak
+Python memory (tracemalloc) of json.load against the streaming readers:
+header extraction (timestamp, summary, result count) and the failed-only
+filtered response body.
+
+Usage: python benchmarks/bench_report_stream.py [results]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from report_stream import is_failed_result, iter_report_json, read_report_header
+
+
+def write_report(path: str, count: int):
+    results = [
+        {
+            "name": f"tests/regression/test_module_{n // 100}.py::test_case_{n}",
+            "status": "failed" if n % 50 == 0 else "passed",
+            "duration": 0.0123,
+            "message": "AssertionError: expected 200, got 500" if n % 50 == 0 else ""
+        }
+        for n in range(count)
+    ]
+    failed = sum(1 for r in results if r["status"] == "failed")
+    data = {
+        "timestamp": "2025-01-01T00:00:00",
+        "summary": {"total": count, "passed": count - failed, "failed": failed},
+        "results": results
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def legacy_header(path: str) -> dict:
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {"timestamp": data.get("timestamp", ""), "summary": data.get("summary", {}),
+            "total_results": len(data.get("results", []))}
+
+
+def legacy_failed_only(path: str) -> int:
+    with open(path, "r") as f:
+        data = json.load(f)
+    data["results"] = [r for r in data["results"] if is_failed_result(r)]
+    return len(json.dumps(data))
+
+
+def streamed_failed_only(path: str) -> int:
+    return sum(len(chunk) for chunk in iter_report_json(path, is_failed_result))
+
+
+def measure(label: str, fn, path: str):
+    start = time.perf_counter()
+    fn(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    # Separate run for memory, tracing slows the code down
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>10.1f} ms {peak / 1024 / 1024:>10.1f} MB")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test_results_20250101_000000.json")
+        write_report(path, count)
+        assert read_report_header(path) == legacy_header(path)
+        assert json.loads("".join(iter_report_json(path, is_failed_result)))["results"] == \
+            [r for r in json.load(open(path))["results"] if is_failed_result(r)]
+
+        print(f"{count:,} results, {os.path.getsize(path) / 1024 / 1024:.1f} MB file")
+        print(f"{'':<28} {'time':>13} {'peak memory':>13}")
+        measure("json.load header", legacy_header, path)
+        measure("streaming header", read_report_header, path)
+        measure("json.load failed-only", legacy_failed_only, path)
+        measure("streaming failed-only", streamed_failed_only, path)
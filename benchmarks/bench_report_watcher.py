@@ -0,0 +1,89 @@
+"""
+Report watcher latency benchmark
+Starts the live report feed on a temporary TESTCASES_DIR, drops new report
+files into it and measures the time from the file being written to the
+'report' event reaching a subscriber, with inotify and with the polling
+fallback. tests/test_report_watcher.py checks that every drop produces an
+event.
+
+Usage: python benchmarks/bench_report_watcher.py [drops per mode] [poll interval]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import report_api
+from report_watcher import ReportWatcher
+
+EVENT_TIMEOUT_SECONDS = 10
+
+
+def write_report(root: str, test_type: str, timestamp: datetime):
+    reports_dir = os.path.join(root, test_type, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+    name = f"test_results_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+    data = {
+        "timestamp": timestamp.isoformat(),
+        "summary": {"total": 1, "passed": 1, "failed": 0},
+        "results": [{"name": "test_ok", "status": "passed", "duration": 0.01}]
+    }
+    # Write then rename, the way report generators should publish files
+    tmp_path = os.path.join(reports_dir, f".{name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.rename(tmp_path, os.path.join(reports_dir, name))
+    return name
+
+
+async def measure(root: str, drops: int, use_inotify: bool, poll_interval: float):
+    feed = report_api.LiveReportFeed()
+    feed.bind(asyncio.get_running_loop())
+    watcher = ReportWatcher(root, report_api.TEST_TYPES, feed.refresh, poll_interval, use_inotify)
+    queue = feed.subscribe()
+    watcher.start()
+    try:
+        # Wait for the startup pass over every type
+        while len(feed.latest) < len(report_api.TEST_TYPES):
+            await asyncio.sleep(0.01)
+        while not queue.empty():
+            queue.get_nowait()
+
+        base = datetime(2030, 1, 1) + timedelta(days=1 if use_inotify else 2)
+        latencies = []
+        for i in range(drops):
+            test_type = report_api.TEST_TYPES[i % len(report_api.TEST_TYPES)]
+            start = time.perf_counter()
+            name = await asyncio.to_thread(write_report, root, test_type, base + timedelta(seconds=i))
+            while True:
+                event = await asyncio.wait_for(queue.get(), EVENT_TIMEOUT_SECONDS)
+                if event["test_type"] == test_type and event["latest"]["json_file"] == name:
+                    break
+            latencies.append((time.perf_counter() - start) * 1000)
+        return watcher.mode, latencies
+    finally:
+        watcher.stop()
+        feed.unsubscribe(queue)
+
+
+if __name__ == "__main__":
+    drops = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    poll_interval = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    with tempfile.TemporaryDirectory() as tmp:
+        report_api.TESTCASES_DIR = tmp
+        for test_type in report_api.TEST_TYPES:
+            write_report(tmp, test_type, datetime(2025, 1, 1))
+
+        print(f"{drops} drops per mode, poll interval {poll_interval}s")
+        print(f"{'mode':<10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for use_inotify in (True, False):
+            mode, latencies = asyncio.run(measure(tmp, drops, use_inotify, poll_interval))
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{mode:<10} {statistics.median(latencies):>10.1f} {p99:>10.1f} {latencies[-1]:>10.1f}")
@@ -0,0 +1,140 @@
+"""
+Stock engine contention benchmark
+Threads hammer 10 hot SKUs with multi-product reservations (committed or
+released) and single-product decrements, through ProductStore's striped
+stock locks. After every run it checks that no stock went negative and
+that final stock equals initial stock minus everything that was sold, i.e.
+that no update was lost. The same checks are run against the previous
+read-modify-write path (get() then update(), as the stock handler used to
+do), which oversells and loses updates under the same load.
+
+The thread switch interval is lowered so that races show up within a
+short run. Under CPython the throughput column shows the cost of
+contention rather than parallel speed-up.
+
+Usage: python benchmarks/bench_stock_engine.py [operations] [max threads]
+"""
+
+import importlib
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+models = importlib.import_module("product-service.models")
+
+HOT_SKUS = 10
+INITIAL_STOCK = 2_000
+CATALOG_SIZE = 1_000
+THREAD_COUNTS = [1, 4, 16, 64]
+
+
+def make_store() -> models.ProductStore:
+    return models.ProductStore([
+        {
+            "id": i, "name": f"Product {i}", "description": None, "price": 10.0,
+            "stock": INITIAL_STOCK, "category": "Hot" if i <= HOT_SKUS else "Cold", "sku": f"SKU-{i:08d}"
+        }
+        for i in range(1, CATALOG_SIZE + 1)
+    ])
+
+
+def engine_worker(store: models.ProductStore, operations: int, seed: int, sold: dict, stats: dict):
+    rng = random.Random(seed)
+    for _ in range(operations):
+        if rng.random() < 0.25:
+            product_id = rng.randint(1, HOT_SKUS)
+            try:
+                store.adjust_stock_many({product_id: -1})
+                sold[product_id] += 1
+            except ValueError:
+                stats["rejected"] += 1
+            continue
+        items = {product_id: rng.randint(1, 3) for product_id in rng.sample(range(1, HOT_SKUS + 1), rng.randint(1, 3))}
+        try:
+            reservation = store.reserve(items)
+        except ValueError:
+            stats["rejected"] += 1
+            continue
+        if rng.random() < 0.7:
+            store.commit(reservation["id"])
+            for product_id, quantity in items.items():
+                sold[product_id] += quantity
+        else:
+            store.release(reservation["id"])
+
+
+def naive_worker(store: models.ProductStore, operations: int, seed: int, sold: dict, stats: dict):
+    """The previous handler: read stock, check it, write it back"""
+    rng = random.Random(seed)
+    for _ in range(operations):
+        product_id = rng.randint(1, HOT_SKUS)
+        quantity = rng.randint(1, 3)
+        stock = store.get(product_id)["stock"]
+        if stock - quantity < 0:
+            stats["rejected"] += 1
+            continue
+        store.update(product_id, stock=stock - quantity)
+        sold[product_id] += quantity
+
+
+def run(worker, threads: int, operations: int) -> dict:
+    store = make_store()
+    solds = [{product_id: 0 for product_id in range(1, HOT_SKUS + 1)} for _ in range(threads)]
+    stats = [{"rejected": 0} for _ in range(threads)]
+    lowest = [INITIAL_STOCK]
+    done = threading.Event()
+
+    def watch():
+        # Samples stock while the workers run; the engine must never expose a negative value
+        while not done.is_set():
+            lowest[0] = min(lowest[0], *(store.get(product_id)["stock"] for product_id in range(1, HOT_SKUS + 1)))
+
+    pool = [
+        threading.Thread(target=worker, args=(store, operations // threads, n, solds[n], stats[n]))
+        for n in range(threads)
+    ]
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+
+    final = {product_id: store.get(product_id)["stock"] for product_id in range(1, HOT_SKUS + 1)}
+    sold = {product_id: sum(s[product_id] for s in solds) for product_id in final}
+    lowest[0] = min(lowest[0], *final.values())
+    return {
+        "ops_per_s": operations // threads * threads / elapsed,
+        "lowest": lowest[0],
+        "sold": sum(sold.values()),
+        "lost": sum(abs(INITIAL_STOCK - sold[product_id] - final[product_id]) for product_id in final),
+        "oversold": sum(max(0, sold[product_id] - INITIAL_STOCK) for product_id in final),
+        "rejected": sum(s["rejected"] for s in stats),
+        "open": len(store._reservations)
+    }
+
+
+if __name__ == "__main__":
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    max_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    sys.setswitchinterval(1e-5)
+    print(f"{HOT_SKUS} hot SKUs x {INITIAL_STOCK:,} stock, {operations:,} operations per run")
+    print(f"{'engine':<12} | {'threads':>7} | {'ops/s':>9} | {'sold':>7} | {'rejected':>8} | "
+          f"{'min stock':>9} | {'lost':>5} | {'oversold':>8}")
+    print("-" * 86)
+    failures = []
+    for label, worker in (("striped", engine_worker), ("naive", naive_worker)):
+        for threads in [count for count in THREAD_COUNTS if count <= max_threads]:
+            result = run(worker, threads, operations)
+            print(f"{label:<12} | {threads:>7} | {result['ops_per_s']:>9,.0f} | {result['sold']:>7,} | "
+                  f"{result['rejected']:>8,} | {result['lowest']:>9,} | {result['lost']:>5,} | {result['oversold']:>8,}")
+            if label == "striped" and (result["lowest"] < 0 or result["lost"] or result["oversold"] or result["open"]):
+                failures.append(threads)
+    assert not failures, f"stock engine lost updates or oversold with {failures} threads"
@@ -0,0 +1,94 @@
+"""
+User directory benchmark
+Bulk-loads N users from a JSONL file into the login service's UserDirectory
+and reports load time, resident memory and lookup latency, next to the old
+list-of-dicts layout with a linear scan. Each layout is measured in its own
+process so RSS numbers do not bleed into each other.
+
+Usage: python benchmarks/bench_user_directory.py [users]
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOOKUPS = 100_000
+SCAN_LOOKUPS = 20
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def write_users(path: str, count: int):
+    alphabet = string.ascii_letters + string.digits + "./"
+    with open(path, "w") as f:
+        for i in range(1, count + 1):
+            fake_hash = "$2b$12$" + "".join(random.choices(alphabet, k=53))
+            f.write(json.dumps({
+                "id": i,
+                "username": f"user{i}",
+                "password": fake_hash,
+                "email": f"user{i}@example.com",
+                "role": "admin" if i % 1000 == 0 else "user"
+            }) + "\n")
+
+
+def measure_directory(path: str, count: int, results):
+    from login.models import UserDirectory
+
+    before = rss_mb()
+    start = time.perf_counter()
+    directory = UserDirectory()
+    directory.load_file(path)
+    load_s = time.perf_counter() - start
+    memory = rss_mb() - before
+
+    names = [f"user{random.randint(1, count)}" for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for name in names:
+        directory.get_by_username(name)
+    lookup_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+    results.put(("UserDirectory", load_s, memory, lookup_us))
+
+
+def measure_list(path: str, count: int, results):
+    before = rss_mb()
+    start = time.perf_counter()
+    with open(path) as f:
+        users = [json.loads(line) for line in f]
+    load_s = time.perf_counter() - start
+    memory = rss_mb() - before
+
+    names = [f"user{random.randint(1, count)}" for _ in range(SCAN_LOOKUPS)]
+    start = time.perf_counter()
+    for name in names:
+        next(u for u in users if u["username"] == name)
+    lookup_us = (time.perf_counter() - start) / SCAN_LOOKUPS * 1e6
+    results.put(("list of dicts (scan)", load_s, memory, lookup_us))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.jsonl")
+        write_users(path, count)
+
+        print(f"{count:,} users")
+        print(f"{'layout':<22} | {'load s':>7} | {'RSS MB':>8} | {'lookup us':>12}")
+        print("-" * 60)
+        results = multiprocessing.Queue()
+        for target in (measure_list, measure_directory):
+            process = multiprocessing.Process(target=target, args=(path, count, results))
+            process.start()
+            label, load_s, memory, lookup_us = results.get()
+            process.join()
+            print(f"{label:<22} | {load_s:>7.2f} | {memory:>8.0f} | {lookup_us:>12.2f}")
@@ -0,0 +1,183 @@
+"""
+Multi-worker benchmark: read throughput from 1 to 8 uvicorn workers
+Starts the product service with uvicorn --workers N and a fresh shared log
+(PRODUCT_SHARED_LOG) for N = 1, 2, 4 and 8, loads a catalog through one
+worker and checks that a stock update made through one connection is seen
+on fresh connections (which land on any worker). Then client processes hold
+keep-alive connections open and send read requests back to back (closed
+loop: GET /products/{id}, with every fifth request a GET /products category
+page), and the run reports requests/s, speedup over one worker and latency.
+
+Reads are served from each worker's own memory, so throughput scales with
+the cores the workers get; on a machine with fewer cores than workers (the
+client processes need some too) it stops scaling at the core count.
+
+Usage: python benchmarks/bench_workers.py [seconds per run] [worker counts...]
+"""
+
+import asyncio
+import datetime
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import jwt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from jwt_config import SECRET_KEY, ALGORITHM
+
+PRODUCTS = 10_000
+CATEGORIES = [f"Category {i}" for i in range(20)]
+CONNECTIONS_PER_CLIENT = 50
+# Client processes generating load; at least 2 so one of them is never the only bottleneck
+CLIENT_PROCESSES = max(2, (os.cpu_count() or 1) // 2)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str):
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{url}/metrics/auth", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start")
+
+
+def make_token() -> str:
+    return jwt.encode(
+        {"user_id": 1, "username": "bench", "role": "admin",
+         "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 GET client (see bench_order_reservations)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, headers: dict):
+        self.reader = reader
+        self.writer = writer
+        self.headers = f"Host: {host}\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+
+    async def get(self, path: str) -> int:
+        self.writer.write(f"GET {path} HTTP/1.1\r\n{self.headers}\r\n".encode())
+        status_line, *header_lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        length = next(
+            int(line.split(":", 1)[1]) for line in header_lines if line.lower().startswith("content-length:")
+        )
+        await self.reader.readexactly(length)
+        return int(status_line.split(" ", 2)[1])
+
+
+async def client_load(url: str, token: str, seed: int, start_at: float, seconds: float) -> tuple[int, int, list[float]]:
+    host, port = url.removeprefix("http://").split(":")
+    headers = {"Authorization": f"Bearer {token}"}
+    connections = []
+    for _ in range(CONNECTIONS_PER_CLIENT):
+        reader, writer = await asyncio.open_connection(host, int(port))
+        connections.append(Connection(reader, writer, f"{host}:{port}", headers))
+    latencies, errors = [], 0
+    # Every client process starts and stops at the same wall clock time
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    stop = time.time() + seconds
+
+    async def send(connection: Connection, rng: random.Random):
+        nonlocal errors
+        n = 0
+        while time.time() < stop:
+            n += 1
+            if n % 5 == 0:
+                path = f"/products?category={rng.choice(CATEGORIES).replace(' ', '%20')}&limit=20"
+            else:
+                path = f"/products/{rng.randint(1, PRODUCTS)}"
+            start = time.perf_counter()
+            status = await connection.get(path)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    await asyncio.gather(*(send(connection, random.Random(seed * 1000 + n)) for n, connection in enumerate(connections)))
+    for connection in connections:
+        connection.writer.close()
+    return len(latencies), errors, latencies
+
+
+def run_client(args) -> tuple[int, int, list[float]]:
+    return asyncio.run(client_load(*args))
+
+
+def check_consistency(url: str, headers: dict, workers: int):
+    """A write through one connection is visible on every fresh connection (any worker)"""
+    with httpx.Client(base_url=url, headers=headers) as writer:
+        stock = writer.get("/products/1").json()["stock"]
+        writer.patch("/products/1/stock", params={"quantity": 7}).raise_for_status()
+    for _ in range(workers * 4):
+        with httpx.Client(base_url=url, headers=headers) as reader:
+            seen = reader.get("/products/1").json()["stock"]
+            assert seen == stock + 7, f"a worker served stock {seen} after the update to {stock + 7}"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or [1, 2, 4, 8]
+    token = make_token()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"{os.cpu_count()} CPUs, {PRODUCTS:,} products, {CLIENT_PROCESSES} client processes x "
+          f"{CONNECTIONS_PER_CLIENT} connections, {seconds:g} s per run")
+    print(f"{'workers':>7} | {'requests/s':>10} | {'speedup':>7} | {'errors':>6} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print("-" * 60)
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory, multiprocessing.Pool(CLIENT_PROCESSES) as clients:
+        for workers in worker_counts:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            service = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "product-service.main:app", "--workers", str(workers),
+                 "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+                cwd=ROOT, env={**os.environ, "PRODUCT_SNAPSHOT_FILE": "",
+                               "PRODUCT_SHARED_LOG": os.path.join(directory, f"products-{workers}.db")}
+            )
+            try:
+                wait_ready(url)
+                httpx.post(f"{url}/products/bulk", headers=headers, timeout=60, json={"products": [
+                    {"name": f"Product {i}", "price": 10.0 + i % 100, "stock": 100,
+                     "category": CATEGORIES[i % len(CATEGORIES)], "sku": f"BENCH-{i:05d}"}
+                    for i in range(1, PRODUCTS + 1)
+                ]}).raise_for_status()
+                # Let every worker start and replay the catalog before measuring
+                time.sleep(1 + workers * 0.5)
+                check_consistency(url, headers, workers)
+
+                start_at = time.time() + 2
+                results = clients.map(run_client, [
+                    (url, token, client, start_at, seconds) for client in range(CLIENT_PROCESSES)
+                ])
+                requests = sum(result[0] for result in results)
+                errors = sum(result[1] for result in results)
+                latencies = [latency for result in results for latency in result[2]]
+                rate = requests / seconds
+                baseline = baseline or rate
+                print(f"{workers:>7} | {rate:>10,.0f} | {rate / baseline:>6.2f}x | {errors:>6,} | "
+                      f"{percentile(latencies, 0.5):>7.1f} | {percentile(latencies, 0.99):>7.1f}")
+            finally:
+                service.terminate()
+                service.wait()
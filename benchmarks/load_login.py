@@ -0,0 +1,78 @@
+"""
+Login service load test
+Measures /validate latency on its own, then again while N concurrent clients
+keep credential logins (bcrypt checks) in flight. With password checks in the
+process pool, /validate p99 should stay flat; logins beyond the queue limit
+get a fast 503 with Retry-After.
+
+Requires a running login service: ./start.sh login
+Usage: python benchmarks/load_login.py [--url http://localhost:8001] [--logins 200] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def probe_validate(client: httpx.AsyncClient, token: str, seconds: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/validate", headers={"Authorization": f"Bearer {token}"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def login_loop(client: httpx.AsyncClient, stop: asyncio.Event, outcomes: dict):
+    while not stop.is_set():
+        response = await client.post("/login/credentials", json={"username": "admin", "password": "admin123"})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+def report(label: str, latencies: list[float]):
+    print(
+        f"{label:<22} | n={len(latencies):>5} | p50 {statistics.median(latencies):7.2f} ms | "
+        f"p99 {percentile(latencies, 99):7.2f} ms | max {max(latencies):7.2f} ms"
+    )
+
+
+async def main(url: str, logins: int, seconds: float):
+    limits = httpx.Limits(max_connections=logins + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        response = await client.post("/login/credentials", json={"username": "admin", "password": "admin123"})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        report("/validate idle", await probe_validate(client, token, seconds))
+
+        stop = asyncio.Event()
+        outcomes = {}
+        workers = [asyncio.create_task(login_loop(client, stop, outcomes)) for _ in range(logins)]
+        await asyncio.sleep(1)  # let the login burst build up
+        report(f"/validate {logins} logins", await probe_validate(client, token, seconds))
+        stop.set()
+        await asyncio.gather(*workers)
+
+        print(f"login responses by status: {dict(sorted(outcomes.items()))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--logins", type=int, default=200, help="concurrent credential login clients")
+    parser.add_argument("--seconds", type=float, default=10, help="probe duration per phase")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.logins, args.seconds))
@@ -0,0 +1,149 @@
+# Shared columnar snapshot files for the service stores
+# A snapshot is a read-only table stored column by column so it can be
+# memory-mapped and read in place:
+#
+#   magic (8 bytes) | header length (uint32) | header (JSON) | column data
+#
+# Numeric columns are fixed-width arrays ("q" int64, "d" float64, "I" uint32)
+# in the byte order recorded in the header. String columns ("s") are uint32
+# arrays of ids into one shared, deduplicated string table (an offsets
+# array plus a UTF-8 blob); NULL_STRING stands for None. Every array starts
+# on an 8-byte boundary.
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, Optional
+
+MAGIC = b"COLSNAP1"
+NULL_STRING = 0xFFFFFFFF
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+
+
+class InvalidSnapshot(ValueError):
+    """Raised when a file is not a readable columnar snapshot."""
+
+
+def write_table(path: str, rows: int, columns: dict[str, tuple[str, Iterable]], metadata: Optional[dict] = None):
+    """
+    Atomically write a snapshot. columns maps name -> (type, values), with
+    type one of "q", "d", "I" or "s" and exactly `rows` values per column.
+    metadata is any JSON-serializable dict stored in the header.
+    """
+    strings: dict[str, int] = {}
+    arrays = {}
+    for name, (kind, values) in columns.items():
+        if kind == "s":
+            ids = array("I")
+            for value in values:
+                if value is None:
+                    ids.append(NULL_STRING)
+                else:
+                    string_id = strings.get(value)
+                    if string_id is None:
+                        string_id = strings[value] = len(strings)
+                    ids.append(string_id)
+            arrays[name] = ids
+        else:
+            arrays[name] = array(kind, values)
+        if len(arrays[name]) != rows:
+            raise ValueError(f"Column {name} has {len(arrays[name])} values, expected {rows}")
+
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+
+    # Lay out the sections after the header, then write the header with the final offsets
+    sections = [(name, arrays[name]) for name in arrays] + [("__offsets", offsets), ("__blob", blob)]
+    layout = {}
+    position = 0
+    for name, data in sections:
+        position += -position % _ALIGNMENT
+        size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        layout[name] = (position, size)
+        position += size
+
+    header = {
+        "rows": rows,
+        "byteorder": sys.byteorder,
+        "metadata": metadata or {},
+        "columns": {name: {"type": columns[name][0], "offset": layout[name][0]} for name in arrays},
+        "strings": {"count": len(strings), "offsets": layout["__offsets"][0], "blob": layout["__blob"][0],
+                    "blob_size": len(blob)},
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = len(MAGIC) + _HEADER_LENGTH.size + len(header_bytes)
+    padding = -data_start % _ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header_bytes) + padding))
+        f.write(header_bytes + b" " * padding)
+        written = 0
+        for name, data in sections:
+            offset, _ = layout[name]
+            f.write(b"\0" * (offset - written))
+            raw = data.tobytes() if isinstance(data, array) else bytes(data)
+            f.write(raw)
+            written = offset + len(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ColumnarTable:
+    """
+    A memory-mapped snapshot. Columns are exposed as memoryviews over the
+    mapping, so nothing is decoded until a value is read.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise InvalidSnapshot(f"{path} is empty")
+        buffer = memoryview(self._map)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise InvalidSnapshot(f"{path} is not a columnar snapshot")
+        (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+        if header["byteorder"] != sys.byteorder:
+            raise InvalidSnapshot(f"{path} was written with {header['byteorder']}-endian byte order")
+
+        data = buffer[header_start + header_length:]
+        self.rows: int = header["rows"]
+        self.metadata: dict = header["metadata"]
+        self.types: dict[str, str] = {}
+        self._columns: dict[str, memoryview] = {}
+        for name, column in header["columns"].items():
+            kind = "I" if column["type"] == "s" else column["type"]
+            size = self.rows * struct.calcsize(kind)
+            self._columns[name] = data[column["offset"]:column["offset"] + size].cast(kind)
+            self.types[name] = column["type"]
+
+        strings = header["strings"]
+        self.string_count: int = strings["count"]
+        self._offsets = data[strings["offsets"]:strings["offsets"] + 8 * (self.string_count + 1)].cast("Q")
+        self._blob = data[strings["blob"]:strings["blob"] + strings["blob_size"]]
+
+    def column(self, name: str) -> memoryview:
+        """A numeric column, or the string ids of a string column"""
+        return self._columns[name]
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NULL_STRING:
+            return None
+        return str(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]], "utf-8")
+
+    def value(self, name: str, row: int):
+        value = self._columns[name][row]
+        return self.string(value) if self.types[name] == "s" else value
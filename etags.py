@@ -0,0 +1,47 @@
+# Shared ETag helpers for conditional GET requests
+# ETags are derived from store version counters: a response is a pure
+# function of the URL and the store version, so a client presenting the ETag
+# it was given for a URL can get a 304 without the query or serialization
+# running again. Versions restart with the process, so every ETag also
+# carries an id of this process, or of the shared log when the service's
+# workers replay one (their versions then match, see shared_log).
+
+import secrets
+from typing import Optional
+
+from fastapi.responses import Response
+
+ETAG_HEADER = "ETag"
+# Browsers may reuse a cached response only after revalidating it with If-None-Match
+CACHE_CONTROL = "no-cache"
+
+_INSTANCE = secrets.token_hex(4)
+
+
+def use_instance(instance: str):
+    """Issue ETags under this id instead of the process's own"""
+    global _INSTANCE
+    _INSTANCE = instance
+
+
+def make_etag(*versions) -> str:
+    return '"' + "-".join([_INSTANCE, *(str(version) for version in versions)]) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison: weak, so W/"x" matches "x"; "*" matches anything"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> dict:
+    return {ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
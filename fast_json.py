@@ -0,0 +1,38 @@
+# Shared fast JSON responses for the read endpoints
+# Store rows are already validated when they are written, so read handlers
+# can encode them straight to bytes instead of letting FastAPI rebuild a
+# pydantic model per row from response_model. Routes keep response_model
+# for the OpenAPI schema; returning a Response skips its validation.
+#
+# orjson is used when installed, otherwise a pre-built stdlib encoder with
+# the same settings as starlette's JSONResponse.
+
+import json
+from typing import Any, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return _encoder.encode(content).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """A JSON response for trusted content (plain dicts, lists, str, int, float, bool, None)."""
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[dict] = None):
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -15,3 +15,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 # Warn if using default key
 if SECRET_KEY == "default-secret-key-please-change-in-env":
     print("⚠️  WARNING: Using default JWT_SECRET_KEY. Set JWT_SECRET_KEY in .env file for production!")
+
+# Verified-token cache (see auth.py)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
@@ -1,23 +1,64 @@
 from fastapi import FastAPI, HTTPException, Depends, Header
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from .models import users_auth_db, active_tokens
 from .schemas import LoginCredentials, TokenLogin, LoginResponse, UserInfo
 import bcrypt
 import jwt
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import sys
 import os
 
-# Add parent directory to path to import jwt_config
+# Add parent directory to path to import the shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from jwt_config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import decode_jwt_token, security, token_cache
+
+# Optional JSONL or CSV file with the user directory, loaded at startup
+USER_DIRECTORY_FILE = os.getenv("USER_DIRECTORY_FILE")
+
+# Password checks (bcrypt, cost 12) run in a dedicated process pool so a burst of
+# logins cannot starve the event loop or the threadpool serving /validate and /me.
+# Leave one core for the event loop by default
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max((os.cpu_count() or 1) - 1, 1))))
+# Checks allowed to wait for a worker before new logins are rejected with 503
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 8)))
+PASSWORD_RETRY_AFTER_SECONDS = 1
+
+# Workers run at lower CPU priority so request handling wins when cores are contended
+PASSWORD_WORKER_NICENESS = 10
+
+password_pool: Optional[ProcessPoolExecutor] = None
+password_checks_in_flight = 0
+
+def _init_password_worker():
+    if hasattr(os, "nice"):
+        os.nice(PASSWORD_WORKER_NICENESS)
+
+def _new_password_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, initializer=_init_password_worker)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global password_pool
+    # Load the real user directory when one is configured
+    if USER_DIRECTORY_FILE:
+        users_auth_db.load_file(USER_DIRECTORY_FILE)
+    password_pool = _new_password_pool()
+    yield
+    password_pool.shutdown(cancel_futures=True)
+    password_pool = None
 
 app = FastAPI(
     title="Login & Authentication API",
     description="Authentication service with JWT-based authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,12 +70,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-security = HTTPBearer()
-
 # Helper function to verify password
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+# Helper function to verify password in the process pool, with queue-depth limit
+async def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    global password_pool, password_checks_in_flight
+    if password_checks_in_flight >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)}
+        )
+
+    # Handlers run on the event loop thread, so the counter needs no lock
+    password_checks_in_flight += 1
+    pool = password_pool
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, verify_password, plain_password, hashed_password)
+    except BrokenProcessPool:
+        # A worker died (OOM kill, crash) and the pool refuses all further work:
+        # replace it once, however many checks were queued on it, and have clients retry
+        if password_pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            password_pool = _new_password_pool()
+        raise HTTPException(
+            status_code=503,
+            detail="Password check failed, please retry",
+            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)}
+        )
+    finally:
+        password_checks_in_flight -= 1
+
 # Helper function to create JWT token
 def create_jwt_token(user_id: int, username: str, role: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -47,47 +116,35 @@ def create_jwt_token(user_id: int, username: str, role: str) -> str:
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-# Helper function to decode and validate JWT token
-def decode_jwt_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
 # 1. Login with credentials (username + password)
 @app.post("/login/credentials", response_model=LoginResponse)
-def login_with_credentials(credentials: LoginCredentials):
+async def login_with_credentials(credentials: LoginCredentials):
     """
     Login using username and password.
     Returns a JWT access token for subsequent requests.
+    Returns 503 with Retry-After when too many password checks are queued
+    or a password worker died.
     """
     # Find user by username
-    user = None
-    for u in users_auth_db:
-        if u["username"] == credentials.username:
-            user = u
-            break
+    user = users_auth_db.get_by_username(credentials.username)
 
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
     # Verify password
-    if not verify_password(credentials.password, user["password"]):
+    if not await verify_password_pooled(credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
     # Generate JWT access token
-    access_token = create_jwt_token(user["id"], user["username"], user["role"])
+    access_token = create_jwt_token(user.id, user.username, user.role)
 
     return LoginResponse(
         access_token=access_token,
         token_type="bearer",
-        user_id=user["id"],
-        username=user["username"],
-        email=user["email"],
-        role=user["role"]
+        user_id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role
     )
 
 # 2. Login with token (validate existing JWT token)
@@ -102,11 +159,7 @@ def login_with_token(token_data: TokenLogin):
     user_id = payload.get("user_id")
 
     # Find user by ID
-    user = None
-    for u in users_auth_db:
-        if u["id"] == user_id:
-            user = u
-            break
+    user = users_auth_db.get(user_id)
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
@@ -114,10 +167,10 @@ def login_with_token(token_data: TokenLogin):
     return LoginResponse(
         access_token=token_data.token,
         token_type="bearer",
-        user_id=user["id"],
-        username=user["username"],
-        email=user["email"],
-        role=user["role"]
+        user_id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role
     )
 
 # 3. Get current user info (protected endpoint)
@@ -134,20 +187,16 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     user_id = payload.get("user_id")
 
     # Find user by ID
-    user = None
-    for u in users_auth_db:
-        if u["id"] == user_id:
-            user = u
-            break
+    user = users_auth_db.get(user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     return UserInfo(
-        id=user["id"],
-        username=user["username"],
-        email=user["email"],
-        role=user["role"]
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role
     )
 
 # 4. Logout (with JWT, just inform client to discard token)
@@ -185,3 +234,11 @@ def validate_token(credentials: HTTPAuthorizationCredentials = Depends(security)
         }
     except HTTPException:
         return {"valid": False}
+
+# 6. Auth cache metrics
+@app.get("/metrics/auth")
+def get_auth_metrics():
+    """
+    Verified-token cache statistics (size, hits, misses, hit rate).
+    """
+    return token_cache.stats()
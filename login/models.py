@@ -1,6 +1,88 @@
+import csv
+import json
+import sys
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+class UserRecord(NamedTuple):
+    """
+    One user account. A tuple instead of a dict keeps per-user overhead low
+    when millions of accounts are loaded.
+    """
+    id: int
+    username: str
+    password: str  # bcrypt hash
+    email: str
+    role: str
+
+
+class UserDirectory:
+    """
+    In-memory user directory with hash indexes by username and by id.
+    Roles are interned so every record shares the same few role strings.
+    """
+
+    def __init__(self, users: Iterable[dict] = ()):
+        self._by_username: dict[str, UserRecord] = {}
+        self._by_id: dict[int, UserRecord] = {}
+        self.load(users)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[UserRecord]:
+        return iter(self._by_id.values())
+
+    def load(self, users: Iterable[dict]):
+        """Replace the directory with the given user rows."""
+        self._by_username.clear()
+        self._by_id.clear()
+        for user in users:
+            self.add(user)
+
+    def load_file(self, path: str):
+        """
+        Replace the directory with users from a JSONL or CSV file.
+        Each row needs id, username, password (bcrypt hash), email and role.
+        """
+        with open(path, "r", newline="") as f:
+            if path.endswith(".csv"):
+                self.load(csv.DictReader(f))
+            else:
+                self.load(json.loads(line) for line in f if line.strip())
+
+    def add(self, user: dict) -> UserRecord:
+        """
+        Add or replace a user. A row re-using an id or a username replaces
+        the record that had it, so each id and each username maps to one record.
+        """
+        record = UserRecord(
+            id=int(user["id"]),
+            username=user["username"],
+            password=user["password"],
+            email=user["email"],
+            role=sys.intern(user["role"])
+        )
+        previous = self._by_id.get(record.id)
+        if previous is not None:
+            del self._by_username[previous.username]
+        taken = self._by_username.get(record.username)
+        if taken is not None:
+            del self._by_id[taken.id]
+        self._by_username[record.username] = record
+        self._by_id[record.id] = record
+        return record
+
+    def get(self, user_id: int) -> Optional[UserRecord]:
+        return self._by_id.get(user_id)
+
+    def get_by_username(self, username: str) -> Optional[UserRecord]:
+        return self._by_username.get(username)
+
+
 # Login service database with bcrypt hashed passwords
 # Password hashes are for: admin123, password123, password456 respectively
-users_auth_db = [
+SEED_USERS = [
     {
         "id": 1,
         "username": "admin",
@@ -24,5 +106,7 @@ users_auth_db = [
     }
 ]
 
+users_auth_db = UserDirectory(SEED_USERS)
+
 # Active tokens storage (in production, use Redis or database)
 active_tokens = {}
@@ -0,0 +1,227 @@
+# Client for the product service's stock reservation endpoint
+# One long-lived httpx.AsyncClient is shared by every request, so calls reuse
+# pooled keep-alive connections instead of opening one per order. At most
+# max_concurrency batches are in flight; operations submitted while every slot
+# is busy queue up and go out together in the next batch, so under load the
+# number of HTTP calls grows much more slowly than the number of orders.
+
+import asyncio
+import datetime
+from typing import Optional
+
+import httpx
+import jwt
+
+from jwt_config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+
+RESERVATIONS_PATH = "/internal/reservations"
+LOOKUP_PATH = "/internal/products/lookup"
+# Operations per batch request (the product service accepts up to 10,000)
+MAX_BATCH_OPERATIONS = 1000
+# Service tokens are renewed this long before they expire
+TOKEN_RENEW_SECONDS = 60
+
+# Batch request field -> response field, per operation kind
+_RESULT_FIELDS = {"reserve": "reserved", "commit": "committed", "release": "released"}
+
+
+class InventoryError(Exception):
+    """The product service rejected an operation (unknown product, insufficient stock)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class InventoryUnavailable(Exception):
+    """The product service could not be reached or answered with an error"""
+
+
+class InventoryClient:
+    """
+    Batched reserve / commit / release calls to the product service.
+    Each call waits for the result of its own operation. The HTTP client is
+    opened on first use (or by open()) and must be closed with aclose().
+    """
+
+    def __init__(self, base_url: str, max_concurrency: int = 32, timeout_seconds: float = 5.0):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.batches = 0
+        self.operations = 0
+        self.failed_batches = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiter: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (kind, payload, future) waiting for a batch
+        self._pending: list[tuple[str, object, asyncio.Future]] = []
+        # Batch tasks that have not taken their operations yet
+        self._waiting = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+
+    def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=30.0
+            )
+        )
+        self._limiter = asyncio.Semaphore(self.max_concurrency)
+        self._pending = []
+        self._waiting = 0
+
+    async def aclose(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def reserve(self, items: list[dict]) -> dict:
+        """
+        Take stock for one order's items ({"product_id", "quantity"}). Returns
+        {"reservation_id", "expires_at", "catalog_version"}; the catalog version is
+        the one the order should be priced at (see ProductCache).
+        """
+        return await self._submit("reserve", {"items": items})
+
+    async def commit(self, reservation_id: str):
+        await self._submit("commit", reservation_id)
+
+    async def release(self, reservation_id: str):
+        """Give back a reservation's stock, committed or not; a repeated release gives nothing back"""
+        await self._submit("release", reservation_id)
+
+    async def open_reservations(self) -> set[str]:
+        """Ids of the reservations that are neither committed nor released yet"""
+        await self._ensure_open()
+        async with self._limiter:
+            try:
+                response = await self._client.get(
+                    RESERVATIONS_PATH, headers={"Authorization": f"Bearer {self._service_token()}"}
+                )
+                response.raise_for_status()
+                body = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise InventoryUnavailable(str(e) or type(e).__name__)
+        return {reservation["reservation_id"] for reservation in body["reservations"]}
+
+    async def lookup_products(self, product_ids: list[int]) -> tuple[str, dict[int, dict]]:
+        """
+        Fetch name, price and SKU of these products in one request. Returns
+        (catalog_version, {product_id: record}); unknown products are left out.
+        """
+        await self._ensure_open()
+        async with self._limiter:
+            try:
+                response = await self._client.post(
+                    LOOKUP_PATH, json={"ids": product_ids},
+                    headers={"Authorization": f"Bearer {self._service_token()}"}
+                )
+                response.raise_for_status()
+                body = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                raise InventoryUnavailable(str(e) or type(e).__name__)
+        return body["catalog_version"], {
+            product["id"]: {"name": product["name"], "price": product["price"], "sku": product["sku"]}
+            for product in body["products"]
+        }
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "operations_per_batch": round(self.operations / self.batches, 2) if self.batches else 0.0,
+            "failed_batches": self.failed_batches,
+            "queued": len(self._pending),
+            "max_concurrency": self.max_concurrency
+        }
+
+    async def _submit(self, kind: str, payload) -> dict:
+        await self._ensure_open()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((kind, payload, future))
+        # One task waiting for a slot is enough: it takes whatever has queued up by then
+        if self._waiting == 0:
+            self._start_batch()
+        return await future
+
+    async def _ensure_open(self):
+        # Pooled connections belong to the loop that opened them (a TestClient used
+        # without its lifespan runs every request on a new loop)
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            return
+        # Replaced before closing, so concurrent callers do not open a client each
+        stale = self._client
+        self.open()
+        if stale is not None:
+            try:
+                await stale.aclose()
+            except Exception:
+                # Its loop is gone already; the sockets went with it
+                pass
+
+    def _start_batch(self):
+        self._waiting += 1
+        task = asyncio.create_task(self._send_batch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self):
+        async with self._limiter:
+            self._waiting -= 1
+            batch = self._pending[:MAX_BATCH_OPERATIONS]
+            del self._pending[:MAX_BATCH_OPERATIONS]
+            if self._pending and self._waiting == 0:
+                self._start_batch()
+            if not batch:
+                return
+
+            body = {kind: [] for kind in _RESULT_FIELDS}
+            for kind, payload, _ in batch:
+                body[kind].append(payload)
+            self.batches += 1
+            self.operations += len(batch)
+            try:
+                response = await self._client.post(
+                    RESERVATIONS_PATH, json=body, headers={"Authorization": f"Bearer {self._service_token()}"}
+                )
+                response.raise_for_status()
+                body = response.json()
+                results = {kind: iter(body[field]) for kind, field in _RESULT_FIELDS.items()}
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                self.failed_batches += 1
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(InventoryUnavailable(str(e) or type(e).__name__))
+                return
+
+            for kind, _, future in batch:
+                result = next(results[kind])
+                if future.done():
+                    # The caller was cancelled; nothing is waiting for this result
+                    continue
+                if result["status"] == "error":
+                    future.set_exception(InventoryError(result["status_code"], result["detail"]))
+                else:
+                    future.set_result({**result, "catalog_version": body["catalog_version"]})
+
+    def _service_token(self) -> str:
+        """A JWT for the order service itself, signed with the shared secret"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if self._token is None or self._token_expires - now.timestamp() < TOKEN_RENEW_SECONDS:
+            expires = now + datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+            self._token = jwt.encode(
+                {"user_id": None, "username": "order-service", "role": "service", "exp": expires},
+                SECRET_KEY, algorithm=ALGORITHM
+            )
+            self._token_expires = expires.timestamp()
+        return self._token
@@ -1,23 +1,84 @@
-from fastapi import FastAPI, HTTPException, Query, Depends, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .models import orders_db
-from .schemas import Order, OrderCreate, OrderUpdate
+from .models import orders_db, OrderItemRecord, OrderRecord, to_epoch_us
+from .schemas import Order, OrderCreate, OrderUpdate, OrderBulkCreate, OrderBulkResponse
 from typing import Optional
-from datetime import datetime
-import jwt
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from pydantic import ValidationError
+import asyncio
 import sys
 import os
 
-# Add parent directory to path to import jwt_config
+# Add parent directory to path to import the shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from jwt_config import SECRET_KEY, ALGORITHM
+from auth import verify_token, token_cache
+from pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint
+from fast_json import FastJSONResponse
+from etags import ETAG_HEADER, etag_headers, etag_matches, make_etag, not_modified, use_instance
+from shared_log import RefreshMiddleware
+from .inventory import InventoryClient, InventoryError, InventoryUnavailable
+from .product_cache import ProductCache
+
+# Write-ahead log and snapshots for the order store; set ORDER_DATA_DIR="" to keep orders in memory only
+ORDER_DATA_DIR = os.getenv(
+    "ORDER_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "orders")
+)
+# fsync each group commit; turning it off trades crash durability for write throughput
+ORDER_LOG_FSYNC = os.getenv("ORDER_LOG_FSYNC", "true").lower() != "false"
+# Log records between snapshots (or shared-log checkpoints); bounds how much of the log a restart replays
+ORDER_SNAPSHOT_EVERY = int(os.getenv("ORDER_SNAPSHOT_EVERY", "100000"))
+# SQLite change log shared by the service's worker processes (uvicorn --workers); every
+# worker replays it. Replaces ORDER_DATA_DIR, whose log only one process can write.
+ORDER_SHARED_LOG = os.getenv("ORDER_SHARED_LOG", "")
+# Product service that reserves stock for new orders; set PRODUCT_SERVICE_URL="" to skip
+# reservations (orders are then priced as submitted and stock is not checked)
+PRODUCT_SERVICE_URL = os.getenv("PRODUCT_SERVICE_URL", "http://localhost:8002")
+# Reservation batches in flight to the product service at once (and pooled connections)
+INVENTORY_MAX_CONCURRENCY = int(os.getenv("INVENTORY_MAX_CONCURRENCY", "32"))
+# Seconds before a product service call fails and the order is answered with 503
+INVENTORY_TIMEOUT_SECONDS = float(os.getenv("INVENTORY_TIMEOUT_SECONDS", "5"))
+# Products (name, price, SKU) cached for pricing orders; also dropped whenever the catalog version moves
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300"))
+# Seconds between attempts to reconcile reservations at startup while the product service is unreachable
+RECONCILE_RETRY_SECONDS = 5.0
+# Seconds after which a cancel left unfinished (its worker stopped mid-cancel) can be taken over by another cancel
+CANCEL_CLAIM_SECONDS = 60.0
+
+inventory = InventoryClient(
+    PRODUCT_SERVICE_URL, max_concurrency=INVENTORY_MAX_CONCURRENCY, timeout_seconds=INVENTORY_TIMEOUT_SECONDS
+) if PRODUCT_SERVICE_URL else None
+product_cache = ProductCache(
+    inventory.lookup_products, max_entries=PRODUCT_CACHE_SIZE, ttl_seconds=PRODUCT_CACHE_TTL_SECONDS
+) if inventory is not None else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if ORDER_SHARED_LOG:
+        use_instance(orders_db.share(ORDER_SHARED_LOG, sync=ORDER_LOG_FSYNC, checkpoint_every=ORDER_SNAPSHOT_EVERY))
+    # Recover orders from the last snapshot and log, and log every write from now on
+    elif ORDER_DATA_DIR:
+        orders_db.open(ORDER_DATA_DIR, sync=ORDER_LOG_FSYNC, snapshot_every=ORDER_SNAPSHOT_EVERY)
+    reconciling = None
+    if inventory is not None:
+        inventory.open()
+        # Orders stored just before a crash may still hold uncommitted reservations
+        reconciling = asyncio.create_task(reconcile_reservations())
+    yield
+    if reconciling is not None:
+        reconciling.cancel()
+    if inventory is not None:
+        await inventory.aclose()
+    orders_db.close()
 
 app = FastAPI(
     title="Order Management API",
     description="Independent service for managing customer orders (Requires JWT Authentication)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,242 +88,473 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
-security = HTTPBearer()
+# Apply the other workers' writes before each request
+if ORDER_SHARED_LOG:
+    app.add_middleware(RefreshMiddleware, stores=[orders_db])
+
 VALID_STATUSES = ["pending", "processing", "shipped", "delivered", "cancelled"]
+CANCELLABLE_STATUSES = ["pending", "processing"]
+# Set by the service while a cancel is in progress; clients cannot set it
+CANCELLING_STATUS = "cancelling"
+# Every status an order can have, in lifecycle order
+ORDER_STATUSES = ["pending", "processing", "shipped", "delivered", CANCELLING_STATUS, "cancelled"]
+# Statuses whose orders can no longer be updated
+LOCKED_STATUSES = ["cancelled", "delivered", CANCELLING_STATUS]
+MAX_BULK_ORDERS = 10000
+IF_NONE_MATCH_DESCRIPTION = "ETag of a cached response; answered with 304 if the orders have not changed"
+
+# Helper function to build a new order row (without id) from a validated payload
+# products maps product_id -> (name, price) from the stock reservation, and
+# overrides the names and prices submitted with the order
+def build_order(
+    new_order: OrderCreate, now: datetime, products: Optional[dict] = None, reservation_id: Optional[str] = None
+) -> dict:
+    items = []
+    for item in new_order.items:
+        name, price = products[item.product_id] if products is not None else (item.product_name, item.price)
+        items.append(OrderItemRecord.shared(item.product_id, name, item.quantity, price))
+    # Calculate total amount
+    total_amount = sum(item.quantity * item.price for item in items)
 
-# Authentication dependency - validates JWT token locally
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """
-    Verify the JWT token locally without calling login service.
-    Returns user info if valid, raises 401 if invalid.
-    """
-    token = credentials.credentials
+    return {
+        "user_id": new_order.user_id,
+        "items": items,
+        "total_amount": round(total_amount, 2),
+        "status": "pending",
+        "shipping_address": new_order.shipping_address,
+        "created_at": now,
+        "updated_at": now,
+        "reservation_id": reservation_id
+    }
 
+# Helper function to reserve stock for an order through the product service.
+# Returns the reservation id and product_id -> (name, price), or (None, None)
+# when reservations are turned off. Names and prices come from the product
+# cache at the catalog version the reservation was answered with.
+async def reserve_stock(new_order: OrderCreate) -> tuple[Optional[str], Optional[dict]]:
+    if inventory is None:
+        return None, None
     try:
-        # Decode and validate JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return {
-            "user_id": payload.get("user_id"),
-            "username": payload.get("username"),
-            "role": payload.get("role")
-        }
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        reservation = await inventory.reserve(
+            [{"product_id": item.product_id, "quantity": item.quantity} for item in new_order.items]
+        )
+    except InventoryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except InventoryUnavailable:
+        raise HTTPException(status_code=503, detail="Product service unavailable")
+    try:
+        records = await product_cache.get_many(
+            [item.product_id for item in new_order.items], reservation["catalog_version"]
+        )
+    except InventoryUnavailable:
+        await release_stock(reservation["reservation_id"])
+        raise HTTPException(status_code=503, detail="Product service unavailable")
+    products = {product_id: (record["name"], record["price"]) for product_id, record in records.items()}
+    # A product deleted right after the reservation keeps the submitted name and price
+    for item in new_order.items:
+        products.setdefault(item.product_id, (item.product_name, item.price))
+    return reservation["reservation_id"], products
+
+# Helper function to keep the stock of a stored order. If the commit fails the
+# order is removed again and its reservation given back, so stock is never
+# returned for an order that exists.
+async def commit_stock(reservation_id: str, order_id: int):
+    try:
+        await inventory.commit(reservation_id)
+    except (InventoryError, InventoryUnavailable):
+        await orders_db.adelete(order_id)
+        await release_stock(reservation_id)
+        raise HTTPException(status_code=503, detail="Product service unavailable")
+
+# Helper function to give a reservation back; it expires on its own if this fails
+async def release_stock(reservation_id: str):
+    try:
+        await inventory.release(reservation_id)
+    except (InventoryError, InventoryUnavailable):
+        pass
+
+# Helper function for the error of a change the order's current status does not allow
+def status_conflict(order_id: int, action: str) -> HTTPException:
+    order = orders_db.get(order_id)
+    if order is None:
+        return HTTPException(status_code=404, detail="Order not found")
+    if order.status == CANCELLING_STATUS:
+        return HTTPException(status_code=409, detail="Order is already being cancelled")
+    return HTTPException(status_code=400, detail=f"Cannot {action} order with status '{order.status}'")
+
+# Helper function to cancel an order and return its items to stock by releasing
+# its reservation. The order is first claimed by moving it to cancelling in the
+# write transaction, so of concurrent cancels in any worker only one goes on;
+# a claim older than CANCEL_CLAIM_SECONDS was abandoned and can be taken over.
+# If the product service cannot be reached the claim is given back and the
+# cancel can be retried; the product service releases a reservation at most
+# once. Orders that never reserved stock have nothing to give back.
+async def cancel_and_release(order_id: int, changes: dict) -> OrderRecord:
+    claimed_at = datetime.now()
+    abandoned_before = to_epoch_us(claimed_at - timedelta(seconds=CANCEL_CLAIM_SECONDS))
+    previous = {}
+
+    def claimable(order: OrderRecord) -> bool:
+        if order.status in CANCELLABLE_STATUSES or (
+            order.status == CANCELLING_STATUS and order.updated_at < abandoned_before
+        ):
+            previous.update(status=order.status, updated_at=order.updated_at)
+            return True
+        return False
+
+    def claimed(order: OrderRecord) -> bool:
+        return order.status == CANCELLING_STATUS and order.updated_at == claim.updated_at
+
+    claim = await orders_db.aupdate_if(order_id, claimable, status=CANCELLING_STATUS, updated_at=claimed_at)
+    if claim is None:
+        raise status_conflict(order_id, "cancel")
+    if claim.reservation_id is not None and inventory is not None:
+        try:
+            await inventory.release(claim.reservation_id)
+        except InventoryError:
+            # Unknown to the product service (its catalog was reset since): no stock to give back
+            pass
+        except InventoryUnavailable:
+            await orders_db.aupdate_if(order_id, claimed, **previous)
+            raise HTTPException(status_code=503, detail="Product service unavailable")
+    order = await orders_db.aupdate_if(order_id, claimed, **changes)
+    if order is None:
+        # Deleted meanwhile, or the claim was taken over and that cancel finished first
+        raise status_conflict(order_id, "cancel")
+    return order
+
+# Helper function to commit the reservations of orders that were stored but not
+# committed (the service stopped in between); otherwise they would expire and
+# give the stock of existing orders back. Retries until the product service answers.
+async def reconcile_reservations():
+    while True:
+        try:
+            open_ids = await inventory.open_reservations()
+            # Iterating copies the orders under the store lock, which a shared-log write may hold for a while
+            orders = await asyncio.to_thread(list, orders_db)
+            reservation_ids = [order.reservation_id for order in orders if order.reservation_id in open_ids]
+            results = await asyncio.gather(
+                *(inventory.commit(reservation_id) for reservation_id in reservation_ids), return_exceptions=True
+            )
+        except InventoryUnavailable:
+            await asyncio.sleep(RECONCILE_RETRY_SECONDS)
+            continue
+        if any(isinstance(result, InventoryUnavailable) for result in results):
+            await asyncio.sleep(RECONCILE_RETRY_SECONDS)
+            continue
+        for reservation_id, result in zip(reservation_ids, results):
+            if isinstance(result, BaseException):
+                print(f"Could not commit reservation {reservation_id}: {result}")
+        return
 
 # 1. List all orders
 @app.get("/orders", response_model=list[Order])
-def list_orders(
+async def list_orders(
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: Optional[int] = Query(None, ge=1, le=100, description="Limit number of results"),
     offset: Optional[int] = Query(None, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     current_user: dict = Depends(verify_token)
 ):
     """
     Get all orders with optional filtering. Requires JWT authentication.
+    When limit is set and more results exist, the X-Next-Cursor response header
+    holds a cursor for the next page.
     """
-    filtered_orders = orders_db
-
-    # Apply filters
-    if user_id is not None:
-        filtered_orders = [o for o in filtered_orders if o["user_id"] == user_id]
-
-    if status:
-        if status not in VALID_STATUSES:
-            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
-        filtered_orders = [o for o in filtered_orders if o["status"] == status]
-
-    # Apply pagination
-    start = offset if offset is not None else 0
-    end = start + limit if limit is not None else len(filtered_orders)
-
-    return filtered_orders[start:end]
+    if status and status not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(ORDER_STATUSES)}")
+
+    fingerprint = filter_fingerprint(user_id=user_id, status=status or None)
+
+    after_id = None
+    if cursor is not None:
+        if offset:
+            raise HTTPException(status_code=400, detail="cursor and offset cannot be used together")
+        try:
+            after_id = decode_cursor(cursor, fingerprint)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # A user's listing only changes when that user's orders do; checked once the request is known to be valid
+    etag = make_etag(orders_db.user_version(user_id) if user_id is not None else orders_db.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Fetch one extra row to know whether another page exists
+    page = orders_db.query(
+        user_id=user_id,
+        status=status,
+        offset=offset or 0,
+        limit=limit + 1 if limit is not None else None,
+        after_id=after_id
+    )
+
+    headers = etag_headers(etag)
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].id, fingerprint)
+
+    # Records are validated on write; encode them directly instead of through response_model
+    return FastJSONResponse([order.to_dict() for order in page], headers=headers)
 
 # 2. Get order by ID
 @app.get("/orders/{order_id}", response_model=Order)
-def get_order(order_id: int, current_user: dict = Depends(verify_token)):
+async def get_order(
+    order_id: int,
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    current_user: dict = Depends(verify_token)
+):
     """
     Get a specific order by ID. Requires JWT authentication.
     """
-    for order in orders_db:
-        if order["id"] == order_id:
-            return order
-    raise HTTPException(status_code=404, detail="Order not found")
+    order = orders_db.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    etag = make_etag(orders_db.user_version(order.user_id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    # Re-read after the version so the row is at least as new as the ETag
+    order = orders_db.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return FastJSONResponse(order.to_dict(), headers=etag_headers(etag))
 
 # 3. Create new order
 @app.post("/orders", response_model=Order, status_code=201)
-def create_order(new_order: OrderCreate, current_user: dict = Depends(verify_token)):
+async def create_order(new_order: OrderCreate, current_user: dict = Depends(verify_token)):
     """
     Create a new order. Requires JWT authentication.
+    The items' stock is reserved in the product service first, and the order is
+    priced with the catalog's current prices; fails with 404 for unknown
+    products and 400 for insufficient stock.
     """
     if not new_order.items:
         raise HTTPException(status_code=400, detail="Order must contain at least one item")
 
-    # Calculate total amount
-    total_amount = sum(item.quantity * item.price for item in new_order.items)
-
-    # Generate new ID
-    next_id = max(o["id"] for o in orders_db) + 1 if orders_db else 1
-
-    now = datetime.now().isoformat()
-
-    created_order = {
-        "id": next_id,
-        "user_id": new_order.user_id,
-        "items": [item.dict() for item in new_order.items],
-        "total_amount": round(total_amount, 2),
-        "status": "pending",
-        "shipping_address": new_order.shipping_address,
-        "created_at": now,
-        "updated_at": now
-    }
-
-    orders_db.append(created_order)
-    return created_order
+    reservation_id, products = await reserve_stock(new_order)
+    try:
+        # The event loop serves other requests while the order log is fsynced
+        order = await orders_db.ainsert(build_order(new_order, datetime.now(), products, reservation_id))
+    except BaseException:
+        if reservation_id is not None:
+            await release_stock(reservation_id)
+        raise
+    if reservation_id is not None:
+        await commit_stock(reservation_id, order.id)
+    return order.to_dict()
 
 # 4. Update order
 @app.put("/orders/{order_id}", response_model=Order)
-def update_order(order_id: int, update: OrderUpdate, current_user: dict = Depends(verify_token)):
+async def update_order(order_id: int, update: OrderUpdate, current_user: dict = Depends(verify_token)):
     """
     Update an existing order (status or shipping address). Requires JWT authentication.
+    Setting the status to cancelled returns the items to stock, like the cancel endpoint,
+    and is only allowed for pending or processing orders.
     """
-    for order in orders_db:
-        if order["id"] == order_id:
-            # Validate status
-            if update.status and update.status not in VALID_STATUSES:
-                raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
-
-            # Cannot update cancelled or delivered orders
-            if order["status"] in ["cancelled", "delivered"]:
-                raise HTTPException(status_code=400, detail=f"Cannot update order with status '{order['status']}'")
-
-            # Update fields
-            if update.status is not None:
-                order["status"] = update.status
-            if update.shipping_address is not None:
-                order["shipping_address"] = update.shipping_address
-
-            order["updated_at"] = datetime.now().isoformat()
-            return order
-
-    raise HTTPException(status_code=404, detail="Order not found")
+    order = orders_db.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    # Validate status
+    if update.status and update.status not in VALID_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+
+    # Update fields; cancelled, delivered and cancelling orders cannot be updated,
+    # checked against the order as it is when the change is written
+    changes = {field: value for field, value in update.dict().items() if value is not None}
+    changes["updated_at"] = datetime.now()
+    if changes.get("status") == "cancelled":
+        return (await cancel_and_release(order_id, changes)).to_dict()
+    order = await orders_db.aupdate_if(order_id, lambda order: order.status not in LOCKED_STATUSES, **changes)
+    if order is None:
+        raise status_conflict(order_id, "update")
+    return order.to_dict()
 
 # 5. Cancel order
 @app.post("/orders/{order_id}/cancel")
-def cancel_order(order_id: int, current_user: dict = Depends(verify_token)):
+async def cancel_order(order_id: int, current_user: dict = Depends(verify_token)):
     """
-    Cancel an order. Only pending or processing orders can be cancelled. Requires JWT authentication.
+    Cancel an order and return its items to stock. Only pending or processing orders
+    can be cancelled. Requires JWT authentication.
     """
-    for order in orders_db:
-        if order["id"] == order_id:
-            if order["status"] in ["shipped", "delivered", "cancelled"]:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Cannot cancel order with status '{order['status']}'"
-                )
-
-            order["status"] = "cancelled"
-            order["updated_at"] = datetime.now().isoformat()
+    order = await cancel_and_release(order_id, {"status": "cancelled", "updated_at": datetime.now()})
 
-            return {
-                "message": "Order cancelled successfully",
-                "order_id": order_id,
-                "status": order["status"]
-            }
-
-    raise HTTPException(status_code=404, detail="Order not found")
+    return {
+        "message": "Order cancelled successfully",
+        "order_id": order_id,
+        "status": order.status
+    }
 
 # 6. Get order summary by user
 @app.get("/users/{user_id}/orders/summary")
-def get_user_order_summary(user_id: int, current_user: dict = Depends(verify_token)):
+async def get_user_order_summary(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    current_user: dict = Depends(verify_token)
+):
     """
     Get order summary for a specific user. Requires JWT authentication.
     """
-    user_orders = [o for o in orders_db if o["user_id"] == user_id]
-
-    if not user_orders:
-        return {
-            "user_id": user_id,
-            "total_orders": 0,
-            "total_spent": 0.0,
-            "orders_by_status": {}
-        }
+    etag = make_etag(orders_db.user_version(user_id))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    total_spent = sum(o["total_amount"] for o in user_orders)
+    summary = orders_db.user_summary(user_id)
 
+    # Report statuses in lifecycle order
     orders_by_status = {}
-    for status in VALID_STATUSES:
-        count = len([o for o in user_orders if o["status"] == status])
+    for status in ORDER_STATUSES:
+        count = summary["orders_by_status"].get(status, 0)
         if count > 0:
             orders_by_status[status] = count
 
-    return {
+    return FastJSONResponse({
         "user_id": user_id,
-        "total_orders": len(user_orders),
-        "total_spent": round(total_spent, 2),
+        "total_orders": summary["total_orders"],
+        "total_spent": round(summary["total_spent"], 2),
         "orders_by_status": orders_by_status
-    }
+    }, headers=etag_headers(etag))
 
 # 7. Delete order
 @app.delete("/orders/{order_id}", status_code=204)
-def delete_order(order_id: int, current_user: dict = Depends(verify_token)):
+async def delete_order(order_id: int, current_user: dict = Depends(verify_token)):
     """
     Delete an order by ID. Requires JWT authentication.
     """
-    for order in orders_db:
-        if order["id"] == order_id:
-            orders_db.remove(order)
-            return
-    raise HTTPException(status_code=404, detail="Order not found")
+    if await orders_db.adelete(order_id) is None:
+        raise HTTPException(status_code=404, detail="Order not found")
 
 # 8. Reset database
 @app.post("/reset-db")
-def reset_database():
+async def reset_database():
     """
     Reset the order database to initial state.
     """
-    orders_db.clear()
-    orders_db.extend([
-        {
-            "id": 1,
-            "user_id": 1,
-            "items": [
-                {"product_id": 1, "product_name": "Laptop", "quantity": 1, "price": 999.99},
-                {"product_id": 2, "product_name": "Wireless Mouse", "quantity": 2, "price": 29.99}
-            ],
-            "total_amount": 1059.97,
-            "status": "delivered",
-            "shipping_address": "123 Main St, City, State 12345",
-            "created_at": "2025-01-10T10:00:00",
-            "updated_at": "2025-01-15T14:30:00"
-        },
-        {
-            "id": 2,
-            "user_id": 2,
-            "items": [
-                {"product_id": 4, "product_name": "Monitor", "quantity": 1, "price": 399.99}
-            ],
-            "total_amount": 399.99,
-            "status": "pending",
-            "shipping_address": "456 Oak Ave, Town, State 67890",
-            "created_at": "2025-01-11T15:20:00",
-            "updated_at": "2025-01-11T15:20:00"
-        },
-        {
-            "id": 3,
-            "user_id": 1,
-            "items": [
-                {"product_id": 3, "product_name": "USB-C Cable", "quantity": 3, "price": 12.99}
-            ],
-            "total_amount": 38.97,
-            "status": "shipped",
-            "shipping_address": "123 Main St, City, State 12345",
-            "created_at": "2025-01-12T09:15:00",
-            "updated_at": "2025-01-13T11:00:00"
-        }
-    ])
+    await orders_db.areset()
     return {"message": "Order database reset successfully"}
+
+# 9. Create orders in bulk
+@app.post("/orders/bulk", response_model=OrderBulkResponse)
+async def create_orders_bulk(payload: OrderBulkCreate, current_user: dict = Depends(verify_token)):
+    """
+    Create up to MAX_BULK_ORDERS orders in one request. Requires JWT authentication.
+    Each order is validated and has its stock reserved on its own; valid orders
+    are created together and the response holds a created/error result per
+    submitted order.
+    """
+    if len(payload.orders) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ORDERS} orders")
+
+    now = datetime.now()
+    results = []
+    new_orders = []
+
+    # Validate every order in one pass
+    for index, raw_order in enumerate(payload.orders):
+        try:
+            new_order = OrderCreate(**raw_order)
+        except ValidationError as e:
+            detail = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            results.append({"index": index, "status": "error", "detail": detail})
+            continue
+
+        if not new_order.items:
+            results.append({"index": index, "status": "error", "detail": "Order must contain at least one item"})
+            continue
+
+        results.append({"index": index, "status": "created"})
+        new_orders.append(new_order)
+
+    # Reservations go out together in the inventory client's batches
+    reservations = await asyncio.gather(*(reserve_stock(new_order) for new_order in new_orders), return_exceptions=True)
+    for reservation in reservations:
+        if isinstance(reservation, BaseException) and not isinstance(reservation, HTTPException):
+            try:
+                # The other orders of the batch are not stored, so their stock goes back
+                await asyncio.gather(*(
+                    release_stock(other[0]) for other in reservations if isinstance(other, tuple) and other[0]
+                ))
+            finally:
+                raise reservation
+
+    created = []
+    rows = []
+    pending = iter(zip(new_orders, reservations))
+    for result in results:
+        if result["status"] != "created":
+            continue
+        new_order, reservation = next(pending)
+        if isinstance(reservation, HTTPException):
+            result.update(status="error", detail=reservation.detail)
+            continue
+        created.append((result, reservation[0]))
+        rows.append(build_order(new_order, now, reservation[1], reservation[0]))
+
+    # Assign ids and store all valid orders under one lock
+    try:
+        orders = await orders_db.ainsert_many(rows)
+    except BaseException:
+        await asyncio.gather(*(release_stock(reservation_id) for _, reservation_id in created if reservation_id))
+        raise
+
+    commits = await asyncio.gather(
+        *(commit_stock(reservation_id, order.id) for (_, reservation_id), order in zip(created, orders) if reservation_id),
+        return_exceptions=True
+    )
+    failed_commits = iter(commits)
+    for (result, reservation_id), order in zip(created, orders):
+        commit = next(failed_commits) if reservation_id else None
+        if isinstance(commit, HTTPException):
+            result.update(status="error", detail=commit.detail)
+        else:
+            result["order"] = order.to_dict()
+
+    created_count = sum(1 for result in results if result["status"] == "created")
+    return {
+        "created": created_count,
+        "failed": len(results) - created_count,
+        "results": results
+    }
+
+# 10. Auth cache metrics
+@app.get("/metrics/auth")
+async def get_auth_metrics():
+    """
+    Verified-token cache statistics (size, hits, misses, hit rate).
+    """
+    return token_cache.stats()
+
+# 11. Order log metrics
+@app.get("/metrics/storage")
+async def get_storage_metrics():
+    """
+    Write-ahead log statistics (segment, records, fsyncs, records per fsync),
+    or the shared log's when the service runs several workers.
+    """
+    stats = orders_db.log_stats()
+    shared = orders_db.shared_stats()
+    return {"durable": stats is not None or shared is not None, "log": stats, "shared": shared}
+
+# 12. Inventory client metrics
+@app.get("/metrics/inventory")
+async def get_inventory_metrics():
+    """
+    Stock reservation client statistics (batches, operations per batch, failures, queue).
+    """
+    return {"enabled": inventory is not None, "client": inventory.stats() if inventory is not None else None}
+
+# 13. Product cache metrics
+@app.get("/metrics/product-cache")
+async def get_product_cache_metrics():
+    """
+    Product cache statistics (entries, hit rate, invalidations, fetch latency).
+    """
+    return {"enabled": product_cache is not None, "cache": product_cache.stats() if product_cache is not None else None}
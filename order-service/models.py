@@ -1,7 +1,21 @@
-from datetime import datetime
+import asyncio
+import copy
+import gc
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional, Union
 
-# Order service database
-orders_db = [
+# Add parent directory to path to import the shared index helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sorted_index import SortedIdSet
+import write_ahead_log as wal
+from shared_log import CHECKPOINT_EVERY, SharedLog
+
+# Seed data used on startup and by /reset-db
+SEED_ORDERS = [
     {
         "id": 1,
         "user_id": 1,
@@ -40,3 +54,771 @@ orders_db = [
         "updated_at": "2025-01-13T11:00:00"
     }
 ]
+
+
+# Timestamps are stored as microseconds since 1970-01-01 of the naive
+# datetimes the service writes, so they round-trip exactly
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+def to_epoch_us(value: Union[int, str, datetime]) -> int:
+    """Epoch microseconds from a stored int, an ISO string or a naive datetime"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def format_timestamp(epoch_us: int) -> str:
+    return (_EPOCH + timedelta(microseconds=epoch_us)).isoformat()
+
+
+# Distinct order lines kept for sharing (see OrderItemRecord.shared)
+SHARED_ITEMS_LIMIT = 100_000
+_shared_items: dict[tuple, "OrderItemRecord"] = {}
+
+
+class OrderItemRecord:
+    """One order line. Records are immutable, so equal lines can be one object."""
+
+    __slots__ = ("product_id", "product_name", "quantity", "price")
+
+    def __init__(self, product_id: int, product_name: str, quantity: int, price: float):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.quantity = quantity
+        self.price = price
+
+    @classmethod
+    def shared(cls, product_id: int, product_name: str, quantity: int, price: float) -> "OrderItemRecord":
+        """
+        The record for this line, reusing an existing one when the same
+        product, quantity and price were ordered before. Orders repeat a few
+        catalog lines, so most orders add no item objects at all.
+        """
+        key = (product_id, product_name, quantity, price)
+        item = _shared_items.get(key)
+        if item is None:
+            item = cls(product_id, sys.intern(product_name), quantity, price)
+            if len(_shared_items) < SHARED_ITEMS_LIMIT:
+                _shared_items[key] = item
+        return item
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "OrderItemRecord":
+        return cls.shared(item["product_id"], item["product_name"], item["quantity"], item["price"])
+
+    def to_dict(self) -> dict:
+        return {
+            "product_id": self.product_id,
+            "product_name": self.product_name,
+            "quantity": self.quantity,
+            "price": self.price
+        }
+
+
+class OrderRecord:
+    """
+    One order. A slotted record instead of a dict keeps per-order overhead
+    low at millions of orders. Timestamps are epoch microseconds, formatted
+    as ISO strings only by to_dict().
+
+    Stored records are never mutated: updates build a new record with
+    replace(), so rows handed to a running snapshot stay consistent.
+    reservation_id is the product service's stock reservation for the order,
+    or None when no stock was reserved (seed orders, reservations turned off).
+    """
+
+    __slots__ = (
+        "id", "user_id", "items", "total_amount", "status", "shipping_address", "created_at", "updated_at",
+        "reservation_id"
+    )
+
+    def __init__(
+        self,
+        id: int,
+        user_id: int,
+        items: tuple,
+        total_amount: float,
+        status: str,
+        shipping_address: str,
+        created_at: int,
+        updated_at: int,
+        reservation_id: Optional[str] = None
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.items = items
+        self.total_amount = total_amount
+        self.status = sys.intern(status)
+        # A user's orders usually share one address
+        self.shipping_address = sys.intern(shipping_address)
+        self.created_at = created_at
+        # Share the int object when the order was never updated
+        self.updated_at = created_at if updated_at == created_at else updated_at
+        self.reservation_id = reservation_id
+
+    @classmethod
+    def from_dict(cls, order: dict) -> "OrderRecord":
+        """
+        Build a record from an order row. Items may be dicts or OrderItemRecords;
+        timestamps may be ISO strings, datetimes or epoch microseconds.
+        """
+        return cls(
+            order["id"],
+            order["user_id"],
+            tuple(
+                item if isinstance(item, OrderItemRecord) else OrderItemRecord.from_dict(item)
+                for item in order["items"]
+            ),
+            order["total_amount"],
+            order["status"],
+            order["shipping_address"],
+            to_epoch_us(order["created_at"]),
+            to_epoch_us(order["updated_at"]),
+            order.get("reservation_id")
+        )
+
+    @classmethod
+    def from_row(cls, row: Union[list, dict]) -> "OrderRecord":
+        """Decode a log or snapshot row (see to_row); dict rows come from older logs"""
+        if isinstance(row, dict):
+            return cls.from_dict(row)
+        # Rows of orders without a reservation leave it out
+        order_id, user_id, items, total_amount, status, shipping_address, created_at, updated_at, *reservation = row
+        return cls(
+            order_id,
+            user_id,
+            tuple(OrderItemRecord.shared(*item) for item in items),
+            total_amount,
+            status,
+            shipping_address,
+            created_at,
+            updated_at,
+            reservation[0] if reservation else None
+        )
+
+    def to_dict(self) -> dict:
+        """The API representation"""
+        created_at = format_timestamp(self.created_at)
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "items": [item.to_dict() for item in self.items],
+            "total_amount": self.total_amount,
+            "status": self.status,
+            "shipping_address": self.shipping_address,
+            "created_at": created_at,
+            "updated_at": created_at if self.updated_at == self.created_at else format_timestamp(self.updated_at)
+        }
+
+    def to_row(self) -> list:
+        """Compact JSON-serializable form for the write-ahead log and snapshots"""
+        row = [
+            self.id,
+            self.user_id,
+            [[item.product_id, item.product_name, item.quantity, item.price] for item in self.items],
+            self.total_amount,
+            self.status,
+            self.shipping_address,
+            self.created_at,
+            self.updated_at
+        ]
+        if self.reservation_id is not None:
+            row.append(self.reservation_id)
+        return row
+
+    def replace(self, changes: dict) -> "OrderRecord":
+        """A copy with some fields changed (timestamps in any form to_epoch_us accepts)"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        for field in TIMESTAMP_FIELDS:
+            values[field] = to_epoch_us(values[field])
+        return OrderRecord(**values)
+
+
+class OrderStore:
+    """
+    In-memory order table.
+    Orders are indexed by id (primary key), by user_id and by status. The
+    secondary indexes are kept in sync through status changes and deletes,
+    so lookups and filtered listings never scan the whole table.
+
+    Per-user aggregates (order count, amount spent in cents and counts by
+    status) are maintained on every write so user summaries are O(1).
+
+    Writes are serialized by a single store lock so id assignment and index
+    maintenance stay consistent. The lock covers only the in-memory change and
+    queueing the log record, never the fsync, so async handlers can write from
+    the event loop: the a-prefixed methods (ainsert, aupdate, ...) apply the
+    change the same way and then await durability instead of blocking. Reads
+    take no lock and tolerate a write being applied in a worker thread at the
+    same time (a query skips an order deleted under it); iterating the store
+    takes a copy under the lock.
+
+    After open(data_dir) the store is durable: every write appends a record
+    to a write-ahead log and returns once it is fsynced (concurrent writers
+    share fsyncs), and a snapshot is taken every snapshot_every records so
+    restarts only replay the log tail. Updates replace the order record
+    instead of mutating it, so a snapshot can copy the table under the lock
+    and serialize it outside.
+
+    Several worker processes can share the store instead (share(path)):
+    writes then go through a SQLite change log that every worker replays, and
+    refresh() applies the other workers' writes before a read.
+
+    Orders are held as OrderRecords; handlers call to_dict() to serialize.
+
+    Every write bumps version; user_version(user_id) is the version at
+    which that user's orders last changed. The read endpoints turn them
+    into ETags.
+    """
+
+    SNAPSHOT_BATCH_SIZE = 10000
+    # Larger bulk inserts hold the lock long enough to stall the event loop, so they run in a thread
+    INLINE_BATCH_ROWS = 500
+
+    def __init__(self, orders: Iterable[dict] = ()):
+        self._by_id: dict[int, OrderRecord] = {}
+        self._ids = SortedIdSet()
+        self._by_user: dict[int, SortedIdSet] = {}
+        self._by_status: dict[str, SortedIdSet] = {}
+        self._summaries: dict[int, dict] = {}
+        self._next_id = 1
+        self._version = 0
+        # user_id -> version of the user's last change; users missing here last changed at _loaded_version
+        self._user_versions: dict[int, int] = {}
+        self._loaded_version = 0
+        self._lock = threading.Lock()
+        self._log: Optional[wal.WriteAheadLog] = None
+        self._snapshot_every = 0
+        self._records_since_snapshot = 0
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._shared: Optional[SharedLog] = None
+        # Async writes running in a worker thread (counted on the event loop)
+        self._threaded_writes = 0
+        self.load(orders)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[OrderRecord]:
+        # A copy taken under the lock: a write may be applied in a worker thread meanwhile.
+        # ids are handed out monotonically, so insertion order is id order
+        with self._lock:
+            orders = list(self._by_id.values())
+        return iter(orders)
+
+    @property
+    def version(self) -> int:
+        """
+        Bumped after every write. Read it before the rows: a response may then
+        hold newer data than its version, but never older.
+        """
+        return self._version
+
+    def user_version(self, user_id: int) -> int:
+        """Version at which the given user's orders last changed"""
+        return self._user_versions.get(user_id, self._loaded_version)
+
+    def load(self, orders: Iterable[dict]):
+        """Replace the whole table with the given order rows (ids are kept)."""
+        self._wait_durable(self._apply_load(orders))
+
+    async def aload(self, orders: Iterable[dict]):
+        await self._wait_durable_async(await self._apply_async(self._apply_load, orders))
+
+    def open(self, data_dir: str, sync: bool = True, snapshot_every: int = 100_000):
+        """
+        Make the store durable in data_dir: load the newest snapshot, replay
+        the log after it, then log every write. An empty directory is
+        initialised with a snapshot of the current contents.
+        """
+        os.makedirs(data_dir, exist_ok=True)
+        segments, snapshots = wal.list_files(data_dir)
+        # Recovery allocates millions of long-lived objects; collector passes over them are wasted work
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._recover(data_dir, segments, snapshots, sync, snapshot_every)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        if not snapshots:
+            self.snapshot()
+
+    def share(self, path: str, sync: bool = True, checkpoint_every: int = CHECKPOINT_EVERY) -> str:
+        """
+        Keep the store in step with the service's other worker processes
+        through the shared log at path, starting from its checkpoint and
+        replaying the records after it. Used instead of open(). Returns the
+        log's id (see SharedLog).
+        """
+        with self._lock:
+            self._shared = SharedLog(
+                path, self._replay, self._dump, self._restore, sync=sync, checkpoint_every=checkpoint_every
+            )
+            self._shared.catch_up()
+        return self._shared.id
+
+    def refresh(self):
+        """Apply the writes other workers committed since the last call (no-op unless shared)"""
+        shared = self._shared
+        if shared is not None and shared.changed():
+            with self._lock:
+                shared.catch_up()
+
+    async def arefresh(self):
+        """Like refresh(), applying the writes in a worker thread so the event loop never waits for the lock"""
+        shared = self._shared
+        if shared is not None and shared.changed():
+            await asyncio.to_thread(self.refresh)
+
+    def close(self):
+        """
+        Flush and close the log. No snapshot is taken, so shutdown stays fast;
+        the next start replays at most snapshot_every records.
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                log, self._log = self._log, None
+                shared, self._shared = self._shared, None
+        if log is not None:
+            log.close()
+        if shared is not None:
+            shared.close()
+
+    def snapshot(self):
+        """Write a snapshot of the current table and drop the log segments it covers."""
+        with self._snapshot_lock:
+            with self._lock:
+                log = self._log
+                if log is None:
+                    return
+                # New writes go to the next segment; the snapshot covers everything before it.
+                # Rotating only queues the switch, so writers are not held up by an fsync
+                segment, last_sequence = log.rotate()
+                orders = list(self._by_id.values())
+                next_id = self._next_id
+                self._records_since_snapshot = 0
+
+            # The snapshot only holds durable writes: wait for the old segment, outside the lock
+            try:
+                log.wait(last_sequence)
+            except IOError:
+                # The log failed and so do the writes; there is nothing to snapshot
+                return
+
+            data_dir = log.directory
+            batch_size = self.SNAPSHOT_BATCH_SIZE
+            wal.write_snapshot(
+                data_dir,
+                segment,
+                {"segment": segment, "next_id": next_id, "orders": len(orders)},
+                ([order.to_row() for order in orders[i:i + batch_size]] for i in range(0, len(orders), batch_size))
+            )
+
+            segments, snapshots = wal.list_files(data_dir)
+            for number in segments:
+                if number < segment:
+                    os.remove(wal.segment_path(data_dir, number))
+            for number in snapshots:
+                if number < segment:
+                    os.remove(wal.snapshot_path(data_dir, number))
+            wal.fsync_directory(data_dir)
+
+    def log_stats(self) -> Optional[dict]:
+        """Write-ahead log counters, or None when the store is not durable"""
+        log = self._log
+        return log.stats() if log is not None else None
+
+    def shared_stats(self) -> Optional[dict]:
+        """Shared log counters, or None when the store is not shared"""
+        shared = self._shared
+        return shared.stats() if shared is not None else None
+
+    def reset(self):
+        """Restore the seed orders."""
+        self.load(copy.deepcopy(SEED_ORDERS))
+
+    async def areset(self):
+        await self.aload(copy.deepcopy(SEED_ORDERS))
+
+    def get(self, order_id: int) -> Optional[OrderRecord]:
+        return self._by_id.get(order_id)
+
+    def user_summary(self, user_id: int) -> dict:
+        """
+        Running totals for a user: total_orders, total_spent and
+        orders_by_status (status -> count, only non-zero counts).
+        """
+        summary = self._summaries.get(user_id)
+        if summary is None:
+            return {"total_orders": 0, "total_spent": 0.0, "orders_by_status": {}}
+        return {
+            "total_orders": summary["total_orders"],
+            "total_spent": summary["total_cents"] / 100,
+            "orders_by_status": dict(summary["orders_by_status"])
+        }
+
+    def insert(self, fields: dict) -> OrderRecord:
+        """Insert a new order (row fields without id), assigning the next id."""
+        orders, sequence = self._apply_insert([fields])
+        self._wait_durable(sequence)
+        return orders[0]
+
+    async def ainsert(self, fields: dict) -> OrderRecord:
+        orders, sequence = await self._apply_async(self._apply_insert, [fields])
+        await self._wait_durable_async(sequence)
+        return orders[0]
+
+    def insert_many(self, rows: list[dict]) -> list[OrderRecord]:
+        """Insert several orders under one lock, assigning a contiguous block of ids."""
+        orders, sequence = self._apply_insert(rows)
+        self._wait_durable(sequence)
+        return orders
+
+    async def ainsert_many(self, rows: list[dict]) -> list[OrderRecord]:
+        orders, sequence = await self._apply_batch_async(len(rows), self._apply_insert, rows)
+        await self._wait_durable_async(sequence)
+        return orders
+
+    def update(self, order_id: int, **changes) -> OrderRecord:
+        """Apply field changes to an order, keeping the status index in sync."""
+        order, sequence = self._apply_update(order_id, changes)
+        self._wait_durable(sequence)
+        return order
+
+    async def aupdate(self, order_id: int, **changes) -> OrderRecord:
+        order, sequence = await self._apply_async(self._apply_update, order_id, changes)
+        await self._wait_durable_async(sequence)
+        return order
+
+    def update_if(self, order_id: int, check: Callable[[OrderRecord], bool], **changes) -> Optional[OrderRecord]:
+        """
+        Apply field changes only if check(order) holds for the current order,
+        tested under the write lock (with a shared log, against every worker's
+        writes). Returns the updated order, or None if it is missing or the check failed.
+        """
+        order, sequence = self._apply_update_if(order_id, check, changes)
+        self._wait_durable(sequence)
+        return order
+
+    async def aupdate_if(
+        self, order_id: int, check: Callable[[OrderRecord], bool], **changes
+    ) -> Optional[OrderRecord]:
+        order, sequence = await self._apply_async(self._apply_update_if, order_id, check, changes)
+        await self._wait_durable_async(sequence)
+        return order
+
+    def delete(self, order_id: int) -> Optional[OrderRecord]:
+        """Remove an order. Returns the removed row, or None if it did not exist."""
+        order, sequence = self._apply_delete(order_id)
+        self._wait_durable(sequence)
+        return order
+
+    async def adelete(self, order_id: int) -> Optional[OrderRecord]:
+        order, sequence = await self._apply_async(self._apply_delete, order_id)
+        await self._wait_durable_async(sequence)
+        return order
+
+    def query(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> list[OrderRecord]:
+        """
+        Return orders matching the filters, in id order.
+        Candidates come from the smaller of the user and status indexes and
+        the scan stops once offset + limit matches have been found.
+        """
+        indexes = [self._ids]
+        if user_id is not None:
+            indexes.append(self._by_user.get(user_id, SortedIdSet()))
+        if status:
+            indexes.append(self._by_status.get(status, SortedIdSet()))
+        candidate_ids = min(indexes, key=len).iter_from(after_id)
+
+        results = []
+        skipped = 0
+        for order_id in candidate_ids:
+            order = self._by_id.get(order_id)
+            # Deleted by a write running in a worker thread
+            if order is None:
+                continue
+            if user_id is not None and order.user_id != user_id:
+                continue
+            if status and order.status != status:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            results.append(order)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    # The _apply_* methods make a change under the store lock and queue its log
+    # record; callers then wait for the returned sequence number to be durable.
+    # A shared log commits the record before the store lock is released instead,
+    # so the async writes run them in a worker thread when the store is shared,
+    # as they do for large batches and while another write runs in a thread.
+
+    async def _apply_async(self, apply, *args):
+        """Run an _apply_* method: inline when it cannot make the event loop wait for the lock"""
+        if self._shared is None and not self._threaded_writes:
+            return apply(*args)
+        return await self._apply_in_thread(apply, *args)
+
+    async def _apply_batch_async(self, size: int, apply, *args):
+        """Like _apply_async; batches of more than INLINE_BATCH_ROWS rows always run in a thread"""
+        if size > self.INLINE_BATCH_ROWS:
+            return await self._apply_in_thread(apply, *args)
+        return await self._apply_async(apply, *args)
+
+    async def _apply_in_thread(self, apply, *args):
+        self._threaded_writes += 1
+        try:
+            return await asyncio.to_thread(apply, *args)
+        finally:
+            self._threaded_writes -= 1
+
+    @contextmanager
+    def _writing(self):
+        """Hold the store lock and, when shared, the other workers' write lock with their writes applied"""
+        with self._lock:
+            if self._shared is None:
+                yield
+            else:
+                with self._shared.transaction():
+                    yield
+
+    def _apply_load(self, orders: Iterable[dict]) -> Optional[int]:
+        orders = [OrderRecord.from_dict(order) for order in orders]
+        with self._writing():
+            self._replace(orders)
+            return self._write_log(["load", [order.to_row() for order in orders]])
+
+    def _apply_insert(self, rows: list[dict]) -> tuple[list[OrderRecord], Optional[int]]:
+        with self._writing():
+            first_id = self._next_id
+            orders = [OrderRecord.from_dict({"id": first_id + offset, **fields}) for offset, fields in enumerate(rows)]
+            for order in orders:
+                self._add(order)
+            return orders, self._write_log(["insert", [order.to_row() for order in orders]])
+
+    def _apply_update(self, order_id: int, changes: dict) -> tuple[OrderRecord, Optional[int]]:
+        with self._writing():
+            order = self._update(order_id, changes)
+            # Log the stored form (epoch timestamps) of the changed fields
+            return order, self._write_log(["update", order_id, {field: getattr(order, field) for field in changes}])
+
+    def _apply_update_if(
+        self, order_id: int, check: Callable[[OrderRecord], bool], changes: dict
+    ) -> tuple[Optional[OrderRecord], Optional[int]]:
+        with self._writing():
+            order = self._by_id.get(order_id)
+            if order is None or not check(order):
+                return None, None
+            order = self._update(order_id, changes)
+            return order, self._write_log(["update", order_id, {field: getattr(order, field) for field in changes}])
+
+    def _apply_delete(self, order_id: int) -> tuple[Optional[OrderRecord], Optional[int]]:
+        with self._writing():
+            order = self._delete(order_id)
+            return order, self._write_log(["delete", order_id]) if order is not None else None
+
+    def _recover(self, data_dir: str, segments: list[int], snapshots: list[int], sync: bool, snapshot_every: int):
+        with self._lock:
+            if snapshots:
+                header, rows = wal.read_snapshot(data_dir, snapshots[-1])
+                self._replace([OrderRecord.from_row(row) for row in rows])
+                self._next_id = max(self._next_id, header["next_id"])
+                first_segment = header["segment"]
+            else:
+                first_segment = segments[0] if segments else 1
+
+            replay = [number for number in segments if number >= first_segment] or [first_segment]
+            valid_length = None
+            for number in replay:
+                path = wal.segment_path(data_dir, number)
+                if not os.path.exists(path):
+                    continue
+                records, valid_length = wal.read_frames(path)
+                if valid_length < os.path.getsize(path):
+                    print(f"Order log {path}: ignoring torn or corrupt data after byte {valid_length}")
+                for record in records:
+                    self._replay(record)
+
+            self._log = wal.WriteAheadLog(data_dir, replay[-1], valid_length, sync=sync)
+            self._snapshot_every = snapshot_every
+            self._records_since_snapshot = 0
+
+    def _replace(self, orders: list[OrderRecord]):
+        # Bulk build: group ids first and create each index set once
+        orders = sorted(orders, key=lambda o: o.id)
+        self._by_id = {order.id: order for order in orders}
+        by_user: dict[int, list[int]] = {}
+        by_status: dict[str, list[int]] = {}
+        self._summaries = {}
+        for order in orders:
+            order_id = order.id
+            user_ids = by_user.get(order.user_id)
+            if user_ids is None:
+                user_ids = by_user[order.user_id] = []
+            user_ids.append(order_id)
+            status_ids = by_status.get(order.status)
+            if status_ids is None:
+                status_ids = by_status[order.status] = []
+            status_ids.append(order_id)
+            self._summarize(order, 1)
+        self._ids = SortedIdSet(self._by_id)
+        self._by_user = {user_id: SortedIdSet(ids) for user_id, ids in by_user.items()}
+        self._by_status = {status: SortedIdSet(ids) for status, ids in by_status.items()}
+        self._next_id = orders[-1].id + 1 if orders else 1
+        # Every user changed at once
+        self._version += 1
+        self._user_versions = {}
+        self._loaded_version = self._version
+
+    def _add(self, order: OrderRecord):
+        order_id = order.id
+        self._by_id[order_id] = order
+        self._ids.add(order_id)
+        self._index(self._by_user, order.user_id, order_id)
+        self._index(self._by_status, order.status, order_id)
+        self._summarize(order, 1)
+        self._next_id = max(self._next_id, order_id + 1)
+        self._touch(order.user_id)
+
+    def _update(self, order_id: int, changes: dict) -> OrderRecord:
+        old_order = self._by_id[order_id]
+        # Copy on write: records handed to a running snapshot are never mutated
+        order = old_order.replace(changes)
+        if order.status != old_order.status:
+            self._unindex(self._by_status, old_order.status, order_id)
+            self._index(self._by_status, order.status, order_id)
+        self._summarize(old_order, -1)
+        self._by_id[order_id] = order
+        self._summarize(order, 1)
+        self._touch(order.user_id)
+        return order
+
+    def _delete(self, order_id: int) -> Optional[OrderRecord]:
+        order = self._by_id.pop(order_id, None)
+        if order is not None:
+            self._ids.discard(order_id)
+            self._unindex(self._by_user, order.user_id, order_id)
+            self._unindex(self._by_status, order.status, order_id)
+            self._summarize(order, -1)
+            self._touch(order.user_id)
+        return order
+
+    def _replay(self, record: list):
+        """Apply one write-ahead log record during recovery"""
+        op = record[0]
+        if op == "insert":
+            for row in record[1]:
+                self._add(OrderRecord.from_row(row))
+        elif op == "update":
+            if record[1] in self._by_id:
+                self._update(record[1], record[2])
+        elif op == "delete":
+            self._delete(record[1])
+        elif op == "load":
+            self._replace([OrderRecord.from_row(row) for row in record[1]])
+
+    def _dump(self) -> dict:
+        """The whole table and its counters, for a shared-log checkpoint (caller holds the store lock)"""
+        return {
+            "orders": [order.to_row() for order in self._by_id.values()],
+            "next_id": self._next_id,
+            "version": self._version,
+            # JSON object keys are strings; user ids go in as pairs
+            "user_versions": list(self._user_versions.items()),
+            "loaded_version": self._loaded_version
+        }
+
+    def _restore(self, state: dict):
+        """Replace the table with a shared-log checkpoint (see _dump)"""
+        self._replace([OrderRecord.from_row(row) for row in state["orders"]])
+        self._next_id = state["next_id"]
+        self._version = state["version"]
+        self._user_versions = dict(state["user_versions"])
+        self._loaded_version = state["loaded_version"]
+
+    def _write_log(self, record: list) -> Optional[int]:
+        """Queue a log record (caller holds the store lock); returns its sequence number"""
+        if self._shared is not None:
+            self._shared.append(record)
+            return None
+        if self._log is None:
+            return None
+        sequence = self._log.append(record)
+        self._records_since_snapshot += 1
+        if self._snapshot_every and self._records_since_snapshot >= self._snapshot_every:
+            self._records_since_snapshot = 0
+            if self._snapshot_thread is None or not self._snapshot_thread.is_alive():
+                self._snapshot_thread = threading.Thread(target=self.snapshot, name="order-snapshot", daemon=True)
+                self._snapshot_thread.start()
+        return sequence
+
+    def _wait_durable(self, sequence: Optional[int]):
+        """Wait for a log record to be fsynced (called after releasing the store lock)"""
+        log = self._log
+        if sequence is not None and log is not None:
+            log.wait(sequence)
+
+    async def _wait_durable_async(self, sequence: Optional[int]):
+        """Like _wait_durable, but the event loop keeps running while the log flushes"""
+        log = self._log
+        if sequence is not None and log is not None:
+            await log.wait_async(sequence)
+
+    def _touch(self, user_id: int):
+        """Record a change to a user's orders (after it is applied, see version)"""
+        self._version += 1
+        self._user_versions[user_id] = self._version
+
+    def _summarize(self, order: OrderRecord, sign: int):
+        """Add (sign=1) or remove (sign=-1) an order from its user's running totals."""
+        user_id = order.user_id
+        summary = self._summaries.get(user_id)
+        if summary is None:
+            summary = self._summaries[user_id] = {"total_orders": 0, "total_cents": 0, "orders_by_status": {}}
+        summary["total_orders"] += sign
+        summary["total_cents"] += sign * round(order.total_amount * 100)
+        by_status = summary["orders_by_status"]
+        count = by_status.get(order.status, 0) + sign
+        if count:
+            by_status[order.status] = count
+        else:
+            del by_status[order.status]
+        if not summary["total_orders"]:
+            del self._summaries[user_id]
+
+    @staticmethod
+    def _index(index: dict, key, order_id: int):
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = SortedIdSet()
+        ids.add(order_id)
+
+    @staticmethod
+    def _unindex(index: dict, key, order_id: int):
+        ids = index[key]
+        ids.discard(order_id)
+        if not ids:
+            del index[key]
+
+
+# Order service database
+orders_db = OrderStore(copy.deepcopy(SEED_ORDERS))
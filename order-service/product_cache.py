@@ -0,0 +1,165 @@
+# Read-through cache of product records (name, price, SKU) from the product service
+# Orders are priced from these records. Every product service response carries
+# the catalog version its data belongs to, and the version only changes with
+# names, prices and SKUs (not with stock), so the cache can be kept until the
+# version moves: a reservation answered at a different version than the cached
+# one drops the cache before the order's products are read. Entries also expire
+# after a TTL, and the cache is bounded by entry count (LRU).
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Iterable, Optional
+
+# Fetch latencies kept for the percentile metrics
+LATENCY_SAMPLES = 1000
+
+
+class ProductCache:
+    """
+    Products missing from the cache are fetched with a single call per
+    get_many(); concurrent calls wait for a fetch already in flight for the
+    same product instead of fetching it again. fetch(ids) returns
+    (catalog_version, {product_id: record}) and leaves out unknown ids.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[int]], Awaitable[tuple[str, dict[int, dict]]]],
+        max_entries: int = 10000,
+        ttl_seconds: float = 60.0
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.fetched_products = 0
+        self._fetch = fetch
+        # product_id -> (expires_at, record)
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        # product_id -> future of the fetch that is loading it
+        self._inflight: dict[int, asyncio.Future] = {}
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    async def get_many(self, product_ids: Iterable[int], version: Optional[str] = None) -> dict[int, dict]:
+        """
+        Records for these products, fetching the missing ones. With a version,
+        the cache is dropped first unless it holds that catalog version.
+        Unknown products are left out.
+        """
+        if version is not None and version != self.version:
+            self._invalidate(version)
+
+        now = time.monotonic()
+        found = {}
+        missing = []
+        waiting = []
+        for product_id in dict.fromkeys(product_ids):
+            entry = self._entries.get(product_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(product_id)
+                    self.hits += 1
+                    found[product_id] = entry[1]
+                    continue
+                del self._entries[product_id]
+                self.expired += 1
+            self.misses += 1
+            inflight = self._inflight.get(product_id)
+            if inflight is not None:
+                waiting.append((product_id, inflight))
+            else:
+                missing.append(product_id)
+
+        if missing:
+            found.update(await self._load(missing))
+        for product_id, inflight in waiting:
+            records = await inflight
+            if product_id in records:
+                found[product_id] = records[product_id]
+        return found
+
+    def clear(self):
+        self._entries.clear()
+        self._inflight = {}
+        self._latencies.clear()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.fetched_products = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        latencies = sorted(self._latencies)
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "catalog_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "products_per_fetch": round(self.fetched_products / self.fetches, 2) if self.fetches else 0.0,
+            "fetch_ms_p50": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            "fetch_ms_p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 3) if latencies else None,
+            "fetch_ms_max": round(latencies[-1] * 1000, 3) if latencies else None
+        }
+
+    async def _load(self, product_ids: list[int]) -> dict[int, dict]:
+        future = asyncio.get_running_loop().create_future()
+        # Waiters re-raise a failed fetch themselves; this keeps an unawaited failure quiet
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        for product_id in product_ids:
+            self._inflight[product_id] = future
+        self.fetches += 1
+        self.fetched_products += len(product_ids)
+        start = time.perf_counter()
+        try:
+            version, records = await self._fetch(product_ids)
+        except Exception as e:
+            self.fetch_errors += 1
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            self._latencies.append(time.perf_counter() - start)
+            if self.version is None:
+                self.version = version
+            # Records of another version are returned but not kept: only the versions
+            # callers pass in move the cache, so late responses cannot flip it back
+            if version == self.version:
+                expires_at = time.monotonic() + self.ttl_seconds
+                for product_id, record in records.items():
+                    self._entries[product_id] = (expires_at, record)
+                    self._entries.move_to_end(product_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            future.set_result(records)
+            return records
+        finally:
+            for product_id in product_ids:
+                if self._inflight.get(product_id) is future:
+                    del self._inflight[product_id]
+
+    def _invalidate(self, version: str):
+        if self.version is not None:
+            self.invalidations += 1
+        self._entries.clear()
+        # Fetches already in flight may return the old version; new lookups start their own
+        self._inflight = {}
+        self.version = version
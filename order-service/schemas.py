@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Any
 from datetime import datetime
 
 class OrderItem(BaseModel):
@@ -23,6 +23,21 @@ class OrderUpdate(BaseModel):
 class Order(OrderBase):
     id: int
     total_amount: float
-    status: str  # pending, processing, shipped, delivered, cancelled
+    status: str  # pending, processing, shipped, delivered, cancelling, cancelled
     created_at: datetime
     updated_at: datetime
+
+class OrderBulkCreate(BaseModel):
+    # Items are validated one by one so a bad order fails alone instead of the whole batch
+    orders: List[dict[str, Any]]
+
+class OrderBulkResult(BaseModel):
+    index: int
+    status: str  # created, error
+    order: Optional[Order] = None
+    detail: Optional[str] = None
+
+class OrderBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBulkResult]
@@ -0,0 +1,92 @@
+# Shared cache of serialized response pages for the list endpoints
+# Pages are cached as encoded bytes, so a hit skips both the query and the
+# JSON encoding. Every entry records the store version it was built from;
+# a lookup passes the current version for the same key and a mismatch counts
+# as a miss. Writes therefore invalidate exactly the pages whose version they
+# bump (see ProductStore.category_version), and a page built from data read
+# before a write can never be served after it.
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Rough per-entry bookkeeping cost (key tuple, OrderedDict node, entry tuple)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class PageCache:
+    """
+    LRU cache of (body, headers) pages bounded by total bytes. Pages larger
+    than max_entry_bytes (default: a quarter of the budget) are not cached,
+    so one huge listing cannot flush everything else. A max_bytes of 0
+    disables caching.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._bytes = 0
+        # key -> (version, body, headers, size)
+        self._entries: OrderedDict[Hashable, tuple[int, bytes, dict, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[tuple[bytes, dict]]:
+        """The cached (body, headers) for key if it was built at this version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], entry[2]
+                # Built before a write that touched it
+                self._remove(key)
+                self.stale += 1
+            self.misses += 1
+        return None
+
+    def put(self, key: Hashable, version: int, body: bytes, headers: dict):
+        size = len(body) + sum(len(name) + len(value) for name, value in headers.items()) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                if self._entries[key][0] > version:
+                    # A concurrent request already cached a newer page
+                    return
+                self._remove(key)
+            self._entries[key] = (version, body, headers, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.stale = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale": self.stale,
+            "evictions": self.evictions
+        }
+
+    def _remove(self, key: Hashable):
+        self._bytes -= self._entries.pop(key)[3]
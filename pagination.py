@@ -0,0 +1,41 @@
+# Shared keyset pagination helpers for the list endpoints
+# A cursor is an opaque token holding the last id of the previous page and a
+# fingerprint of the filters it was issued for.
+
+import base64
+import hashlib
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to different filters."""
+
+
+def filter_fingerprint(**filters) -> str:
+    """Stable short digest of the normalized filter values."""
+    normalized = json.dumps(filters, sort_keys=True, default=str)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(last_id: int, fingerprint: str) -> str:
+    raw = json.dumps({"after": last_id, "filters": fingerprint}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    """Return the last seen id encoded in the cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = data["after"]
+        cursor_fingerprint = data["filters"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+    if not isinstance(last_id, int):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_fingerprint != fingerprint:
+        raise InvalidCursor("Cursor does not match the current filters")
+    return last_id
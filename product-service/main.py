@@ -1,21 +1,51 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import FastAPI, HTTPException, Query, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .models import products_db
-from .schemas import Product, ProductCreate, ProductUpdate
+from .schemas import (
+    Product, ProductCreate, ProductUpdate, ProductBulkUpsert, ProductBulkUpsertResponse, StockBulkAdjust,
+    ReservationBatch, ProductLookup
+)
 from typing import Optional
-import jwt
+from contextlib import asynccontextmanager
 import sys
 import os
 
-# Add parent directory to path to import jwt_config
+# Add parent directory to path to import the shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from jwt_config import SECRET_KEY, ALGORITHM
+from auth import verify_token, token_cache
+from pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint
+from fast_json import FastJSONResponse, dumps
+from etags import ETAG_HEADER, etag_headers, etag_matches, make_etag, not_modified, use_instance
+from page_cache import PageCache
+from shared_log import RefreshMiddleware
+
+# Columnar catalog snapshot; when set, loaded at startup if present and rewritten at shutdown
+PRODUCT_SNAPSHOT_FILE = os.getenv("PRODUCT_SNAPSHOT_FILE", "")
+# SQLite change log shared by the service's worker processes (uvicorn --workers); every
+# worker replays it, so all of them serve the same catalog. Replaces the snapshot file.
+PRODUCT_SHARED_LOG = os.getenv("PRODUCT_SHARED_LOG", "")
+# Memory budget for cached /products pages; 0 disables the cache
+PRODUCT_PAGE_CACHE_BYTES = int(os.getenv("PRODUCT_PAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+page_cache = PageCache(PRODUCT_PAGE_CACHE_BYTES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workers replay the whole shared log; a snapshot one of them wrote would be applied twice
+    if PRODUCT_SHARED_LOG:
+        use_instance(products_db.share(PRODUCT_SHARED_LOG))
+    # Memory-map the catalog instead of building it in memory
+    elif PRODUCT_SNAPSHOT_FILE and os.path.exists(PRODUCT_SNAPSHOT_FILE):
+        products_db.load_snapshot(PRODUCT_SNAPSHOT_FILE)
+    yield
+    if PRODUCT_SNAPSHOT_FILE and not PRODUCT_SHARED_LOG:
+        products_db.save_snapshot(PRODUCT_SNAPSHOT_FILE)
 
 app = FastAPI(
     title="Product Management API",
     description="Independent service for managing products and inventory (Requires JWT Authentication)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -25,228 +55,364 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
-security = HTTPBearer()
+# Apply the other workers' writes before each request
+if PRODUCT_SHARED_LOG:
+    app.add_middleware(RefreshMiddleware, stores=[products_db])
 
-# Authentication dependency - validates JWT token locally
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """
-    Verify the JWT token locally without calling login service.
-    Returns user info if valid, raises 401 if invalid.
-    """
-    token = credentials.credentials
+MAX_BULK_ITEMS = 50000
+MAX_RESERVATION_OPERATIONS = 10000
+IF_NONE_MATCH_DESCRIPTION = "ETag of a cached response; answered with 304 if the catalog has not changed"
 
-    try:
-        # Decode and validate JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return {
-            "user_id": payload.get("user_id"),
-            "username": payload.get("username"),
-            "role": payload.get("role")
-        }
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+# Helper function to combine the quantities of repeated products
+def combine_items(items) -> dict[int, int]:
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
 
 # 1. List all products
 @app.get("/products", response_model=list[Product])
-def list_products(
+async def list_products(
     category: Optional[str] = Query(None, description="Filter by category"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
     in_stock: Optional[bool] = Query(None, description="Filter by stock availability"),
     limit: Optional[int] = Query(None, ge=1, le=100, description="Limit number of results"),
     offset: Optional[int] = Query(None, ge=0, description="Offset for pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
     current_user: dict = Depends(verify_token)
 ):
     """
     Get all products with optional filtering. Requires JWT authentication.
+    When limit is set and more results exist, the X-Next-Cursor response header
+    holds a cursor for the next page.
     """
-    filtered_products = products_db
+    category_key = category.lower() if category else None
+    fingerprint = filter_fingerprint(
+        category=category_key,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock
+    )
 
-    # Apply filters
-    if category:
-        filtered_products = [p for p in filtered_products if p["category"].lower() == category.lower()]
+    after_id = None
+    if cursor is not None:
+        if offset:
+            raise HTTPException(status_code=400, detail="cursor and offset cannot be used together")
+        try:
+            after_id = decode_cursor(cursor, fingerprint)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    if min_price is not None:
-        filtered_products = [p for p in filtered_products if p["price"] >= min_price]
+    # A category page only changes with writes to that category; other pages with any write
+    version = products_db.category_version(category_key) if category_key else products_db.version
+    etag = make_etag(version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    if max_price is not None:
-        filtered_products = [p for p in filtered_products if p["price"] <= max_price]
+    cache_key = (category_key, min_price, max_price, in_stock, limit, offset or 0, after_id)
+    cached = page_cache.get(cache_key, version)
+    if cached is not None:
+        body, page_headers = cached
+        return Response(body, media_type="application/json", headers={**page_headers, **etag_headers(etag)})
 
-    if in_stock is not None:
-        if in_stock:
-            filtered_products = [p for p in filtered_products if p["stock"] > 0]
-        else:
-            filtered_products = [p for p in filtered_products if p["stock"] == 0]
+    # Fetch one extra row to know whether another page exists
+    page = products_db.query(
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        offset=offset or 0,
+        limit=limit + 1 if limit is not None else None,
+        after_id=after_id
+    )
 
-    # Apply pagination
-    start = offset if offset is not None else 0
-    end = start + limit if limit is not None else len(filtered_products)
+    page_headers = {}
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        page_headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1]["id"], fingerprint)
 
-    return filtered_products[start:end]
+    # Rows are validated on write; encode them directly instead of through response_model
+    body = dumps(page)
+    page_cache.put(cache_key, version, body, page_headers)
+    return Response(body, media_type="application/json", headers={**page_headers, **etag_headers(etag)})
 
 # 2. Get product by ID
 @app.get("/products/{product_id}", response_model=Product)
-def get_product(product_id: int, current_user: dict = Depends(verify_token)):
+async def get_product(
+    product_id: int,
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    current_user: dict = Depends(verify_token)
+):
     """
     Get a specific product by ID. Requires JWT authentication.
     """
-    for product in products_db:
-        if product["id"] == product_id:
-            return product
-    raise HTTPException(status_code=404, detail="Product not found")
+    etag = make_etag(products_db.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    product = products_db.get(product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return FastJSONResponse(product, headers=etag_headers(etag))
 
 # 3. Get product by SKU
 @app.get("/products/sku/{sku}", response_model=Product)
-def get_product_by_sku(sku: str, current_user: dict = Depends(verify_token)):
+async def get_product_by_sku(
+    sku: str,
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    current_user: dict = Depends(verify_token)
+):
     """
     Get a specific product by SKU. Requires JWT authentication.
     """
-    for product in products_db:
-        if product["sku"] == sku:
-            return product
-    raise HTTPException(status_code=404, detail="Product not found")
+    etag = make_etag(products_db.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    product = products_db.get_by_sku(sku)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return FastJSONResponse(product, headers=etag_headers(etag))
 
 # 4. Create new product
 @app.post("/products", response_model=Product, status_code=201)
-def create_product(new_product: ProductCreate, current_user: dict = Depends(verify_token)):
+async def create_product(new_product: ProductCreate, current_user: dict = Depends(verify_token)):
     """
     Create a new product. Requires JWT authentication.
     """
-    # Check for duplicate SKU
-    for product in products_db:
-        if product["sku"] == new_product.sku:
-            raise HTTPException(status_code=400, detail="SKU already exists")
-
-    # Generate new ID
-    next_id = max(p["id"] for p in products_db) + 1 if products_db else 1
-
-    created_product = {"id": next_id, **new_product.dict()}
-    products_db.append(created_product)
-    return created_product
+    # The SKU is checked under the write lock, against every worker's products
+    try:
+        return await products_db.ainsert(new_product.dict())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="SKU already exists")
 
 # 5. Update product
 @app.put("/products/{product_id}", response_model=Product)
-def update_product(product_id: int, update: ProductUpdate, current_user: dict = Depends(verify_token)):
+async def update_product(product_id: int, update: ProductUpdate, current_user: dict = Depends(verify_token)):
     """
     Update an existing product. Requires JWT authentication.
     """
-    for product in products_db:
-        if product["id"] == product_id:
-            # Check for duplicate SKU if SKU is being updated
-            if update.sku and update.sku != product["sku"]:
-                for other_product in products_db:
-                    if other_product["id"] != product_id and other_product["sku"] == update.sku:
-                        raise HTTPException(status_code=400, detail="SKU already exists")
-
-            # Update fields
-            if update.name is not None:
-                product["name"] = update.name
-            if update.description is not None:
-                product["description"] = update.description
-            if update.price is not None:
-                product["price"] = update.price
-            if update.stock is not None:
-                product["stock"] = update.stock
-            if update.category is not None:
-                product["category"] = update.category
-            if update.sku is not None:
-                product["sku"] = update.sku
-
-            return product
-
-    raise HTTPException(status_code=404, detail="Product not found")
+    # Update fields; the product and a new SKU are checked under the write lock,
+    # so a product another worker deleted meanwhile is answered with 404
+    changes = {field: value for field, value in update.dict().items() if value is not None}
+    try:
+        return await products_db.aupdate(product_id, **changes)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="SKU already exists")
 
 # 6. Delete product
 @app.delete("/products/{product_id}", status_code=204)
-def delete_product(product_id: int, current_user: dict = Depends(verify_token)):
+async def delete_product(product_id: int, current_user: dict = Depends(verify_token)):
     """
     Delete a product by ID. Requires JWT authentication.
     """
-    for product in products_db:
-        if product["id"] == product_id:
-            products_db.remove(product)
-            return
-    raise HTTPException(status_code=404, detail="Product not found")
+    if await products_db.adelete(product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
 
 # 7. Update stock
 @app.patch("/products/{product_id}/stock")
-def update_stock(product_id: int, quantity: int, current_user: dict = Depends(verify_token)):
+async def update_stock(product_id: int, quantity: int, current_user: dict = Depends(verify_token)):
     """
     Update product stock. Use positive values to add stock, negative to reduce. Requires JWT authentication.
     """
-    for product in products_db:
-        if product["id"] == product_id:
-            new_stock = product["stock"] + quantity
-
-            if new_stock < 0:
-                raise HTTPException(status_code=400, detail="Insufficient stock")
-
-            product["stock"] = new_stock
-            return {
-                "product_id": product_id,
-                "previous_stock": product["stock"] - quantity,
-                "current_stock": product["stock"],
-                "change": quantity
-            }
-
-    raise HTTPException(status_code=404, detail="Product not found")
+    # Checked and applied under the product's stock lock, so concurrent updates cannot oversell
+    try:
+        return (await products_db.aadjust_stock_many({product_id: quantity}))[0]
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Insufficient stock")
 
 # 8. Get categories
 @app.get("/categories")
-def get_categories(current_user: dict = Depends(verify_token)):
+async def get_categories(
+    if_none_match: Optional[str] = Header(None, description=IF_NONE_MATCH_DESCRIPTION),
+    current_user: dict = Depends(verify_token)
+):
     """
     Get all unique product categories. Requires JWT authentication.
     """
-    categories = list(set(p["category"] for p in products_db))
-    return {"categories": sorted(categories)}
+    etag = make_etag(products_db.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return FastJSONResponse({"categories": sorted(products_db.categories())}, headers=etag_headers(etag))
 
 # 9. Reset database
 @app.post("/reset-db")
-def reset_database():
+async def reset_database():
     """
     Reset the product database to initial state.
     """
-    products_db.clear()
-    products_db.extend([
-        {
-            "id": 1,
-            "name": "Laptop",
-            "description": "High-performance laptop with 16GB RAM",
-            "price": 999.99,
-            "stock": 50,
-            "category": "Electronics",
-            "sku": "LAP-001"
-        },
-        {
-            "id": 2,
-            "name": "Wireless Mouse",
-            "description": "Ergonomic wireless mouse",
-            "price": 29.99,
-            "stock": 200,
-            "category": "Accessories",
-            "sku": "MOU-001"
-        },
-        {
-            "id": 3,
-            "name": "USB-C Cable",
-            "description": "Fast charging USB-C cable 2m",
-            "price": 12.99,
-            "stock": 500,
-            "category": "Accessories",
-            "sku": "CAB-001"
-        },
-        {
-            "id": 4,
-            "name": "Monitor",
-            "description": "27-inch 4K monitor",
-            "price": 399.99,
-            "stock": 30,
-            "category": "Electronics",
-            "sku": "MON-001"
-        }
-    ])
+    await products_db.areset()
     return {"message": "Product database reset successfully"}
+
+# 10. Bulk upsert products by SKU
+@app.post("/products/bulk", response_model=ProductBulkUpsertResponse)
+async def upsert_products_bulk(payload: ProductBulkUpsert, current_user: dict = Depends(verify_token)):
+    """
+    Create or update up to MAX_BULK_ITEMS products in one request, keyed by SKU.
+    Existing SKUs are updated in place, new SKUs are created. Requires JWT authentication.
+    """
+    if len(payload.products) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} products")
+
+    upserted = await products_db.aupsert_many([product.dict() for product in payload.products])
+
+    results = [
+        {"id": product["id"], "sku": product["sku"], "status": "created" if created else "updated"}
+        for product, created in upserted
+    ]
+    created_count = sum(1 for _, created in upserted if created)
+    return {
+        "created": created_count,
+        "updated": len(upserted) - created_count,
+        "results": results
+    }
+
+# 11. Bulk stock adjustment
+@app.patch("/products/stock/bulk")
+async def update_stock_bulk(payload: StockBulkAdjust, current_user: dict = Depends(verify_token)):
+    """
+    Apply stock deltas to many products at once. Use positive values to add stock,
+    negative to reduce. The batch is all-or-nothing: if any product is missing or
+    would go below zero stock, nothing is changed. Requires JWT authentication.
+    """
+    if len(payload.adjustments) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A bulk request can contain at most {MAX_BULK_ITEMS} adjustments")
+
+    # Several adjustments for the same product are combined
+    deltas = combine_items(payload.adjustments)
+
+    try:
+        changes = await products_db.aadjust_stock_many(deltas)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Products not found: {', '.join(map(str, e.args[0]))}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Insufficient stock for products: {', '.join(map(str, e.args[0]))}")
+
+    return {"updated": len(changes), "changes": changes}
+
+# 12. Auth cache metrics
+@app.get("/metrics/auth")
+async def get_auth_metrics():
+    """
+    Verified-token cache statistics (size, hits, misses, hit rate).
+    """
+    return token_cache.stats()
+
+# 13. Page cache metrics
+@app.get("/metrics/cache")
+async def get_cache_metrics():
+    """
+    /products page cache statistics (entries, bytes, hit rate, stale and evicted pages).
+    """
+    return page_cache.stats()
+
+# 14. Stock reservations (internal, used by the order service)
+@app.post("/internal/reservations")
+async def apply_reservations(payload: ReservationBatch, current_user: dict = Depends(verify_token)):
+    """
+    Apply a batch of stock reservation operations. Requires JWT authentication.
+    - reserve: take stock for an order; answered with the reservation id
+    - commit: keep a reservation's stock taken (orders that were stored)
+    - release: give a reservation's stock back (orders that failed to store or
+      were cancelled); a reservation is released at most once, so retries are safe
+    Every operation succeeds or fails on its own; results are returned per
+    operation, in request order. catalog_version identifies the names and
+    prices current once the batch was applied (see /internal/products/lookup).
+    """
+    operations = len(payload.reserve) + len(payload.commit) + len(payload.release)
+    if operations > MAX_RESERVATION_OPERATIONS:
+        raise HTTPException(
+            status_code=400, detail=f"A batch can contain at most {MAX_RESERVATION_OPERATIONS} operations"
+        )
+
+    reserved = []
+    for request in payload.reserve:
+        try:
+            reservation = await products_db.areserve(combine_items(request.items))
+        except KeyError as e:
+            reserved.append({
+                "status": "error", "status_code": 404,
+                "detail": f"Products not found: {', '.join(map(str, e.args[0]))}"
+            })
+            continue
+        except ValueError as e:
+            reserved.append({
+                "status": "error", "status_code": 400,
+                "detail": f"Insufficient stock for products: {', '.join(map(str, e.args[0]))}"
+            })
+            continue
+
+        reserved.append({
+            "status": "reserved",
+            "reservation_id": reservation["id"],
+            "expires_at": reservation["expires_at"]
+        })
+
+    results = {"reserved": reserved, "committed": [], "released": []}
+    for key, apply, reservation_ids in (
+        ("committed", products_db.acommit, payload.commit), ("released", products_db.arelease, payload.release)
+    ):
+        for reservation_id in reservation_ids:
+            try:
+                await apply(reservation_id)
+                results[key].append({"status": "ok"})
+            except KeyError:
+                results[key].append({
+                    "status": "error", "status_code": 404, "detail": "Reservation not found or expired"
+                })
+
+    # Read after the reservations: orders are priced at this version or later
+    results["catalog_version"] = make_etag(products_db.catalog_version)
+    return FastJSONResponse(results)
+
+# 15. Product lookup (internal, used by the order service)
+@app.post("/internal/products/lookup")
+async def lookup_products(payload: ProductLookup, current_user: dict = Depends(verify_token)):
+    """
+    Name, price and SKU of many products in one request; unknown ids are left
+    out. catalog_version changes whenever any product's name, price or SKU
+    does, so callers can cache the records until it moves. Requires JWT authentication.
+    """
+    if len(payload.ids) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A lookup can contain at most {MAX_BULK_ITEMS} ids")
+
+    # Read before the rows, so the records are at least as new as the version
+    catalog_version = make_etag(products_db.catalog_version)
+    products = []
+    for product_id in dict.fromkeys(payload.ids):
+        product = products_db.get(product_id)
+        if product is not None:
+            products.append({"id": product_id, "name": product["name"], "price": product["price"], "sku": product["sku"]})
+    return FastJSONResponse({"catalog_version": catalog_version, "products": products})
+
+# 16. Shared log metrics
+@app.get("/metrics/shared-log")
+async def get_shared_log_metrics():
+    """
+    Shared change log statistics when the service runs several workers (sequence, records applied and written).
+    """
+    stats = products_db.shared_stats()
+    return {"shared": stats is not None, "log": stats}
+
+# 17. Open reservations (internal, used by the order service)
+@app.get("/internal/reservations")
+async def list_open_reservations(current_user: dict = Depends(verify_token)):
+    """
+    Reservations that were neither committed nor released yet, oldest first.
+    The order service commits the ones that belong to orders it stored before
+    a crash. Requires JWT authentication.
+    """
+    return FastJSONResponse({"reservations": [
+        {"reservation_id": reservation["id"], "expires_at": reservation["expires_at"]}
+        for reservation in products_db.open_reservations()
+    ]})
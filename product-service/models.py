@@ -1,5 +1,24 @@
-# Product service database
-products_db = [
+import asyncio
+import copy
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+# Add parent directory to path to import the shared index helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sorted_index import SortedIdSet, SortedList
+from columnar_snapshot import ColumnarTable, write_table
+from shared_log import CHECKPOINT_EVERY, SharedLog
+
+# Seed data used on startup and by /reset-db
+SEED_PRODUCTS = [
     {
         "id": 1,
         "name": "Laptop",
@@ -37,3 +56,946 @@ products_db = [
         "sku": "MON-001"
     }
 ]
+
+
+# Product fields in column order; rows are materialized as dicts with these keys
+PRODUCT_FIELDS = ("id", "name", "description", "price", "stock", "category", "sku")
+SNAPSHOT_COLUMN_TYPES = {
+    "id": "q", "name": "s", "description": "s", "price": "d",
+    "stock": "q", "category": "s", "sku": "s"
+}
+
+# Number of stock locks; product ids map onto them by id % STOCK_LOCK_STRIPES
+STOCK_LOCK_STRIPES = 64
+
+
+class ProductStore:
+    """
+    In-memory product table.
+    Products are indexed by id (primary key) and by SKU (unique), so lookups,
+    inserts and deletes are O(1) regardless of catalog size.
+
+    Secondary indexes back the GET /products filters: a case-insensitive
+    category index, a sorted (price, id) index for range queries and an
+    in-stock / out-of-stock partition. They are kept in sync on every
+    insert, update and delete.
+
+    The table can also be loaded from a columnar snapshot (load_snapshot).
+    Snapshot rows stay in the memory-mapped file and are only turned into
+    dicts when returned; a row is copied into the in-memory overlay
+    (_by_id) the first time it is changed, and the overlay shadows the
+    snapshot from then on.
+
+    Writes are serialized by a store lock; the bulk operations hold it for
+    the whole batch so they apply atomically. Every write also bumps
+    version, and category_version(category) is the version at which that
+    category's products last changed. The read endpoints turn them into
+    ETags and use them to validate cached pages. catalog_version only moves
+    when a product's name, price or SKU changes or a product is removed, so
+    services caching those fields are not invalidated by stock changes.
+
+    Stock changes are also serialized per product by striped stock locks
+    (id % STOCK_LOCK_STRIPES), taken in ascending order before the store
+    lock. A stock check and the write that follows it happen under the
+    product's stripe, so concurrent decrements cannot oversell or lose
+    updates, while checks on unrelated products proceed in parallel and
+    the store lock is only held for the O(1) write itself. reserve() takes
+    stock from several products at once; the reservation is then
+    committed, or released to return the stock. Reservations that are not
+    committed within RESERVATION_TTL_SECONDS are released automatically.
+    Committed reservations are kept for COMMITTED_RETENTION_SECONDS, so an
+    order that is cancelled later gives its stock back by releasing its
+    reservation; a reservation is released at most once, however often
+    release() is called within RELEASED_RETENTION_SECONDS. Older ones are
+    forgotten (unknown from then on), so reservations of every order ever
+    placed are not kept forever.
+
+    Several worker processes can share the store (share(path)): every write
+    is then committed to a SQLite change log that the other workers replay,
+    with the stock checks repeated under the log's write lock, and refresh()
+    applies the other workers' writes before a read. The async variants of
+    the writes (ainsert(), areserve(), ...) then run in a worker thread, so
+    the event loop never waits for the log. Bulk writes of more than
+    INLINE_BATCH_ROWS rows run in a worker thread in either mode.
+    """
+
+    RESERVATION_TTL_SECONDS = 600
+    COMMITTED_RETENTION_SECONDS = 90 * 24 * 3600
+    RELEASED_RETENTION_SECONDS = 24 * 3600
+    # Seconds between checks for reservations past their retention
+    FORGET_INTERVAL_SECONDS = 60
+    # Larger bulk writes hold the locks long enough to stall the event loop, so they run in a thread
+    INLINE_BATCH_ROWS = 500
+
+    def __init__(self, products: Iterable[dict] = ()):
+        self._by_id: dict[int, dict] = {}
+        self._by_sku: dict[str, dict] = {}
+        self._ids = SortedIdSet()
+        self._by_category: dict[str, SortedIdSet] = {}
+        self._category_counts: dict[str, int] = {}
+        self._by_price = SortedList()
+        self._in_stock = SortedIdSet()
+        self._out_of_stock = SortedIdSet()
+        self._next_id = 1
+        self._base: Optional[_SnapshotRows] = None
+        self._lock = threading.Lock()
+        self._version = 0
+        # category key (lowercase) -> version of its last change; missing keys last changed at _loaded_version
+        self._category_versions: dict[str, int] = {}
+        self._loaded_version = 0
+        self._catalog_version = 0
+        self._stock_stripes = [threading.Lock() for _ in range(STOCK_LOCK_STRIPES)]
+        # Open reservations in expiry order: id -> {"id", "items", "status", "expires_at"}
+        self._reservations: dict[str, dict] = {}
+        # Committed reservations, which can still be released, in commit order: id -> reservation
+        self._committed: OrderedDict[str, dict] = OrderedDict()
+        # Released reservations (released explicitly or expired) in release order: id -> released_at
+        self._released: OrderedDict[str, float] = OrderedDict()
+        self._reservations_lock = threading.Lock()
+        self._next_forget_at = 0.0
+        # Async writes running in a worker thread (counted on the event loop)
+        self._threaded_writes = 0
+        self._shared: Optional[SharedLog] = None
+        self.load(products)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[dict]:
+        # Callers hold the store lock: a product deleted under the iteration has no row
+        for product_id in self._ids:
+            yield self._row(product_id)
+
+    @property
+    def version(self) -> int:
+        """
+        Bumped after every write. Read it before the rows: a response may then
+        hold newer data than its version, but never older.
+        """
+        return self._version
+
+    @property
+    def catalog_version(self) -> int:
+        """Version at which a product's name, price or SKU last changed or a product was removed"""
+        return self._catalog_version
+
+    def category_version(self, category: str) -> int:
+        """Version at which products in this category (case-insensitive) last changed"""
+        return self._category_versions.get(category.lower(), self._loaded_version)
+
+    def load(self, products: Iterable[dict]):
+        """Replace the whole table with the given product rows (ids are kept)."""
+        products = list(products)
+        with self._stock_locks(), self._writing():
+            self._load(products)
+            self._write_log(["load", products])
+
+    def load_snapshot(self, path: str):
+        """
+        Replace the whole table with a columnar snapshot (see save_snapshot).
+        The file is memory-mapped; only the indexes are built in memory.
+        """
+        base = _SnapshotRows(ColumnarTable(path))
+        table = base.table
+        ids = table.column("id").tolist()
+        prices = table.column("price").tolist()
+        stocks = table.column("stock").tolist()
+        category_ids = table.column("category").tolist()
+
+        # Group ids per category and stock state first, then build each index once
+        by_category: dict[str, list[int]] = {}
+        in_stock, out_of_stock = [], []
+        for product_id, stock, category_id in zip(ids, stocks, category_ids):
+            by_category.setdefault(base.categories[category_id], []).append(product_id)
+            (in_stock if stock > 0 else out_of_stock).append(product_id)
+        by_category_key: dict[str, list[int]] = {}
+        for category, category_product_ids in by_category.items():
+            by_category_key.setdefault(category.lower(), []).extend(category_product_ids)
+
+        with self._stock_locks(), self._lock:
+            self._clear()
+            self._base = base
+            self._ids = SortedIdSet(ids)
+            self._by_category = {key: SortedIdSet(key_ids) for key, key_ids in by_category_key.items()}
+            self._category_counts = {category: len(category_ids) for category, category_ids in by_category.items()}
+            self._in_stock = SortedIdSet(in_stock)
+            self._out_of_stock = SortedIdSet(out_of_stock)
+            self._by_price.load(zip(prices, ids))
+            # Ids of deleted products are never handed out again
+            self._next_id = max(table.metadata.get("next_id", 1), ids[-1] + 1 if ids else 1)
+            self._replaced()
+
+    def save_snapshot(self, path: str):
+        """Write the current table to a columnar snapshot file."""
+        with self._lock:
+            rows = list(self)
+            next_id = self._next_id
+        columns = {
+            field: (SNAPSHOT_COLUMN_TYPES[field], [row[field] for row in rows])
+            for field in PRODUCT_FIELDS
+        }
+        # Row numbers in SKU order, so SKU lookups can binary search the file
+        columns["sku_order"] = ("I", sorted(range(len(rows)), key=lambda row: rows[row]["sku"]))
+        write_table(path, len(rows), columns, metadata={"next_id": next_id})
+
+    def share(self, path: str, sync: bool = True, checkpoint_every: int = CHECKPOINT_EVERY) -> str:
+        """
+        Keep the store in step with the service's other worker processes
+        through the shared log at path, starting from its checkpoint and
+        replaying the records after it. Returns the log's id (see SharedLog).
+        """
+        with self._lock:
+            self._shared = SharedLog(
+                path, self._replay, self._dump, self._restore, sync=sync, checkpoint_every=checkpoint_every
+            )
+            self._shared.catch_up()
+        return self._shared.id
+
+    def refresh(self):
+        """Apply the writes other workers committed since the last call (no-op unless shared)"""
+        shared = self._shared
+        if shared is not None and shared.changed():
+            with self._lock:
+                shared.catch_up()
+
+    async def arefresh(self):
+        """Like refresh(), applying the writes in a worker thread so the event loop never waits for the lock"""
+        shared = self._shared
+        if shared is not None and shared.changed():
+            await asyncio.to_thread(self.refresh)
+
+    def shared_stats(self) -> Optional[dict]:
+        """Shared log counters, or None when the store is not shared"""
+        shared = self._shared
+        return shared.stats() if shared is not None else None
+
+    def reset(self):
+        """Restore the seed catalog."""
+        self.load(copy.deepcopy(SEED_PRODUCTS))
+
+    async def areset(self):
+        await self._write_async(self.reset)
+
+    def get(self, product_id: int) -> Optional[dict]:
+        product = self._by_id.get(product_id)
+        if product is None and self._base is not None and product_id in self._ids:
+            return self._base.row(product_id)
+        return product
+
+    def get_by_sku(self, sku: str) -> Optional[dict]:
+        product = self._by_sku.get(sku)
+        if product is None and self._base is not None:
+            product_id = self._base.find_sku(sku)
+            # Snapshot rows that were deleted or changed are shadowed
+            if product_id is not None and product_id in self._ids and product_id not in self._by_id:
+                return self._base.row(product_id)
+        return product
+
+    def categories(self) -> set[str]:
+        return set(self._category_counts)
+
+    def insert(self, fields: dict) -> dict:
+        """Insert a new product, assigning the next id. Raises ValueError if the SKU is taken."""
+        with self._writing():
+            self._check_sku(fields["sku"])
+            product = self._insert({"id": self._next_id, **fields})
+            self._write_log(["insert", product])
+        return product
+
+    async def ainsert(self, fields: dict) -> dict:
+        return await self._write_async(self.insert, fields)
+
+    def update(self, product_id: int, **changes) -> dict:
+        """
+        Apply field changes to a product, keeping every index in sync.
+        Raises KeyError if the product does not exist (with a shared log,
+        also when another worker deleted it), or ValueError if a new SKU is
+        taken by another product.
+        """
+        with self._stock_locks([product_id]), self._writing():
+            product = self._materialize(product_id)
+            if "sku" in changes:
+                self._check_sku(changes["sku"], product_id)
+            product = self._update(product, changes)
+            self._write_log(["update", product_id, changes])
+        return product
+
+    async def aupdate(self, product_id: int, **changes) -> dict:
+        return await self._write_async(self.update, product_id, **changes)
+
+    def delete(self, product_id: int) -> Optional[dict]:
+        """Remove a product. Returns the removed row, or None if it did not exist."""
+        with self._stock_locks([product_id]), self._writing():
+            product = self._delete(product_id)
+            if product is not None:
+                self._write_log(["delete", product_id])
+        return product
+
+    async def adelete(self, product_id: int) -> Optional[dict]:
+        return await self._write_async(self.delete, product_id)
+
+    def upsert_many(self, rows: list[dict]) -> list[tuple[dict, bool]]:
+        """
+        Insert or update products keyed by SKU, under one lock.
+        Returns (product, created) for every row, in input order.
+        """
+        with self._stock_locks(), self._writing():
+            results = self._upsert(rows)
+            self._write_log(["upsert", rows])
+        return results
+
+    async def aupsert_many(self, rows: list[dict]) -> list[tuple[dict, bool]]:
+        return await self._write_batch_async(len(rows), self.upsert_many, rows)
+
+    def adjust_stock_many(self, deltas: dict[int, int]) -> list[dict]:
+        """
+        Apply stock deltas (product_id -> quantity) all-or-nothing.
+        Raises KeyError with the unknown ids, or ValueError with the ids whose
+        stock would go negative; nothing is changed in either case.
+        """
+        with self._checked_stock(deltas):
+            changes = self._adjust_stock(deltas)
+            # JSON object keys are strings; ids go into the log as pairs
+            self._write_log(["stock", list(deltas.items())])
+        return changes
+
+    async def aadjust_stock_many(self, deltas: dict[int, int]) -> list[dict]:
+        return await self._write_batch_async(len(deltas), self.adjust_stock_many, deltas)
+
+    def reserve(self, items: dict[int, int]) -> dict:
+        """
+        Take stock for an order: items maps product_id -> quantity (> 0).
+        All-or-nothing, raising KeyError / ValueError like adjust_stock_many.
+        Returns the reservation ({"id", "items", "status", "expires_at"}).
+        """
+        if any(quantity <= 0 for quantity in items.values()):
+            raise ValueError([product_id for product_id, quantity in items.items() if quantity <= 0])
+        self._expire_reservations()
+        self._forget_reservations()
+        reservation_id = uuid.uuid4().hex
+        expires_at = time.time() + self.RESERVATION_TTL_SECONDS
+        with self._checked_stock({product_id: -quantity for product_id, quantity in items.items()}):
+            reservation = self._reserve(reservation_id, items, expires_at)
+            self._write_log(["reserve", reservation_id, list(items.items()), expires_at])
+        return dict(reservation)
+
+    async def areserve(self, items: dict[int, int]) -> dict:
+        return await self._write_async(self.reserve, items)
+
+    def commit(self, reservation_id: str) -> dict:
+        """
+        Make a reservation permanent: its stock stays taken until the
+        reservation is released. Committing a committed reservation again
+        is a no-op. Raises KeyError if it is unknown, released or expired.
+        """
+        with self._writing():
+            reservation = self._committed.get(reservation_id)
+            if reservation is None:
+                committed_at = time.time()
+                reservation = self._commit(reservation_id, committed_at)
+                self._write_log(["commit", reservation_id, committed_at])
+        return dict(reservation)
+
+    async def acommit(self, reservation_id: str) -> dict:
+        return await self._write_async(self.commit, reservation_id)
+
+    def release(self, reservation_id: str) -> dict:
+        """
+        Give a reservation's stock back, whether it is open or committed.
+        Releasing a released (or expired) reservation again returns nothing,
+        so a retried release is safe. Raises KeyError if it is unknown or
+        was forgotten (see COMMITTED_RETENTION_SECONDS).
+        """
+        reservation = self._reservations.get(reservation_id) or self._committed.get(reservation_id)
+        if reservation is None:
+            if reservation_id in self._released:
+                return {"id": reservation_id, "status": "released"}
+            raise KeyError(reservation_id)
+        with self._stock_locks(reservation["items"]), self._writing():
+            # Another release, an expiry or another worker may have ended it while waiting for the locks
+            if reservation_id in self._released:
+                return {"id": reservation_id, "status": "released"}
+            if reservation_id not in self._reservations and reservation_id not in self._committed:
+                raise KeyError(reservation_id)
+            released_at = time.time()
+            reservation = self._release(reservation_id, released_at)
+            self._write_log(["release", reservation_id, released_at])
+        return dict(reservation)
+
+    async def arelease(self, reservation_id: str) -> dict:
+        return await self._write_async(self.release, reservation_id)
+
+    def get_reservation(self, reservation_id: str) -> Optional[dict]:
+        """An open or committed (not released) reservation, or None"""
+        reservation = self._reservations.get(reservation_id) or self._committed.get(reservation_id)
+        return dict(reservation) if reservation is not None else None
+
+    def open_reservations(self) -> list[dict]:
+        """Reservations that are neither committed nor released yet, in expiry order"""
+        with self._reservations_lock:
+            return [dict(reservation) for reservation in self._reservations.values()]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Return products matching all given filters, in id order.
+        Candidates are drawn from the most selective index and the scan stops
+        as soon as offset + limit matches have been found. When after_id is
+        given (keyset pagination) the scan starts right after that id.
+        Snapshot rows are filtered on their columns and only the returned
+        rows are turned into dicts.
+        """
+        # Each plan is (estimated size, ids in ascending order)
+        plans = []
+        if category:
+            category_ids = self._by_category.get(category.lower())
+            if category_ids is None:
+                return []
+            plans.append((len(category_ids), category_ids.iter_from(after_id)))
+        if min_price is not None or max_price is not None:
+            price_range = (
+                (-math.inf,) if min_price is None else (min_price,),
+                (math.inf,) if max_price is None else (max_price, math.inf)
+            )
+            # Sorting by id is deferred until this plan is chosen
+            plans.append((self._by_price.count_range(*price_range), price_range))
+        if in_stock is not None:
+            stock_ids = self._in_stock if in_stock else self._out_of_stock
+            plans.append((len(stock_ids), stock_ids.iter_from(after_id)))
+
+        if plans:
+            _, candidate_ids = min(plans, key=lambda plan: plan[0])
+            if isinstance(candidate_ids, tuple):
+                candidate_ids = sorted(
+                    product_id for _, product_id in self._by_price.irange(*candidate_ids)
+                    if after_id is None or product_id > after_id
+                )
+        else:
+            candidate_ids = self._ids.iter_from(after_id)
+
+        category_key = category.lower() if category else None
+        by_id = self._by_id
+        base = self._base
+        results = []
+        skipped = 0
+        for product_id in candidate_ids:
+            product = by_id.get(product_id)
+            if product is not None:
+                product_category, price, stock = product["category"], product["price"], product["stock"]
+            elif base is not None:
+                row = base.row_index(product_id)
+                product_category, price, stock = base.category(row), base.prices[row], base.stocks[row]
+            else:
+                continue
+            if category_key is not None and product_category.lower() != category_key:
+                continue
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            if in_stock is not None and (stock > 0) != in_stock:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            results.append(product if product is not None else base.row(product_id))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    @contextmanager
+    def _stock_locks(self, product_ids: Optional[Iterable[int]] = None):
+        """Hold the stock stripes of these products (all stripes when None), in ascending order"""
+        if product_ids is None:
+            stripes = self._stock_stripes
+        else:
+            stripes = [self._stock_stripes[i] for i in sorted({pid % STOCK_LOCK_STRIPES for pid in product_ids})]
+        for stripe in stripes:
+            stripe.acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                stripe.release()
+
+    async def _write_async(self, write, *args, **kwargs):
+        """
+        Run a write method: inline when it cannot make the event loop wait,
+        otherwise in a worker thread. That is with a shared log, and while
+        another write runs in a thread (it may hold the locks for a whole batch).
+        """
+        if self._shared is None and not self._threaded_writes:
+            return write(*args, **kwargs)
+        return await self._write_in_thread(write, *args, **kwargs)
+
+    async def _write_batch_async(self, size: int, write, *args):
+        """Like _write_async; batches of more than INLINE_BATCH_ROWS rows always run in a thread"""
+        if size > self.INLINE_BATCH_ROWS:
+            return await self._write_in_thread(write, *args)
+        return await self._write_async(write, *args)
+
+    async def _write_in_thread(self, write, *args, **kwargs):
+        self._threaded_writes += 1
+        try:
+            return await asyncio.to_thread(write, *args, **kwargs)
+        finally:
+            self._threaded_writes -= 1
+
+    @contextmanager
+    def _writing(self):
+        """Hold the store lock and, when shared, the other workers' write lock with their writes applied"""
+        with self._lock:
+            if self._shared is None:
+                yield
+            else:
+                with self._shared.transaction():
+                    yield
+
+    @contextmanager
+    def _checked_stock(self, deltas: dict[int, int]):
+        """Hold the stripes of these products and the write lock, with every delta checked to apply"""
+        with self._stock_locks(deltas):
+            self._check_stock(deltas)
+            # Stock of these products cannot change in this process while their stripes are held
+            with self._writing():
+                if self._shared is not None:
+                    # Other workers' writes were applied just now, so check again
+                    self._check_stock(deltas)
+                yield
+
+    def _write_log(self, record: list):
+        """Add a record for the write being made (caller is inside _writing)"""
+        if self._shared is not None:
+            self._shared.append(record)
+
+    def _replay(self, record: list):
+        """Apply a shared log record committed by another worker"""
+        op = record[0]
+        if op == "insert":
+            self._insert(dict(record[1]))
+        elif op == "update":
+            self._update(self._materialize(record[1]), record[2])
+        elif op == "delete":
+            self._delete(record[1])
+        elif op == "upsert":
+            self._upsert(record[1])
+        elif op == "stock":
+            self._adjust_stock(dict(record[1]))
+        elif op == "reserve":
+            self._reserve(record[1], dict(record[2]), record[3])
+        elif op == "commit":
+            self._commit(record[1], self._record_time(record))
+        elif op == "release":
+            self._release(record[1], self._record_time(record))
+        elif op == "forget":
+            self._forget(record[1], record[2])
+        elif op == "load":
+            self._load(record[1])
+
+    def _dump(self) -> dict:
+        """The whole table, its counters and reservations, for a shared-log checkpoint (caller holds the store lock)"""
+        with self._reservations_lock:
+            reservations = [
+                [
+                    reservation_id, list(reservation["items"].items()), reservation["status"],
+                    reservation["expires_at"], reservation.get("committed_at")
+                ]
+                for reservation_id, reservation in (*self._reservations.items(), *self._committed.items())
+            ]
+            released = list(self._released.items())
+        return {
+            "products": list(self),
+            "next_id": self._next_id,
+            "version": self._version,
+            "category_versions": self._category_versions,
+            "loaded_version": self._loaded_version,
+            "catalog_version": self._catalog_version,
+            "reservations": reservations,
+            "released": released
+        }
+
+    def _restore(self, state: dict):
+        """Replace the table with a shared-log checkpoint (see _dump)"""
+        self._load(state["products"])
+        self._next_id = state["next_id"]
+        self._version = state["version"]
+        self._category_versions = dict(state["category_versions"])
+        self._loaded_version = state["loaded_version"]
+        self._catalog_version = state["catalog_version"]
+        with self._reservations_lock:
+            for reservation_id, items, status, expires_at, committed_at in state["reservations"]:
+                reservation = {"id": reservation_id, "items": dict(items), "status": status, "expires_at": expires_at}
+                if status == "committed":
+                    reservation["committed_at"] = committed_at
+                    self._committed[reservation_id] = reservation
+                else:
+                    self._reservations[reservation_id] = reservation
+            self._released = OrderedDict(state["released"])
+
+    # The write operations below change the table without taking locks or logging;
+    # the public methods and _replay call them
+
+    def _load(self, products: list[dict]):
+        self._clear()
+        for product in sorted(products, key=lambda p: p["id"]):
+            self._add(dict(product), index_price=False)
+        self._by_price.load((p["price"], p["id"]) for p in self._by_id.values())
+        self._replaced()
+
+    def _insert(self, product: dict) -> dict:
+        self._add(product)
+        self._touch(product["category"])
+        return product
+
+    def _delete(self, product_id: int) -> Optional[dict]:
+        product = self._row(product_id)
+        if product is not None:
+            self._by_id.pop(product_id, None)
+            if self._by_sku.get(product["sku"]) is product:
+                del self._by_sku[product["sku"]]
+            self._ids.discard(product_id)
+            self._unindex_category(product)
+            self._unindex_price(product)
+            self._unindex_stock(product)
+            self._touch(product["category"])
+            self._catalog_version = self._version
+        return product
+
+    def _upsert(self, rows: list[dict]) -> list[tuple[dict, bool]]:
+        results = []
+        for fields in rows:
+            existing = self.get_by_sku(fields["sku"])
+            if existing is None:
+                results.append((self._insert({"id": self._next_id, **fields}), True))
+            else:
+                results.append((self._update(self._materialize(existing["id"]), fields), False))
+        return results
+
+    def _adjust_stock(self, deltas: dict[int, int]) -> list[dict]:
+        changes = []
+        for product_id, quantity in deltas.items():
+            product = self._materialize(product_id)
+            previous_stock = product["stock"]
+            self._update(product, {"stock": previous_stock + quantity})
+            changes.append({
+                "product_id": product_id,
+                "previous_stock": previous_stock,
+                "current_stock": product["stock"],
+                "change": quantity
+            })
+        return changes
+
+    def _reserve(self, reservation_id: str, items: dict[int, int], expires_at: float) -> dict:
+        self._adjust_stock({product_id: -quantity for product_id, quantity in items.items()})
+        reservation = {"id": reservation_id, "items": dict(items), "status": "reserved", "expires_at": expires_at}
+        with self._reservations_lock:
+            self._reservations[reservation_id] = reservation
+        return reservation
+
+    def _commit(self, reservation_id: str, committed_at: float) -> dict:
+        with self._reservations_lock:
+            reservation = self._reservations.pop(reservation_id)
+            reservation["status"] = "committed"
+            reservation["committed_at"] = committed_at
+            self._committed[reservation_id] = reservation
+        return reservation
+
+    def _release(self, reservation_id: str, released_at: float) -> dict:
+        with self._reservations_lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                reservation = self._committed.pop(reservation_id)
+            reservation["status"] = "released"
+            self._released[reservation_id] = released_at
+        # Products deleted since the reservation have no stock to return
+        for product_id, quantity in reservation["items"].items():
+            if product_id in self._ids:
+                product = self._materialize(product_id)
+                self._update(product, {"stock": product["stock"] + quantity})
+        return reservation
+
+    def _forget(self, committed_before: float, released_before: float):
+        """Drop committed reservations and released ids older than the given times"""
+        with self._reservations_lock:
+            for entries, expired in (
+                (self._committed, lambda reservation: reservation["committed_at"] < committed_before),
+                (self._released, lambda released_at: released_at < released_before)
+            ):
+                # Oldest first: stop at the first entry still within its retention
+                while entries and expired(next(iter(entries.values()))):
+                    entries.popitem(last=False)
+
+    def _record_time(self, record: list) -> float:
+        """Commit or release time of a log record; records from older logs use the reservation time"""
+        if len(record) > 2:
+            return record[2]
+        reservation = self._reservations.get(record[1]) or self._committed.get(record[1])
+        return reservation["expires_at"] - self.RESERVATION_TTL_SECONDS if reservation is not None else 0.0
+
+    def _check_stock(self, deltas: dict[int, int]):
+        """Raise KeyError / ValueError unless every delta applies (caller holds the stripes)"""
+        missing = [product_id for product_id in deltas if product_id not in self._ids]
+        if missing:
+            raise KeyError(missing)
+        insufficient = [
+            product_id for product_id, quantity in deltas.items()
+            if self._field(product_id, "stock") + quantity < 0
+        ]
+        if insufficient:
+            raise ValueError(insufficient)
+
+    def _check_sku(self, sku: str, product_id: Optional[int] = None):
+        """
+        Raise ValueError if another product has this SKU. Callers are inside
+        _writing(), so other workers' products are already applied.
+        """
+        existing = self.get_by_sku(sku)
+        if existing is not None and existing["id"] != product_id:
+            raise ValueError(sku)
+
+    def _expire_reservations(self):
+        """Release reservations that were not committed in time"""
+        now = time.time()
+        expired = []
+        with self._reservations_lock:
+            for reservation_id, reservation in self._reservations.items():
+                if reservation["expires_at"] > now:
+                    break
+                expired.append(reservation_id)
+        for reservation_id in expired:
+            reservation = self._reservations.get(reservation_id)
+            if reservation is None:
+                continue
+            with self._stock_locks(reservation["items"]), self._writing():
+                # Only while still open: it may have been committed while waiting for the locks
+                if reservation_id in self._reservations:
+                    released_at = time.time()
+                    self._release(reservation_id, released_at)
+                    self._write_log(["release", reservation_id, released_at])
+
+    def _forget_reservations(self):
+        """
+        Drop committed reservations and released ids past their retention, at
+        most every FORGET_INTERVAL_SECONDS. The cutoff times go into the log,
+        so every worker drops the same ones.
+        """
+        now = time.time()
+        if now < self._next_forget_at:
+            return
+        self._next_forget_at = now + self.FORGET_INTERVAL_SECONDS
+        committed_before = now - self.COMMITTED_RETENTION_SECONDS
+        released_before = now - self.RELEASED_RETENTION_SECONDS
+        with self._reservations_lock:
+            oldest_committed = next(iter(self._committed.values()), None)
+            oldest_released = next(iter(self._released.values()), None)
+        if (oldest_committed is None or oldest_committed["committed_at"] >= committed_before) and (
+            oldest_released is None or oldest_released >= released_before
+        ):
+            return
+        with self._writing():
+            self._forget(committed_before, released_before)
+            self._write_log(["forget", committed_before, released_before])
+
+    def _clear(self):
+        self._by_id = {}
+        self._by_sku = {}
+        self._ids = SortedIdSet()
+        self._by_category = {}
+        self._category_counts = {}
+        self._by_price = SortedList()
+        self._in_stock = SortedIdSet()
+        self._out_of_stock = SortedIdSet()
+        self._next_id = 1
+        # Dropped, not closed: in-flight readers may still hold the mapping
+        self._base = None
+        with self._reservations_lock:
+            self._reservations = {}
+            self._committed = OrderedDict()
+            self._released = OrderedDict()
+
+    def _row(self, product_id: int) -> Optional[dict]:
+        """Current row (overlay or snapshot), or None if the id is not live"""
+        if product_id not in self._ids:
+            return None
+        product = self._by_id.get(product_id)
+        return product if product is not None else self._base.row(product_id)
+
+    def _field(self, product_id: int, field: str):
+        product = self._by_id.get(product_id)
+        if product is not None:
+            return product[field]
+        return self._base.value(field, product_id)
+
+    def _materialize(self, product_id: int) -> dict:
+        """The overlay dict for a product, copying it out of the snapshot if needed"""
+        product = self._by_id.get(product_id)
+        if product is None:
+            if product_id not in self._ids:
+                raise KeyError(product_id)
+            product = self._base.row(product_id)
+            self._by_id[product_id] = product
+            self._by_sku[product["sku"]] = product
+        return product
+
+    def _add(self, product: dict, index_price: bool = True):
+        self._by_id[product["id"]] = product
+        self._by_sku[product["sku"]] = product
+        self._ids.add(product["id"])
+        self._index_category(product)
+        if index_price:
+            self._by_price.add((product["price"], product["id"]))
+        self._index_stock(product)
+        self._next_id = max(self._next_id, product["id"] + 1)
+
+    def _update(self, product: dict, changes: dict) -> dict:
+        product_id = product["id"]
+        new_sku = changes.get("sku")
+        if new_sku is not None and new_sku != product["sku"]:
+            del self._by_sku[product["sku"]]
+            self._by_sku[new_sku] = product
+
+        previous_category = product["category"]
+        reindex_category = "category" in changes and changes["category"] != previous_category
+        reindex_price = "price" in changes and changes["price"] != product["price"]
+        reindex_stock = "stock" in changes and (changes["stock"] > 0) != (product["stock"] > 0)
+        catalog_changed = any(
+            field in changes and changes[field] != product[field] for field in ("name", "price", "sku")
+        )
+        if reindex_category:
+            self._unindex_category(product)
+        if reindex_price:
+            self._unindex_price(product)
+        if reindex_stock:
+            self._unindex_stock(product)
+
+        product.update(changes)
+
+        if reindex_category:
+            self._index_category(product)
+        if reindex_price:
+            self._by_price.add((product["price"], product_id))
+        if reindex_stock:
+            self._index_stock(product)
+
+        if reindex_category:
+            self._touch(previous_category)
+        self._touch(product["category"])
+        if catalog_changed:
+            self._catalog_version = self._version
+        return product
+
+    def _touch(self, category: str):
+        """Record a change to a category's products (after it is applied, see version)"""
+        self._version += 1
+        self._category_versions[category.lower()] = self._version
+
+    def _replaced(self):
+        """Record that the whole table was replaced, changing every category"""
+        self._version += 1
+        self._category_versions = {}
+        self._loaded_version = self._version
+        self._catalog_version = self._version
+
+    def _index_category(self, product: dict):
+        category = product["category"]
+        key = category.lower()
+        category_ids = self._by_category.get(key)
+        if category_ids is None:
+            category_ids = self._by_category[key] = SortedIdSet()
+        category_ids.add(product["id"])
+        self._category_counts[category] = self._category_counts.get(category, 0) + 1
+
+    def _unindex_category(self, product: dict):
+        category = product["category"]
+        key = category.lower()
+        category_ids = self._by_category[key]
+        category_ids.discard(product["id"])
+        if not category_ids:
+            del self._by_category[key]
+        self._category_counts[category] -= 1
+        if not self._category_counts[category]:
+            del self._category_counts[category]
+
+    def _unindex_price(self, product: dict):
+        self._by_price.remove((product["price"], product["id"]))
+
+    def _index_stock(self, product: dict):
+        if product["stock"] > 0:
+            self._in_stock.add(product["id"])
+        else:
+            self._out_of_stock.add(product["id"])
+
+    def _unindex_stock(self, product: dict):
+        self._in_stock.discard(product["id"])
+        self._out_of_stock.discard(product["id"])
+
+
+class _SnapshotRows:
+    """Row access over a memory-mapped product snapshot"""
+
+    def __init__(self, table: ColumnarTable):
+        self.table = table
+        self.ids = table.column("id")
+        self.prices = table.column("price")
+        self.stocks = table.column("stock")
+        self._names = table.column("name")
+        self._descriptions = table.column("description")
+        self._category_ids = table.column("category")
+        self._skus = table.column("sku")
+        # Categories are few; decode each one once
+        self.categories = {
+            category_id: table.string(category_id)
+            for category_id in set(self._category_ids.tolist())
+        }
+        # Row numbers ordered by SKU, for binary search without a SKU dict
+        self._sku_order = table.column("sku_order")
+
+    def row_index(self, product_id: int) -> int:
+        # Snapshot rows are written in ascending id order
+        return bisect_left(self.ids, product_id)
+
+    def category(self, row: int) -> str:
+        return self.categories[self._category_ids[row]]
+
+    def row(self, product_id: int) -> dict:
+        row = self.row_index(product_id)
+        string = self.table.string
+        return {
+            "id": product_id,
+            "name": string(self._names[row]),
+            "description": string(self._descriptions[row]),
+            "price": self.prices[row],
+            "stock": self.stocks[row],
+            "category": self.categories[self._category_ids[row]],
+            "sku": string(self._skus[row])
+        }
+
+    def value(self, field: str, product_id: int):
+        return self.table.value(field, self.row_index(product_id))
+
+    def find_sku(self, sku: str) -> Optional[int]:
+        """Id of the snapshot row with this SKU, or None"""
+        order = self._sku_order
+        string = self.table.string
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if string(self._skus[order[middle]]) < sku:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and string(self._skus[order[low]]) == sku:
+            return self.ids[order[low]]
+        return None
+
+
+# Product service database
+products_db = ProductStore(copy.deepcopy(SEED_PRODUCTS))
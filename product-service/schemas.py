@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 
 class ProductBase(BaseModel):
     name: str
@@ -22,3 +22,39 @@ class ProductUpdate(BaseModel):
 
 class Product(ProductBase):
     id: int
+
+class ProductBulkUpsert(BaseModel):
+    products: List[ProductCreate]
+
+class ProductBulkUpsertResult(BaseModel):
+    id: int
+    sku: str
+    status: str  # created, updated
+
+class ProductBulkUpsertResponse(BaseModel):
+    created: int
+    updated: int
+    results: List[ProductBulkUpsertResult]
+
+class StockAdjustment(BaseModel):
+    product_id: int
+    quantity: int
+
+class StockBulkAdjust(BaseModel):
+    adjustments: List[StockAdjustment]
+
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0, description="Quantity must be greater than 0")
+
+class ReservationRequest(BaseModel):
+    items: List[ReservationItem]
+
+class ReservationBatch(BaseModel):
+    # Independent operations, each applied all-or-nothing on its own
+    reserve: List[ReservationRequest] = []
+    commit: List[str] = []
+    release: List[str] = []
+
+class ProductLookup(BaseModel):
+    ids: List[int]
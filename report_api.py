@@ -6,18 +6,41 @@ Runs on port 5000 (separate from main API on port 8000)
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import json
-import glob
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 from pathlib import Path
 
+from report_rollups import ReportRollups, format_rate
+from report_stream import is_failed_result, iter_report_json, read_report_header
+from report_watcher import ReportWatcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the report directory watcher for the lifetime of the app"""
+    live_feed.bind(asyncio.get_running_loop())
+    # Build the rollups before serving; from then on the watcher keeps them in sync
+    await asyncio.to_thread(sync_all_rollups)
+    watcher = ReportWatcher(TESTCASES_DIR, TEST_TYPES, on_reports_changed, poll_interval=WATCH_POLL_INTERVAL)
+    watcher.start()
+    try:
+        yield
+    finally:
+        watcher.stop()
+        live_feed.bind(None)
+
+
 app = FastAPI(
     title="Test Reports API",
     description="API for serving automated test reports",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for React frontend
@@ -33,43 +56,246 @@ app.add_middleware(
 SCRIPT_DIR = Path(__file__).parent.resolve()
 TESTCASES_DIR = os.path.join(SCRIPT_DIR.parent, "automation", "testcases")
 TEST_TYPES = ['integration', 'system', 'component', 'regression', 'sanity']
+# Polling fallback interval for the report watcher, in seconds
+WATCH_POLL_INTERVAL = float(os.getenv("REPORT_WATCH_POLL_INTERVAL", "1.0"))
+# Idle time after which the live feed sends a keep-alive comment
+SSE_KEEPALIVE_SECONDS = 15
+# Longest window accepted by /api/trends
+MAX_TREND_DAYS = 3660
+
+
+class ReportIndex:
+    """
+    In-process index of report metadata.
+    Each report file is parsed once and its metadata cached under its path
+    together with the file's mtime and size. A call only stats the reports
+    directory; the directory is rescanned when its mtime changes, and only
+    new or changed files are re-parsed. Files that could not be parsed are
+    remembered the same way and only retried once they change. Files
+    modified in the last few seconds (possibly still being written) are
+    re-checked on every call until they settle. A file rewritten in place
+    leaves the directory mtime alone, so the report watcher asks for a
+    rescan (rescan=True) whenever it sees a report file change.
+    """
+
+    SETTLE_SECONDS = 2
+
+    def __init__(self):
+        # reports_dir -> _DirectoryState
+        self._dirs: Dict[str, "_DirectoryState"] = {}
+        self._lock = threading.Lock()
+
+    def reports(self, reports_dir: str, test_type: str, rescan: bool = False) -> List[Dict]:
+        """
+        All reports in a directory, newest first. rescan=True compares every
+        file's mtime and size with the cache even if the directory is unchanged.
+        """
+        try:
+            dir_mtime = os.stat(reports_dir).st_mtime_ns
+        except OSError:
+            return []
+
+        with self._lock:
+            state = self._dirs.get(reports_dir)
+            if rescan or state is None or state.mtime_ns != dir_mtime or self._needs_recheck(state):
+                state = self._scan(reports_dir, test_type, dir_mtime, state)
+                self._dirs[reports_dir] = state
+            return state.reports
+
+    def _scan(self, reports_dir: str, test_type: str, dir_mtime: int, previous: Optional["_DirectoryState"]):
+        state = _DirectoryState(dir_mtime)
+        known = previous.files if previous is not None else {}
+        known_failed = previous.failed if previous is not None else {}
+        now = datetime.now().timestamp()
+
+        with os.scandir(reports_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith("test_results_") and name.endswith(".json")):
+                    continue
+                path = entry.path
+                stat = entry.stat()
+
+                seen = (stat.st_mtime_ns, stat.st_size)
+                cached = known.get(path)
+                if cached is not None and cached[:2] == seen:
+                    report = cached[2]
+                elif known_failed.get(path) == seen:
+                    report = None
+                else:
+                    report = self._parse(path, test_type)
+
+                if report is None:
+                    state.failed[path] = seen
+                else:
+                    state.files[path] = (stat.st_mtime_ns, stat.st_size, report)
+                if now - stat.st_mtime < self.SETTLE_SECONDS:
+                    state.recheck[path] = seen
+
+        # Keep handing out the same list while nothing changed
+        if previous is not None and state.files.keys() == known.keys() and all(
+            state.files[path][2] is known[path][2] for path in known
+        ):
+            state.reports = previous.reports
+            return state
+
+        # File names embed the run timestamp, so name order is time order
+        state.reports = sorted(
+            (entry[2] for entry in state.files.values()),
+            key=lambda report: report['json_file'],
+            reverse=True
+        )
+        return state
+
+    def _needs_recheck(self, state: "_DirectoryState") -> bool:
+        """True if a file that was still settling has changed since the last scan"""
+        if not state.recheck:
+            return False
+        now = datetime.now().timestamp()
+        for path, seen in list(state.recheck.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if seen != (stat.st_mtime_ns, stat.st_size):
+                return True
+            if now - stat.st_mtime >= self.SETTLE_SECONDS:
+                del state.recheck[path]
+        return False
+
+    @staticmethod
+    def _parse(json_file: str, test_type: str) -> Optional[Dict]:
+        try:
+            # Streams the file so the results array is counted, never built
+            header = read_report_header(json_file)
+        except Exception as e:
+            print(f"Error reading {json_file}: {e}")
+            return None
+
+        filename = os.path.basename(json_file)
+        html_filename = filename.replace('test_results_', 'test_report_').replace('.json', '.html')
+        return {
+            'id': filename.replace('test_results_', '').replace('.json', ''),
+            'timestamp': header.get('timestamp', ''),
+            'test_type': test_type,
+            'summary': header.get('summary', {}),
+            'json_file': filename,
+            'html_file': html_filename,
+            'total_results': header['total_results']
+        }
+
+
+class _DirectoryState:
+    """Cached scan of one reports directory"""
+
+    __slots__ = ("mtime_ns", "files", "failed", "reports", "recheck")
+
+    def __init__(self, mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        # path -> (mtime_ns, size, report metadata)
+        self.files: Dict[str, tuple] = {}
+        # path -> (mtime_ns, size) of files that could not be parsed
+        self.failed: Dict[str, tuple] = {}
+        # reports newest first
+        self.reports: List[Dict] = []
+        # path -> (mtime_ns, size) at scan time of files still settling
+        self.recheck: Dict[str, tuple] = {}
+
+
+report_index = ReportIndex()
 
 
 def get_reports_for_type(test_type: str, limit: int = 10) -> List[Dict]:
-    """Get reports for a specific test type"""
+    """Get reports for a specific test type (newest first)"""
     reports_dir = os.path.join(TESTCASES_DIR, test_type, "reports")
+    return report_index.reports(reports_dir, test_type)[:limit]
 
-    if not os.path.exists(reports_dir):
-        return []
 
-    # Get all JSON reports, sorted by timestamp (newest first)
-    json_files = sorted(
-        glob.glob(os.path.join(reports_dir, "test_results_*.json")),
-        reverse=True
-    )[:limit]
+report_rollups = ReportRollups()
+
+
+def sync_rollups(test_type: str) -> ReportRollups:
+    """Bring the trend rollups for a test type up to date with its reports directory"""
+    reports_dir = os.path.join(TESTCASES_DIR, test_type, "reports")
+    report_rollups.sync(test_type, reports_dir, report_index.reports(reports_dir, test_type))
+    return report_rollups
+
+
+def sync_all_rollups():
+    """Bring the rollups for every test type up to date"""
+    for test_type in TEST_TYPES:
+        sync_rollups(test_type)
+
+
+class LiveReportFeed:
+    """
+    Latest report per test type, kept up to date by the report watcher and
+    pushed to Server-Sent Events subscribers whenever it changes.
+    """
+
+    _MISSING = object()
+
+    def __init__(self):
+        self.latest: Dict[str, Optional[Dict]] = {}
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop]):
+        """Set the event loop that subscriber queues live on"""
+        self._loop = loop
+
+    def refresh(self, test_type: str):
+        """Re-read the latest report for a type; called from the watcher thread"""
+        reports = get_reports_for_type(test_type, limit=1)
+        latest = reports[0] if reports else None
+
+        with self._lock:
+            # The index reuses metadata objects for unchanged files, so identity means unchanged
+            if self.latest.get(test_type, self._MISSING) is latest:
+                return
+            self.latest[test_type] = latest
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._publish, {'test_type': test_type, 'latest': latest})
+
+    def snapshot(self) -> Dict[str, Optional[Dict]]:
+        with self._lock:
+            return {test_type: self.latest.get(test_type) for test_type in TEST_TYPES}
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=100)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: Dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A slow client skips intermediate updates; the next event still carries the latest state
+                pass
 
-    reports = []
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-                filename = os.path.basename(json_file)
-                html_filename = filename.replace('test_results_', 'test_report_').replace('.json', '.html')
-
-                reports.append({
-                    'id': filename.replace('test_results_', '').replace('.json', ''),
-                    'timestamp': data.get('timestamp', ''),
-                    'test_type': test_type,
-                    'summary': data.get('summary', {}),
-                    'json_file': filename,
-                    'html_file': html_filename,
-                    'total_results': len(data.get('results', []))
-                })
-        except Exception as e:
-            print(f"Error reading {json_file}: {e}")
-            continue
 
-    return reports
+live_feed = LiveReportFeed()
+
+
+def on_reports_changed(test_type: str):
+    """Report watcher callback: rescan the directory, update the rollups, then notify live subscribers"""
+    # The change may be a report rewritten in place, which the directory mtime does not show
+    reports_dir = os.path.join(TESTCASES_DIR, test_type, "reports")
+    report_index.reports(reports_dir, test_type, rescan=True)
+    sync_rollups(test_type)
+    live_feed.refresh(test_type)
+
+
+def format_sse(event: str, data) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @app.get("/")
@@ -80,9 +306,11 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "summary": "/api/reports/summary",
+            "live_stream": "/api/reports/stream",
             "all_reports": "/api/reports",
             "by_type": "/api/reports/{test_type}",
             "specific_report": "/api/reports/{test_type}/{report_id}",
+            "trends": "/api/trends",
             "html_report": "/api/reports/{test_type}/{report_id}/html"
         }
     }
@@ -94,14 +322,11 @@ def get_summary():
     summary = {}
 
     for test_type in TEST_TYPES:
-        reports = get_reports_for_type(test_type, limit=1)
+        reports = get_reports_for_type(test_type, limit=100)
         if reports:
-            latest = reports[0]
-            all_reports = get_reports_for_type(test_type, limit=100)
-
             summary[test_type] = {
-                'latest': latest,
-                'total_reports': len(all_reports),
+                'latest': reports[0],
+                'total_reports': len(reports),
                 'has_reports': True
             }
         else:
@@ -127,6 +352,35 @@ def get_all_reports(limit: int = 10):
     return all_reports
 
 
+@app.get("/api/reports/stream")
+async def stream_reports():
+    """
+    Live feed of the latest report per test type (Server-Sent Events).
+    Sends a 'snapshot' event on connect, then a 'report' event whenever a
+    test type gets a new latest report.
+    """
+    queue = live_feed.subscribe()
+
+    async def events():
+        try:
+            yield format_sse('snapshot', live_feed.snapshot())
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse('report', event)
+        finally:
+            live_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/reports/{test_type}")
 def get_reports_by_type(test_type: str, limit: int = 10):
     """Get reports for a specific test type"""
@@ -148,20 +402,8 @@ def get_test_history(test_type: str, limit: int = 20):
     if test_type not in TEST_TYPES:
         raise HTTPException(status_code=404, detail=f"Test type '{test_type}' not found")
 
-    reports = get_reports_for_type(test_type, limit)
-
-    # Reverse to show oldest to newest for trend charts
-    history = []
-    for report in reversed(reports):
-        try:
-            timestamp = datetime.fromisoformat(report['timestamp'])
-            history.append({
-                'timestamp': report['timestamp'],
-                'formatted_time': timestamp.strftime('%m/%d %H:%M'),
-                'summary': report['summary']
-            })
-        except:
-            continue
+    # Oldest to newest for trend charts, served from the precomputed series
+    history = report_rollups.history(test_type, limit)
 
     return {
         'test_type': test_type,
@@ -184,8 +426,12 @@ def get_html_report(test_type: str, report_id: str):
 
 
 @app.get("/api/reports/{test_type}/{report_id}")
-def get_specific_report(test_type: str, report_id: str):
-    """Get a specific report with full details"""
+def get_specific_report(test_type: str, report_id: str, stream: bool = False, failed_only: bool = False):
+    """
+    Get a specific report with full details.
+    With stream=true the file is sent in chunks without being loaded;
+    failed_only=true (implies streaming) keeps only the failed results.
+    """
     if test_type not in TEST_TYPES:
         raise HTTPException(status_code=404, detail=f"Test type '{test_type}' not found")
 
@@ -194,6 +440,12 @@ def get_specific_report(test_type: str, report_id: str):
     if not os.path.exists(json_file):
         raise HTTPException(status_code=404, detail=f"Report '{report_id}' not found")
 
+    if stream or failed_only:
+        return StreamingResponse(
+            iter_report_json(json_file, result_filter=is_failed_result if failed_only else None),
+            media_type="application/json"
+        )
+
     with open(json_file, 'r') as f:
         data = json.load(f)
 
@@ -218,31 +470,43 @@ def get_stats():
     total_passed = 0
     total_failed = 0
 
-    for test_type in TEST_TYPES:
-        reports = get_reports_for_type(test_type, limit=1)
-        if reports:
-            latest = reports[0]
-            stats['by_type'][test_type] = latest['summary']
-            stats['total_reports'] += 1
+    # Latest report per type, from the rollups the report watcher keeps in sync
+    for test_type, summary in report_rollups.latest(TEST_TYPES).items():
+        stats['by_type'][test_type] = summary
+        stats['total_reports'] += 1
 
-            # Accumulate totals
-            summary = latest['summary']
-            total_tests += summary.get('total', 0)
-            total_passed += summary.get('passed', 0)
-            total_failed += summary.get('failed', 0)
+        # Accumulate totals
+        total_tests += summary.get('total', 0)
+        total_passed += summary.get('passed', 0)
+        total_failed += summary.get('failed', 0)
 
     # Calculate overall stats
     stats['overall_summary']['total_tests'] = total_tests
     stats['overall_summary']['passed'] = total_passed
     stats['overall_summary']['failed'] = total_failed
+    stats['overall_summary']['pass_rate'] = format_rate(total_passed, total_tests)
 
-    if total_tests > 0:
-        pass_rate = (total_passed / total_tests) * 100
-        stats['overall_summary']['pass_rate'] = f"{pass_rate:.1f}%"
+    # Totals over every report
+    stats['all_time'] = report_rollups.all_time(TEST_TYPES)
 
     return stats
 
 
+@app.get("/api/trends")
+def get_trends(days: int = 30, test_type: Optional[str] = None, flaky_limit: int = 10):
+    """
+    Aggregates over the last N days: pass rate per type and overall, daily
+    totals and the flakiest tests (tests that both passed and failed).
+    """
+    if test_type is not None and test_type not in TEST_TYPES:
+        raise HTTPException(status_code=404, detail=f"Test type '{test_type}' not found")
+    if days < 1 or days > MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_TREND_DAYS}")
+
+    test_types = [test_type] if test_type else TEST_TYPES
+    return report_rollups.window(test_types, days, flaky_limit=max(flaky_limit, 0))
+
+
 if __name__ == "__main__":
     import uvicorn
 
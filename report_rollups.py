@@ -0,0 +1,241 @@
+"""
+Precomputed report rollups
+Per test type: a time series of report summaries, daily pass/fail/total
+aggregates, daily per-test outcomes (for flaky test detection) and all-time
+totals. Rollups are updated incrementally from the report index when reports
+are added, rewritten or removed, so trend queries never touch report files.
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from report_stream import FAILED_STATUSES, PASSED_STATUSES, iter_results, result_status
+
+# Counter layout for daily and all-time aggregates
+REPORTS, TOTAL, PASSED, FAILED = range(4)
+
+
+def format_rate(count: int, total: int) -> str:
+    return f"{(count / total) * 100:.1f}%" if total > 0 else "0%"
+
+
+def _counts(summary) -> tuple:
+    def number(key):
+        value = summary.get(key, 0) if isinstance(summary, dict) else 0
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+    return number('total'), number('passed'), number('failed')
+
+
+class _ReportPoint:
+    """Rollup contribution of one report"""
+
+    __slots__ = ("report", "day", "history")
+
+    def __init__(self, report: Dict):
+        self.report = report
+        try:
+            timestamp = datetime.fromisoformat(report['timestamp'])
+        except (TypeError, ValueError):
+            self.day = None
+            self.history = None
+            return
+        self.day = timestamp.date().isoformat()
+        self.history = {
+            'timestamp': report['timestamp'],
+            'formatted_time': timestamp.strftime('%m/%d %H:%M'),
+            'summary': report['summary']
+        }
+
+
+class _TypeRollup:
+    def __init__(self):
+        # The index's report list this rollup was last synced with
+        self.source: Optional[List[Dict]] = None
+        # json_file -> _ReportPoint
+        self.points: Dict[str, _ReportPoint] = {}
+        # Points oldest first
+        self.series: List[_ReportPoint] = []
+        # day -> [reports, total, passed, failed]
+        self.daily: Dict[str, List[int]] = {}
+        # day -> test name -> [passed, failed]
+        self.tests_daily: Dict[str, Dict[str, List[int]]] = {}
+        self.totals = [0, 0, 0, 0]
+
+
+class ReportRollups:
+    """
+    Rollups for every test type, kept in sync with the report index.
+    sync() is cheap when nothing changed (one identity check), and only new
+    or rewritten report files are read for their per-test outcomes.
+    """
+
+    def __init__(self):
+        self._types: Dict[str, _TypeRollup] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, test_type: str, reports_dir: str, reports: List[Dict]):
+        """Bring a type's rollup up to date with the index's reports (newest first)"""
+        with self._lock:
+            rollup = self._types.setdefault(test_type, _TypeRollup())
+            # The index hands out the same list until the directory changes
+            if rollup.source is reports:
+                return
+
+            current = {report['json_file']: report for report in reports}
+            stale_days = set()
+            for json_file, point in list(rollup.points.items()):
+                if current.get(json_file) is not point.report:
+                    del rollup.points[json_file]
+                    self._apply(rollup, point, -1)
+                    if point.day is not None:
+                        stale_days.add(point.day)
+
+            # Per-test outcomes cannot be subtracted, so days that lost a report are rebuilt
+            for day in stale_days:
+                rollup.tests_daily.pop(day, None)
+                for point in rollup.points.values():
+                    if point.day == day:
+                        self._add_outcomes(rollup, point, reports_dir)
+
+            for json_file, report in current.items():
+                if json_file not in rollup.points:
+                    point = _ReportPoint(report)
+                    rollup.points[json_file] = point
+                    self._apply(rollup, point, 1)
+                    self._add_outcomes(rollup, point, reports_dir)
+
+            rollup.series = [rollup.points[report['json_file']] for report in reversed(reports)]
+            rollup.source = reports
+
+    def history(self, test_type: str, limit: int) -> List[Dict]:
+        """Summaries of the newest `limit` reports, oldest first"""
+        rollup = self._types.get(test_type)
+        if rollup is None or limit <= 0:
+            return []
+        return [point.history for point in rollup.series[-limit:] if point.history is not None]
+
+    def latest(self, test_types: List[str]) -> Dict[str, Dict]:
+        """Summary of the newest report of each type; types without reports are left out"""
+        with self._lock:
+            latest = {}
+            for test_type in test_types:
+                rollup = self._types.get(test_type)
+                if rollup is not None and rollup.series:
+                    latest[test_type] = rollup.series[-1].report['summary']
+            return latest
+
+    def all_time(self, test_types: List[str]) -> Dict:
+        """All-time aggregate over every report of the given types"""
+        overall = [0, 0, 0, 0]
+        with self._lock:
+            for test_type in test_types:
+                rollup = self._types.get(test_type)
+                if rollup is not None:
+                    for i in range(4):
+                        overall[i] += rollup.totals[i]
+        return self._format(overall)
+
+    def window(self, test_types: List[str], days: int, flaky_limit: int = 10, today: Optional[date] = None) -> Dict:
+        """Aggregates over the last `days` calendar days (today included)"""
+        end = today or date.today()
+        start = end - timedelta(days=days - 1)
+        day_keys = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+        with self._lock:
+            by_type = {}
+            overall = [0, 0, 0, 0]
+            daily = {day: [0, 0, 0, 0] for day in day_keys}
+            tests = {}
+            for test_type in test_types:
+                rollup = self._types.get(test_type)
+                type_counts = [0, 0, 0, 0]
+                if rollup is not None:
+                    for day in day_keys:
+                        counts = rollup.daily.get(day)
+                        if counts is not None:
+                            for i in range(4):
+                                type_counts[i] += counts[i]
+                                daily[day][i] += counts[i]
+                        for name, (passed, failed) in rollup.tests_daily.get(day, {}).items():
+                            outcome = tests.setdefault((test_type, name), [0, 0])
+                            outcome[0] += passed
+                            outcome[1] += failed
+                for i in range(4):
+                    overall[i] += type_counts[i]
+                by_type[test_type] = self._format(type_counts)
+
+        # A test is flaky in the window if it both passed and failed
+        flaky = [
+            (min(passed, failed), failed, test_type, name, passed)
+            for (test_type, name), (passed, failed) in tests.items()
+            if passed and failed
+        ]
+        flaky.sort(key=lambda item: (-item[0], -item[1], item[2], item[3]))
+
+        return {
+            'days': days,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'overall': self._format(overall),
+            'by_type': by_type,
+            'daily': [{'date': day, **self._format(daily[day])} for day in day_keys],
+            'flakiest_tests': [
+                {
+                    'test_type': test_type,
+                    'name': name,
+                    'runs': passed + failed,
+                    'passed': passed,
+                    'failed': failed,
+                    'fail_rate': format_rate(failed, passed + failed)
+                }
+                for _, failed, test_type, name, passed in flaky[:flaky_limit]
+            ]
+        }
+
+    @staticmethod
+    def _format(counts: List[int]) -> Dict:
+        return {
+            'reports': counts[REPORTS],
+            'total_tests': counts[TOTAL],
+            'passed': counts[PASSED],
+            'failed': counts[FAILED],
+            'pass_rate': format_rate(counts[PASSED], counts[TOTAL])
+        }
+
+    @staticmethod
+    def _apply(rollup: _TypeRollup, point: _ReportPoint, sign: int):
+        total, passed, failed = _counts(point.report['summary'])
+        targets = [rollup.totals]
+        if point.day is not None:
+            targets.append(rollup.daily.setdefault(point.day, [0, 0, 0, 0]))
+        for counts in targets:
+            counts[REPORTS] += sign
+            counts[TOTAL] += sign * total
+            counts[PASSED] += sign * passed
+            counts[FAILED] += sign * failed
+        if point.day is not None and not rollup.daily[point.day][REPORTS]:
+            del rollup.daily[point.day]
+
+    @staticmethod
+    def _add_outcomes(rollup: _TypeRollup, point: _ReportPoint, reports_dir: str):
+        if point.day is None:
+            return
+        outcomes = rollup.tests_daily.setdefault(point.day, {})
+        json_file = os.path.join(reports_dir, point.report['json_file'])
+        try:
+            for result in iter_results(json_file):
+                status = result_status(result)
+                if status in PASSED_STATUSES:
+                    index = 0
+                elif status in FAILED_STATUSES:
+                    index = 1
+                else:
+                    continue
+                name = result.get('name') or result.get('nodeid')
+                if not isinstance(name, str):
+                    continue
+                outcomes.setdefault(name, [0, 0])[index] += 1
+        except Exception as e:
+            print(f"Error reading results from {json_file}: {e}")
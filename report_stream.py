@@ -0,0 +1,211 @@
+"""
+Streaming readers for test_results_*.json files
+Regression runs produce result files of tens of MB, almost all of it in the
+top-level "results" array. These helpers walk the file in fixed-size chunks
+and decode one value at a time, so memory stays bounded by the largest
+single result entry instead of the whole report.
+"""
+
+import json
+import re
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+# Result entries whose status (or pytest-style outcome) is one of these are failures
+FAILED_STATUSES = {"failed", "failure", "error"}
+PASSED_STATUSES = {"passed", "pass", "success"}
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*")
+_ITEM_SEPARATOR = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class ReportFormatError(ValueError):
+    """Raised when a report file is not a JSON object of the expected shape."""
+
+
+class _ChunkedJsonReader:
+    """Cursor over a JSON text file that is read one chunk at a time"""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Drop consumed text and append the next chunk. False at end of file."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at end of file"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ReportFormatError(f"Expected '{char}' at offset {self._pos}")
+        self._pos += 1
+
+    def value(self) -> Tuple[object, str]:
+        """Decode the next value; returns it together with its source text"""
+        self.peek()
+        return self._decode()
+
+    def _decode(self) -> Tuple[object, str]:
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise ReportFormatError(f"Invalid JSON value at offset {self._pos}")
+            # A number running up to the end of the buffer may continue in the next chunk
+            if not self._eof and _NUMBER_TAIL.fullmatch(self._buf, end) and self._fill():
+                continue
+            text = self._buf[self._pos:end]
+            self._pos = end
+            return value, text
+
+    def members(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller must consume each value"""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key, _ = self.value()
+            if not isinstance(key, str):
+                raise ReportFormatError("Object key must be a string")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def items(self) -> Iterator[Tuple[object, str]]:
+        """Iterate the elements of an array one at a time"""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        yield self.value()
+        while True:
+            # Fast path: the separator and the start of the next item are already buffered
+            match = _ITEM_SEPARATOR.match(self._buf, self._pos)
+            if match is not None and match.end() < len(self._buf):
+                self._pos = match.end()
+                yield self._decode()
+            elif self.peek() == ",":
+                self._pos += 1
+                yield self.value()
+            else:
+                self.expect("]")
+                return
+
+
+def read_report_header(json_file: str) -> Dict:
+    """
+    Top-level fields of a report except "results", plus 'total_results'
+    (the length of the results array), without loading the array.
+    """
+    header = {}
+    total_results = 0
+    with open(json_file, "r", encoding="utf-8") as f:
+        reader = _ChunkedJsonReader(f)
+        for key in reader.members():
+            if key == "results" and reader.peek() == "[":
+                for _ in reader.items():
+                    total_results += 1
+            else:
+                header[key], _ = reader.value()
+    header["total_results"] = total_results
+    return header
+
+
+def iter_results(json_file: str) -> Iterator[object]:
+    """Yield the entries of a report's results array one at a time"""
+    with open(json_file, "r", encoding="utf-8") as f:
+        reader = _ChunkedJsonReader(f)
+        for key in reader.members():
+            if key == "results" and reader.peek() == "[":
+                for result, _ in reader.items():
+                    yield result
+            else:
+                reader.value()
+
+
+def result_status(result) -> Optional[str]:
+    """Lowercased status (or pytest-style outcome) of a result entry"""
+    if not isinstance(result, dict):
+        return None
+    status = result.get("status", result.get("outcome"))
+    return status.lower() if isinstance(status, str) else None
+
+
+def is_failed_result(result) -> bool:
+    return result_status(result) in FAILED_STATUSES
+
+
+def iter_report_json(
+    json_file: str,
+    result_filter: Optional[Callable[[object], bool]] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Yield a report as JSON text in pieces of about chunk_size characters.
+    Without a filter this is a plain passthrough of the file; with one, only
+    the results entries it accepts are written out and every other top-level
+    field is copied as-is.
+    """
+    with open(json_file, "r", encoding="utf-8") as f:
+        if result_filter is None:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+        reader = _ChunkedJsonReader(f, chunk_size)
+        pending = []
+        pending_size = 0
+        separator = "{"
+        for key in reader.members():
+            pending.append(f"{separator}{json.dumps(key)}:")
+            separator = ","
+            if key != "results" or reader.peek() != "[":
+                _, text = reader.value()
+                pending.append(text)
+                continue
+
+            item_separator = "["
+            for result, text in reader.items():
+                if not result_filter(result):
+                    continue
+                pending.append(item_separator + text)
+                item_separator = ","
+                pending_size += len(text)
+                if pending_size >= chunk_size:
+                    yield "".join(pending)
+                    pending = []
+                    pending_size = 0
+            pending.append("[]" if item_separator == "[" else "]")
+
+        pending.append("{}" if separator == "{" else "}")
+        yield "".join(pending)
@@ -0,0 +1,160 @@
+"""
+Report directory watcher
+Watches <testcases>/<test_type>/reports for new test_results_*.json files and
+calls back with the test type that changed. Uses Linux inotify (through
+ctypes, no extra dependency) when available and falls back to polling, which
+lets the report index's directory-mtime check detect new files.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """libc handle with inotify support, or None when unavailable"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1") or not hasattr(libc, "inotify_add_watch"):
+        return None
+    return libc
+
+
+def is_report_file(name: str) -> bool:
+    return name.startswith("test_results_") and name.endswith(".json")
+
+
+class ReportWatcher:
+    """
+    Background thread that calls on_change(test_type) whenever a report file
+    appears in, is rewritten in or is removed from a test type's reports
+    directory. on_change is called once per type at startup as well.
+    """
+
+    def __init__(
+        self,
+        testcases_dir: str,
+        test_types: List[str],
+        on_change: Callable[[str], None],
+        poll_interval: float = 1.0,
+        use_inotify: bool = True
+    ):
+        self.testcases_dir = testcases_dir
+        self.test_types = list(test_types)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None  # "inotify" or "poll" once running
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="report-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _reports_dir(self, test_type: str) -> str:
+        return os.path.join(self.testcases_dir, test_type, "reports")
+
+    def _notify(self, test_type: str):
+        try:
+            self.on_change(test_type)
+        except Exception as e:
+            print(f"Report watcher callback failed for {test_type}: {e}")
+
+    def _run(self):
+        for test_type in self.test_types:
+            self._notify(test_type)
+
+        libc = _load_inotify() if self.use_inotify else None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if libc is not None else -1
+        if fd < 0:
+            self.mode = "poll"
+            self._poll()
+            return
+
+        self.mode = "inotify"
+        try:
+            self._watch(libc, fd)
+        finally:
+            os.close(fd)
+
+    def _poll(self):
+        # Each poll rescans the directories; the report index only re-reads files that changed
+        while not self._stop.wait(self.poll_interval):
+            for test_type in self.test_types:
+                self._notify(test_type)
+
+    def _watch(self, libc, fd: int):
+        watches: Dict[int, str] = {}
+        while not self._stop.is_set():
+            # Reports directories may be created after startup
+            if len(watches) < len(self.test_types):
+                self._add_missing_watches(libc, fd, watches)
+
+            ready, _, _ = select.select([fd], [], [], self.poll_interval)
+            if not ready:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+
+            changed = set()
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                start = offset + _EVENT_HEADER.size
+                name = data[start:start + length].rstrip(b"\0").decode("utf-8", "replace")
+                offset = start + length
+
+                if mask & IN_IGNORED:
+                    # Directory was removed; re-added once it exists again
+                    test_type = watches.pop(wd, None)
+                    if test_type is not None:
+                        changed.add(test_type)
+                elif wd in watches and is_report_file(name):
+                    changed.add(watches[wd])
+
+            for test_type in changed:
+                self._notify(test_type)
+
+    def _add_missing_watches(self, libc, fd: int, watches: Dict[int, str]):
+        watched = set(watches.values())
+        for test_type in self.test_types:
+            if test_type in watched:
+                continue
+            reports_dir = self._reports_dir(test_type)
+            if not os.path.isdir(reports_dir):
+                continue
+            wd = libc.inotify_add_watch(fd, os.fsencode(reports_dir), WATCH_MASK)
+            if wd >= 0:
+                watches[wd] = test_type
+                # Catch up on files written before the watch existed
+                self._notify(test_type)
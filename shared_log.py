@@ -0,0 +1,195 @@
+# Change log shared by the worker processes of one service
+# With uvicorn --workers every worker keeps its own in-memory store (indexes,
+# lock-free reads) and the workers stay in step through one SQLite database in
+# WAL mode. A write takes SQLite's write lock (BEGIN IMMEDIATE, so writes from
+# all workers are serialized), applies the records other workers committed
+# since this worker last looked, makes its own change, appends it as a record
+# and commits. Before each request a worker checks PRAGMA data_version, which
+# moves whenever another connection commits, and applies what it missed.
+#
+# Transactions and catch-ups can wait up to BUSY_TIMEOUT_SECONDS for other
+# workers and fsync on commit, so the stores run them in a worker thread when
+# called from the event loop (see the stores' async writes and arefresh()).
+# The data_version check is the only call made on the loop; it has its own
+# connection, so it never waits behind a transaction running in a thread.
+#
+# Records are the stores' own log records (see OrderStore._replay and
+# ProductStore._replay) and must be applied deterministically: all workers
+# replay the same records, so all of them hold the same rows and the same
+# version counters.
+#
+# The log is compacted with checkpoints. Every checkpoint_every records the
+# writing worker stores the full state of its store (rows and counters) with
+# the sequence number it covers, in the same transaction, and deletes the
+# records up to the previous checkpoint. A worker that is behind by less than
+# one interval still catches up from records; one that is further behind (or
+# just starting) restores the checkpoint and replays the records after it.
+# SQLite reuses the freed pages, so the file stops growing.
+
+import json
+import secrets
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Callable
+
+# Seconds a worker waits for another worker's write transaction
+BUSY_TIMEOUT_SECONDS = 30.0
+# Records between checkpoints; bounds what a starting worker replays
+CHECKPOINT_EVERY = 100_000
+
+
+class SharedLog:
+    """
+    One service's change log in a SQLite database. apply(record) is called for
+    every record committed by another worker; the caller holds its store lock
+    around catch_up() and transaction(). dump() returns the store's full state
+    as JSON-serializable data for a checkpoint, and restore(state) replaces the
+    store's state with a checkpoint's. id is a random token created with the
+    database: versions only mean the same thing in processes sharing a log.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        apply: Callable[[list], None],
+        dump: Callable[[], Any],
+        restore: Callable[[Any], None],
+        sync: bool = True,
+        checkpoint_every: int = CHECKPOINT_EVERY
+    ):
+        self.path = path
+        self.sequence = 0
+        self.checkpoint_every = checkpoint_every
+        self.records_applied = 0
+        self.records_written = 0
+        self.checkpoints_written = 0
+        self.checkpoints_restored = 0
+        self._apply = apply
+        self._dump = dump
+        self._restore = restore
+        self._data_version = None
+        # Autocommit mode: transactions are started explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs the WAL on every commit; NORMAL may lose the last commits on power loss
+        self._db.execute(f"PRAGMA synchronous={'FULL' if sync else 'NORMAL'}")
+        # Workers starting together race to create the tables
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("CREATE TABLE IF NOT EXISTS log (seq INTEGER PRIMARY KEY, record TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # At most one row: the state at seq; the log holds every record after truncated
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint (id INTEGER PRIMARY KEY CHECK (id = 0), "
+            "seq INTEGER NOT NULL, truncated INTEGER NOT NULL, state TEXT NOT NULL)"
+        )
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('id', ?)", (secrets.token_hex(4),))
+        self._db.execute("COMMIT")
+        self.id = self._db.execute("SELECT value FROM meta WHERE key = 'id'").fetchone()[0]
+        # Only for PRAGMA data_version, so changed() never waits on _db's connection mutex
+        self._version_db = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False
+        )
+
+    def changed(self) -> bool:
+        """Whether another worker may have committed since the last catch_up()"""
+        return self._data_version_now() != self._data_version
+
+    def catch_up(self) -> int:
+        """Apply the records committed after this worker's sequence; returns how many"""
+        # Read before the records: a commit after this point moves it again
+        self._data_version = self._data_version_now()
+        checkpoint_sequence, truncated = self._checkpoint_position()
+        if self.sequence < truncated:
+            # Records this worker has not applied were deleted; start over from the checkpoint
+            state = self._db.execute("SELECT state FROM checkpoint").fetchone()[0]
+            self._restore(json.loads(state))
+            self.sequence = checkpoint_sequence
+            self.checkpoints_restored += 1
+        applied = 0
+        for sequence, record in self._db.execute(
+            "SELECT seq, record FROM log WHERE seq > ? ORDER BY seq", (self.sequence,)
+        ):
+            self._apply(json.loads(record))
+            self.sequence = sequence
+            applied += 1
+        self.records_applied += applied
+        return applied
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the cross-process write lock with this worker caught up. Records
+        appended inside are committed together on exit and dropped if the
+        block raises. The caller must not have changed its store before an
+        exception; a failing COMMIT leaves this worker ahead of the log.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        caught_up = None
+        try:
+            self.catch_up()
+            caught_up = self.sequence
+            yield
+            if self.sequence - self._checkpoint_position()[0] >= self.checkpoint_every:
+                self._checkpoint()
+            self._db.execute("COMMIT")
+        except BaseException:
+            # Rolled-back sequence numbers are handed out again
+            if caught_up is not None:
+                self.sequence = caught_up
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+
+    def append(self, record: list):
+        """Add a record to the current transaction"""
+        self.sequence = self._db.execute(
+            "INSERT INTO log (record) VALUES (?)", (json.dumps(record, separators=(",", ":")),)
+        ).lastrowid
+        self.records_written += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "sequence": self.sequence,
+            "records_applied": self.records_applied,
+            "records_written": self.records_written,
+            "checkpoints_written": self.checkpoints_written,
+            "checkpoints_restored": self.checkpoints_restored
+        }
+
+    def close(self):
+        self._version_db.close()
+        self._db.close()
+
+    def _checkpoint_position(self) -> tuple[int, int]:
+        """(sequence the checkpoint covers, last deleted sequence); (0, 0) before the first checkpoint"""
+        row = self._db.execute("SELECT seq, truncated FROM checkpoint").fetchone()
+        return (row[0], row[1]) if row is not None else (0, 0)
+
+    def _checkpoint(self):
+        """Store the state at this worker's sequence and delete the records the previous checkpoint covers"""
+        previous, _ = self._checkpoint_position()
+        state = json.dumps(self._dump(), separators=(",", ":"))
+        # The newest record is always kept, so sequence numbers are never handed out twice
+        self._db.execute("DELETE FROM log WHERE seq <= ?", (previous,))
+        self._db.execute("INSERT OR REPLACE INTO checkpoint VALUES (0, ?, ?, ?)", (self.sequence, previous, state))
+        self.checkpoints_written += 1
+
+    def _data_version_now(self) -> int:
+        # Seen from a second connection it also moves with this worker's own commits, which
+        # costs one catch_up() that finds nothing
+        return self._version_db.execute("PRAGMA data_version").fetchone()[0]
+
+
+class RefreshMiddleware:
+    """ASGI middleware that brings the given stores up to date before each request"""
+
+    def __init__(self, app, stores):
+        self.app = app
+        self.stores = stores
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for store in self.stores:
+                await store.arefresh()
+        await self.app(scope, receive, send)
@@ -0,0 +1,161 @@
+# Shared in-memory index helpers for the service stores
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Iterator, Optional
+
+
+class SortedIdSet:
+    """
+    A set of integer ids that can be walked in ascending order from any id.
+
+    Backed by a sorted list plus a membership set. Removals only drop the id
+    from the membership set; the list is compacted once dead entries outnumber
+    live ones, so adding a new (highest) id and discarding are amortised O(1).
+    """
+
+    __slots__ = ("_ids", "_live")
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._live = set(ids)
+        self._ids = sorted(self._live)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._live
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_from()
+
+    def add(self, item_id: int):
+        if item_id in self._live:
+            return
+        self._live.add(item_id)
+        ids = self._ids
+        if not ids or item_id > ids[-1]:
+            ids.append(item_id)
+            return
+        # The id may still be in the list from an earlier discard
+        pos = bisect_left(ids, item_id)
+        if pos == len(ids) or ids[pos] != item_id:
+            insort(ids, item_id)
+
+    def discard(self, item_id: int):
+        if item_id not in self._live:
+            return
+        self._live.discard(item_id)
+        if len(self._ids) > 2 * len(self._live) + 32:
+            # Rebind instead of mutating so in-flight iterators keep a consistent list
+            self._ids = [i for i in self._ids if i in self._live]
+
+    def clear(self):
+        self._live = set()
+        self._ids = []
+
+    def iter_from(self, after: Optional[int] = None) -> Iterator[int]:
+        """Yield live ids in ascending order, starting after the given id."""
+        ids = self._ids
+        live = self._live
+        start = 0 if after is None else bisect_right(ids, after)
+        for pos in range(start, len(ids)):
+            item_id = ids[pos]
+            if item_id in live:
+                yield item_id
+
+
+class SortedList:
+    """
+    A sorted list of comparable items split into bounded buckets.
+
+    Inserts and removals only shift items within one bucket, so they stay
+    cheap at millions of entries, while range scans walk the buckets in order.
+    """
+
+    BUCKET_SIZE = 1000
+
+    __slots__ = ("_buckets", "_maxes", "_len")
+
+    def __init__(self, items: Iterable = ()):
+        self.load(items)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def load(self, items: Iterable):
+        """Replace the contents with the given items."""
+        items = sorted(items)
+        size = self.BUCKET_SIZE
+        self._buckets = [items[i:i + size] for i in range(0, len(items), size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(items)
+
+    def add(self, item):
+        if not self._buckets:
+            self._buckets.append([item])
+            self._maxes.append(item)
+            self._len = 1
+            return
+
+        pos = bisect_left(self._maxes, item)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._buckets[pos].append(item)
+            self._maxes[pos] = item
+        else:
+            insort(self._buckets[pos], item)
+        self._len += 1
+
+        bucket = self._buckets[pos]
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            tail = bucket[self.BUCKET_SIZE:]
+            del bucket[self.BUCKET_SIZE:]
+            self._buckets.insert(pos + 1, tail)
+            self._maxes[pos] = bucket[-1]
+            self._maxes.insert(pos + 1, tail[-1])
+
+    def remove(self, item) -> bool:
+        """Remove one occurrence of item. Returns False if it was not present."""
+        pos = bisect_left(self._maxes, item)
+        if pos == len(self._maxes):
+            return False
+        bucket = self._buckets[pos]
+        index = bisect_left(bucket, item)
+        if index == len(bucket) or bucket[index] != item:
+            return False
+        del bucket[index]
+        self._len -= 1
+        if bucket:
+            self._maxes[pos] = bucket[-1]
+        else:
+            del self._buckets[pos]
+            del self._maxes[pos]
+        return True
+
+    def count_range(self, low, high) -> int:
+        """Number of items with low <= item <= high."""
+        return max(self._position(high, bisect_right) - self._position(low, bisect_left), 0)
+
+    def irange(self, low, high) -> Iterator:
+        """Yield items with low <= item <= high in ascending order."""
+        pos = bisect_left(self._maxes, low)
+        if pos == len(self._maxes):
+            return
+        start = bisect_left(self._buckets[pos], low)
+        for bucket in self._buckets[pos:]:
+            for item in bucket[start:]:
+                if item > high:
+                    return
+                yield item
+            start = 0
+
+    def _position(self, key, bisect) -> int:
+        pos = bisect(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        before = sum(len(bucket) for bucket in self._buckets[:pos])
+        return before + bisect(self._buckets[pos], key)
@@ -1,15 +1,28 @@
 #!/bin/bash
 
 # Startup script for all services
-# Usage: ./start.sh [all|login|product|order]
-# Default: all
+# Usage: ./start.sh [all|login|product|order] [--workers N]
+# Default: all, one auto-reloading process per service
 
 # Get the directory where this script is located
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 cd "$SCRIPT_DIR"
 
-# Get service argument (default to "all")
-SERVICE="${1:-all}"
+# Get service argument (default to "all") and the number of workers per service (default 1)
+SERVICE="all"
+WORKERS=1
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --workers)
+            WORKERS="$2"
+            shift 2
+            ;;
+        *)
+            SERVICE="$1"
+            shift
+            ;;
+    esac
+done
 
 # Function to start a service
 start_service() {
@@ -32,8 +45,19 @@ start_service() {
     fi
 
     # Start the service
-    echo "🚀 Starting $service_name on port $port..."
-    nohup "$SCRIPT_DIR/autoagent/bin/python" -m uvicorn "$service_module:app" --reload --host 0.0.0.0 --port "$port" > "$log_file" 2>&1 &
+    if [ "$WORKERS" -gt 1 ]; then
+        # Production mode: no auto-reload; the workers of the product and order
+        # services keep their stores in step through shared SQLite logs in data/
+        echo "🚀 Starting $service_name on port $port with $WORKERS workers..."
+        mkdir -p "$SCRIPT_DIR/data"
+        nohup env \
+            PRODUCT_SHARED_LOG="${PRODUCT_SHARED_LOG:-$SCRIPT_DIR/data/products.db}" \
+            ORDER_SHARED_LOG="${ORDER_SHARED_LOG:-$SCRIPT_DIR/data/orders.db}" \
+            "$SCRIPT_DIR/autoagent/bin/python" -m uvicorn "$service_module:app" --workers "$WORKERS" --host 0.0.0.0 --port "$port" > "$log_file" 2>&1 &
+    else
+        echo "🚀 Starting $service_name on port $port..."
+        nohup "$SCRIPT_DIR/autoagent/bin/python" -m uvicorn "$service_module:app" --reload --host 0.0.0.0 --port "$port" > "$log_file" 2>&1 &
+    fi
 
     # Save the process ID
     echo $! > "$pid_file"
@@ -47,7 +71,7 @@ start_service() {
 
 # Display usage
 if [ "$SERVICE" == "--help" ] || [ "$SERVICE" == "-h" ]; then
-    echo "Usage: ./start.sh [all|login|product|order|ui]"
+    echo "Usage: ./start.sh [all|login|product|order|ui] [--workers N]"
     echo ""
     echo "Services:"
     echo "  all      - Start all services including UI (default)"
@@ -60,6 +84,7 @@ if [ "$SERVICE" == "--help" ] || [ "$SERVICE" == "-h" ]; then
     echo "  ./start.sh           # Start all services"
     echo "  ./start.sh login     # Start only login service"
     echo "  ./start.sh ui        # Start only UI"
+    echo "  ./start.sh product --workers 4   # Production mode: 4 workers, no auto-reload"
     exit 0
 fi
 
@@ -137,7 +162,7 @@ case "$SERVICE" in
         ;;
     *)
         echo "❌ Unknown service: $SERVICE"
-        echo "Usage: ./start.sh [all|login|product|order|ui]"
+        echo "Usage: ./start.sh [all|login|product|order|ui] [--workers N]"
         exit 1
         ;;
 esac
@@ -0,0 +1,6 @@
+# Tests import the services and the shared modules from the repository root,
+# the way the benchmarks do
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+"""
+Conditional list requests: a matching If-None-Match is answered with 304
+until a write changes the listing, per user for orders and per category
+for products, and invalid requests are rejected before the ETag check
+"""
+
+import datetime
+import importlib
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from jwt_config import SECRET_KEY, ALGORITHM
+
+product_main = importlib.import_module("product-service.main")
+order_main = importlib.import_module("order-service.main")
+
+
+def make_token() -> str:
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    return jwt.encode(
+        {"user_id": 1, "username": "test", "role": "admin", "exp": expires}, SECRET_KEY, algorithm=ALGORITHM
+    )
+
+
+@pytest.fixture
+def products():
+    client = TestClient(product_main.app, headers={"Authorization": f"Bearer {make_token()}"})
+    client.post("/reset-db")
+    yield client
+    client.post("/reset-db")
+
+
+@pytest.fixture
+def orders(monkeypatch):
+    # Orders in memory only; the lifespan reads the setting when the app starts
+    monkeypatch.setattr(order_main, "ORDER_DATA_DIR", "")
+    with TestClient(order_main.app, headers={"Authorization": f"Bearer {make_token()}"}) as client:
+        client.post("/reset-db")
+        yield client
+
+
+def etag(client: TestClient, path: str, **params) -> str:
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.json()
+    return response.headers["ETag"]
+
+
+def is_fresh(client: TestClient, path: str, tag: str, **params) -> bool:
+    response = client.get(path, params=params, headers={"If-None-Match": tag})
+    if response.status_code == 304:
+        assert response.headers["ETag"] == tag and not response.content
+        return True
+    assert response.status_code == 200
+    return False
+
+
+def test_order_list_answers_304_until_it_changes(orders):
+    tag = etag(orders, "/orders")
+    assert is_fresh(orders, "/orders", tag)
+    # Weak and listed tags match too
+    assert orders.get("/orders", headers={"If-None-Match": f'"other", W/{tag}'}).status_code == 304
+    orders.put("/orders/2", json={"shipping_address": "2 Side St"})
+    assert not is_fresh(orders, "/orders", tag)
+
+
+def test_order_etags_are_per_user(orders):
+    first_user = etag(orders, "/orders", user_id=1)
+    second_user = etag(orders, "/orders", user_id=2)
+    # Order 2 belongs to user 2
+    orders.put("/orders/2", json={"shipping_address": "2 Side St"})
+    assert is_fresh(orders, "/orders", first_user, user_id=1)
+    assert not is_fresh(orders, "/orders", second_user, user_id=2)
+
+
+def test_invalid_order_list_request_is_rejected_before_the_etag_check(orders):
+    tag = etag(orders, "/orders")
+    for params in ({"status": "lost"}, {"cursor": "not-a-cursor"}):
+        response = orders.get("/orders", params=params, headers={"If-None-Match": tag})
+        assert response.status_code == 400
+    response = orders.get("/orders", params={"status": "pending"}, headers={"If-None-Match": "*"})
+    assert response.status_code == 304
+
+
+def test_product_etags_are_per_category(products):
+    electronics = etag(products, "/products", category="Electronics")
+    accessories = etag(products, "/products", category="accessories")
+    everything = etag(products, "/products")
+
+    products.put("/products/1", json={"price": 899.99})
+    assert not is_fresh(products, "/products", electronics, category="Electronics")
+    assert is_fresh(products, "/products", accessories, category="Accessories")
+    assert not is_fresh(products, "/products", everything)
+
+    # Moving a product changes both the category it leaves and the one it joins
+    accessories = etag(products, "/products", category="Accessories")
+    electronics = etag(products, "/products", category="Electronics")
+    products.put("/products/1", json={"category": "Accessories"})
+    assert not is_fresh(products, "/products", accessories, category="Accessories")
+    assert not is_fresh(products, "/products", electronics, category="Electronics")
+
+
+def test_invalid_product_list_request_is_rejected_before_the_etag_check(products):
+    tag = etag(products, "/products", category="Electronics")
+    response = products.get(
+        "/products", params={"category": "Electronics", "cursor": "not-a-cursor"}, headers={"If-None-Match": tag}
+    )
+    assert response.status_code == 400
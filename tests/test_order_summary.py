@@ -0,0 +1,81 @@
+"""Per-user order summaries stay equal to a full recompute through every kind of write"""
+
+import importlib
+import random
+
+import pytest
+
+OrderStore = importlib.import_module("order-service.models").OrderStore
+
+STATUSES = ["pending", "processing", "shipped", "delivered", "cancelled"]
+USERS = 10
+
+
+def recompute(store, user_id: int) -> dict:
+    user_orders = [order for order in store if order.user_id == user_id]
+    orders_by_status = {}
+    for order in user_orders:
+        orders_by_status[order.status] = orders_by_status.get(order.status, 0) + 1
+    return {
+        "total_orders": len(user_orders),
+        "total_spent": round(sum(order.total_amount for order in user_orders), 2),
+        "orders_by_status": orders_by_status
+    }
+
+
+def random_order(rng: random.Random) -> dict:
+    items = [
+        {"product_id": 1, "product_name": "Item", "quantity": rng.randint(1, 5),
+         "price": round(rng.uniform(0.01, 500), 2)}
+        for _ in range(rng.randint(1, 3))
+    ]
+    return {
+        "user_id": rng.randint(1, USERS),
+        "items": items,
+        "total_amount": round(sum(item["quantity"] * item["price"] for item in items), 2),
+        "status": "pending",
+        "shipping_address": "x",
+        "created_at": "2025-01-10T10:00:00",
+        "updated_at": "2025-01-10T10:00:00"
+    }
+
+
+def assert_consistent(store, step: int):
+    for user_id in range(1, USERS + 1):
+        summary = store.user_summary(user_id)
+        summary["total_spent"] = round(summary["total_spent"], 2)
+        assert summary == recompute(store, user_id), f"step {step}, user {user_id}"
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_randomized_writes(seed):
+    rng = random.Random(seed)
+    store = OrderStore()
+    for step in range(300):
+        ids = [order.id for order in store]
+        op = rng.random()
+        if op < 0.4 or not ids:
+            store.insert(random_order(rng))
+        elif op < 0.5:
+            store.insert_many([random_order(rng) for _ in range(rng.randint(1, 4))])
+        elif op < 0.75:
+            store.update(rng.choice(ids), status=rng.choice(STATUSES))
+        elif op < 0.8:
+            store.update(rng.choice(ids), status="cancelled")
+        elif op < 0.98:
+            store.delete(rng.choice(ids))
+        else:
+            store.reset()
+        assert_consistent(store, step)
+
+
+def test_unknown_user_is_empty():
+    assert OrderStore().user_summary(42) == {"total_orders": 0, "total_spent": 0.0, "orders_by_status": {}}
+
+
+def test_user_without_orders_is_dropped():
+    store = OrderStore()
+    order = store.insert(random_order(random.Random(7)))
+    store.delete(order.id)
+    assert store.user_summary(order.user_id)["total_orders"] == 0
+    assert_consistent(store, 0)
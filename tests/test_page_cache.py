@@ -0,0 +1,83 @@
+"""
+/products page cache: a write drops only the cached pages of the category
+it touched (and the unfiltered listing), never serving a page built before it
+"""
+
+import datetime
+import importlib
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from jwt_config import SECRET_KEY, ALGORITHM
+from page_cache import PageCache
+
+product_main = importlib.import_module("product-service.main")
+
+
+def make_token() -> str:
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    return jwt.encode(
+        {"user_id": 1, "username": "test", "role": "admin", "exp": expires}, SECRET_KEY, algorithm=ALGORITHM
+    )
+
+
+@pytest.fixture
+def products(monkeypatch):
+    monkeypatch.setattr(product_main, "page_cache", PageCache(1024 * 1024))
+    client = TestClient(product_main.app, headers={"Authorization": f"Bearer {make_token()}"})
+    client.post("/reset-db")
+    yield client
+    client.post("/reset-db")
+
+
+def cache_counts(client: TestClient) -> tuple:
+    stats = client.get("/metrics/cache").json()
+    return stats["hits"], stats["misses"], stats["stale"]
+
+
+def test_write_keeps_other_categories_cached(products):
+    pages = [{"category": "Electronics"}, {"category": "Accessories"}, {"category": "Accessories", "limit": 1}, {}]
+    for params in pages:
+        products.get("/products", params=params)
+    assert cache_counts(products) == (0, 4, 0)
+    for params in pages:
+        products.get("/products", params=params)
+    assert cache_counts(products) == (4, 4, 0)
+
+    # Product 1 is in Electronics
+    products.put("/products/1", json={"price": 899.99})
+
+    # Accessories pages are still served from the cache
+    products.get("/products", params={"category": "Accessories"})
+    products.get("/products", params={"category": "accessories", "limit": 1})
+    assert cache_counts(products) == (6, 4, 0)
+
+    # The Electronics page and the unfiltered listing are rebuilt with the new price
+    electronics = products.get("/products", params={"category": "Electronics"}).json()
+    everything = products.get("/products").json()
+    assert cache_counts(products) == (6, 6, 2)
+    assert [p["price"] for p in electronics if p["id"] == 1] == [899.99]
+    assert [p["price"] for p in everything if p["id"] == 1] == [899.99]
+
+    # and cached again at the new version
+    products.get("/products", params={"category": "Electronics"})
+    assert cache_counts(products) == (7, 6, 2)
+
+
+def test_page_cache_serves_only_the_version_it_was_built_at():
+    cache = PageCache(10_000, max_entry_bytes=2_000)
+    cache.put("tools", 1, b"[1]", {})
+    assert cache.get("tools", 1) == (b"[1]", {})
+    # A page built from data read before a newer page was cached is not stored over it
+    cache.put("tools", 2, b"[1,2]", {})
+    cache.put("tools", 1, b"[1]", {})
+    assert cache.get("tools", 2) == (b"[1,2]", {})
+    # A lookup at a later version drops the entry
+    assert cache.get("tools", 3) is None
+    assert cache.get("tools", 2) is None
+    assert cache.stats()["stale"] == 1 and cache.stats()["entries"] == 0
+    # Pages over max_entry_bytes are not cached
+    cache.put("huge", 1, b"x" * 5_000, {})
+    assert cache.get("huge", 1) is None
@@ -0,0 +1,109 @@
+"""
+Cursor pagination: walking the pages returns every matching row exactly
+once, and a cursor only works with the filters it was issued for
+"""
+
+import datetime
+import importlib
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from jwt_config import SECRET_KEY, ALGORITHM
+from pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, encode_cursor, filter_fingerprint
+
+product_main = importlib.import_module("product-service.main")
+
+
+def make_token() -> str:
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    return jwt.encode(
+        {"user_id": 1, "username": "test", "role": "admin", "exp": expires}, SECRET_KEY, algorithm=ALGORITHM
+    )
+
+
+@pytest.fixture
+def products():
+    """The product service reset to its seed data plus 60 products over three categories"""
+    client = TestClient(product_main.app, headers={"Authorization": f"Bearer {make_token()}"})
+    client.post("/reset-db")
+    response = client.post("/products/bulk", json={"products": [
+        {"name": f"Part {i}", "description": "", "price": 1.0 + i, "stock": i % 4,
+         "category": ["Tools", "Garden", "Toys"][i % 3], "sku": f"PART-{i}"}
+        for i in range(60)
+    ]})
+    assert response.status_code == 200, response.json()
+    yield client
+    client.post("/reset-db")
+
+
+def walk(client: TestClient, params: dict, limit: int) -> list:
+    """Ids of every page, following X-Next-Cursor until it is absent"""
+    ids = []
+    cursor = None
+    while True:
+        page_params = {**params, "limit": limit}
+        if cursor is not None:
+            page_params["cursor"] = cursor
+        response = client.get("/products", params=page_params)
+        assert response.status_code == 200, response.json()
+        page = response.json()
+        assert len(page) <= limit
+        ids.extend(product["id"] for product in page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"category": "Tools"},
+    {"category": "garden", "in_stock": True},
+    {"min_price": 10, "max_price": 40},
+])
+@pytest.mark.parametrize("limit", [1, 7, 20, 100])
+def test_cursor_pages_cover_the_results_exactly_once(products, params, limit):
+    expected = [product["id"] for product in products.get("/products", params=params).json()]
+    assert expected
+    ids = walk(products, params, limit)
+    assert ids == expected
+    assert len(set(ids)) == len(ids)
+
+
+def test_rows_inserted_during_a_walk_do_not_repeat_rows(products):
+    first = products.get("/products", params={"category": "Tools", "limit": 5})
+    seen = [product["id"] for product in first.json()]
+    # A write between pages shifts offsets, but not the cursor's last seen id
+    products.post("/products", json={
+        "name": "New part", "description": "", "price": 2.0, "stock": 1, "category": "Tools", "sku": "PART-NEW"
+    })
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    while cursor:
+        response = products.get("/products", params={"category": "Tools", "limit": 5, "cursor": cursor})
+        seen.extend(product["id"] for product in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    assert len(set(seen)) == len(seen)
+    assert seen == [product["id"] for product in products.get("/products", params={"category": "Tools"}).json()]
+
+
+def test_cursor_from_other_filters_is_rejected(products):
+    cursor = products.get("/products", params={"category": "Tools", "limit": 5}).headers[NEXT_CURSOR_HEADER]
+    for params in ({"category": "Garden"}, {}, {"category": "Tools", "in_stock": True}):
+        response = products.get("/products", params={**params, "limit": 5, "cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Cursor does not match the current filters"
+    # The category filter is case-insensitive, so its cursor is too
+    assert products.get("/products", params={"category": "TOOLS", "limit": 5, "cursor": cursor}).status_code == 200
+    assert products.get("/products", params={"limit": 5, "cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_decode_cursor_checks_the_fingerprint():
+    tools = filter_fingerprint(category="tools", min_price=None)
+    assert filter_fingerprint(min_price=None, category="tools") == tools
+    cursor = encode_cursor(42, tools)
+    assert decode_cursor(cursor, tools) == 42
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, filter_fingerprint(category="garden", min_price=None))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("42", tools), tools)
@@ -0,0 +1,45 @@
+"""
+Login password checks recover from a password worker dying
+"""
+
+import asyncio
+import importlib
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+login = importlib.import_module("login.main")
+
+HASHED = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+
+
+@pytest.fixture
+def password_pool():
+    login.password_pool = login._new_password_pool()
+    yield
+    login.password_pool.shutdown(cancel_futures=True)
+    login.password_pool = None
+
+
+def test_dead_worker_answers_503_and_replaces_pool(password_pool):
+    async def scenario():
+        assert await login.verify_password_pooled("secret", HASHED)
+        broken = login.password_pool
+        # Kill a worker the way an OOM kill would
+        with pytest.raises(BrokenProcessPool):
+            await asyncio.get_running_loop().run_in_executor(broken, os._exit, 1)
+
+        with pytest.raises(HTTPException) as error:
+            await login.verify_password_pooled("secret", HASHED)
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"] == str(login.PASSWORD_RETRY_AFTER_SECONDS)
+        assert login.password_pool is not broken
+
+        assert await login.verify_password_pooled("secret", HASHED)
+        assert not await login.verify_password_pooled("wrong", HASHED)
+        assert login.password_checks_in_flight == 0
+
+    asyncio.run(scenario())
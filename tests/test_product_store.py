@@ -0,0 +1,178 @@
+"""
+Product store writes: large batches leave the event loop free, stock
+changes never oversell or half-apply, and changes to rows loaded from a
+columnar snapshot shadow the file through saves and reloads
+"""
+
+import asyncio
+import copy
+import importlib
+import random
+import threading
+
+import pytest
+
+product_models = importlib.import_module("product-service.models")
+ProductStore = product_models.ProductStore
+
+
+def test_large_batches_run_off_the_event_loop():
+    store = ProductStore(copy.deepcopy(product_models.SEED_PRODUCTS))
+    rows = [
+        {"name": f"Bolt {i}", "description": "", "price": 1.0 + i % 50, "stock": 10, "category": "Hardware",
+         "sku": f"BOLT-{i}"}
+        for i in range(50_000)
+    ]
+
+    async def scenario():
+        batch = asyncio.create_task(store.aupsert_many(rows))
+        await asyncio.sleep(0)
+        # A write arriving meanwhile queues behind the batch in a thread instead of blocking the loop
+        update = asyncio.create_task(store.aupdate(1, price=5.0))
+        ticks = 0
+        while not batch.done():
+            await asyncio.sleep(0.001)
+            ticks += 1
+        return await batch, await update, ticks
+
+    upserted, updated, ticks = asyncio.run(scenario())
+    assert ticks > 1
+    assert len(upserted) == 50_000 and all(created for _, created in upserted)
+    assert updated["price"] == 5.0
+    assert len(store) == 50_004
+
+
+def stock_store(stock: int) -> ProductStore:
+    return ProductStore([
+        {"id": 1, "name": "Laptop", "description": "", "price": 999.99, "stock": stock, "category": "Electronics",
+         "sku": "LAP-001"},
+        {"id": 2, "name": "Mouse", "description": "", "price": 29.99, "stock": stock, "category": "Electronics",
+         "sku": "MOU-001"}
+    ])
+
+
+def test_concurrent_reserve_and_adjust_never_oversell():
+    store = stock_store(200)
+    start = threading.Barrier(8)
+    lock = threading.Lock()
+    taken = {1: 0, 2: 0}
+    lowest = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        start.wait()
+        for _ in range(300):
+            items = {product_id: rng.randint(1, 5) for product_id in rng.sample([1, 2], rng.randint(1, 2))}
+            try:
+                if rng.random() < 0.5:
+                    store.reserve(items)
+                else:
+                    store.adjust_stock_many({product_id: -quantity for product_id, quantity in items.items()})
+            except ValueError:
+                continue
+            with lock:
+                for product_id, quantity in items.items():
+                    taken[product_id] += quantity
+            lowest.append(min(store.get(1)["stock"], store.get(2)["stock"]))
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert min(lowest) >= 0
+    # Every successful take is accounted for, and the demand exceeded the stock
+    assert store.get(1)["stock"] == 200 - taken[1] and store.get(2)["stock"] == 200 - taken[2]
+    assert store.get(1)["stock"] < 5 and store.get(2)["stock"] < 5
+
+
+@pytest.mark.parametrize("deltas, error", [
+    ({1: -3, 2: -11}, ValueError),
+    ({1: -3, 2: 4, 99: -1}, KeyError),
+])
+def test_failed_adjust_stock_many_leaves_stock_unchanged(deltas, error):
+    store = stock_store(10)
+    reservation = store.reserve({1: 2})
+    with pytest.raises(error):
+        store.adjust_stock_many(deltas)
+    assert (store.get(1)["stock"], store.get(2)["stock"]) == (8, 10)
+    # The store is still usable and the reservation is intact
+    store.release(reservation["id"])
+    store.adjust_stock_many({1: -10, 2: -10})
+    assert (store.get(1)["stock"], store.get(2)["stock"]) == (0, 0)
+
+
+QUERIES = [
+    {},
+    {"category": "tools"},
+    {"category": "Garden", "in_stock": True},
+    {"min_price": 5, "max_price": 20},
+    {"in_stock": False},
+    {"category": "toys", "min_price": 10, "limit": 3, "offset": 1},
+    {"after_id": 10, "limit": 5},
+]
+
+
+def snapshot_rows() -> list[dict]:
+    return [
+        {"id": i, "name": f"Part {i}", "description": "", "price": 1.0 + i, "stock": i % 3,
+         "category": ["Tools", "Garden", "Toys"][i % 3], "sku": f"PART-{i:02}"}
+        for i in range(1, 31)
+    ]
+
+
+def assert_same_table(store: ProductStore, expected: list[dict]):
+    reference = ProductStore(copy.deepcopy(expected))
+    assert list(store) == expected
+    for product in expected:
+        assert store.get(product["id"]) == product
+        assert store.get_by_sku(product["sku"]) == product
+    for filters in QUERIES:
+        assert store.query(**filters) == reference.query(**filters), filters
+
+
+def test_snapshot_overlay_shadows_the_file_across_saves(tmp_path):
+    store = ProductStore(snapshot_rows())
+    store.save_snapshot(str(tmp_path / "base.snap"))
+    store = ProductStore()
+    store.load_snapshot(str(tmp_path / "base.snap"))
+    assert_same_table(store, snapshot_rows())
+
+    store.update(3, price=50.0, sku="PART-03B")
+    store.update(4, category="Toys")
+    store.adjust_stock_many({5: 7, 8: -2})
+    store.delete(7)
+    store.delete(30)
+    inserted = store.insert({"name": "New", "description": "", "price": 2.0, "stock": 1, "category": "Garden",
+                             "sku": "PART-07"})
+
+    expected = {product["id"]: product for product in snapshot_rows()}
+    expected[3].update(price=50.0, sku="PART-03B")
+    expected[4]["category"] = "Toys"
+    expected[5]["stock"] += 7
+    expected[8]["stock"] -= 2
+    del expected[7], expected[30]
+    # Ids of deleted products are not reused
+    assert inserted["id"] == 31
+    expected[31] = inserted
+    expected = list(expected.values())
+
+    assert_same_table(store, expected)
+    # The old SKU of a changed row and deleted rows are gone, although they are still in the file
+    assert store.get_by_sku("PART-03") is None
+    assert store.get(7) is None and store.get(30) is None
+    assert store.get_by_sku("PART-07")["id"] == 31
+
+    # Saving writes the merged table; the reloaded store starts with an empty overlay
+    store.save_snapshot(str(tmp_path / "merged.snap"))
+    reloaded = ProductStore()
+    reloaded.load_snapshot(str(tmp_path / "merged.snap"))
+    assert reloaded._by_id == {}
+    assert_same_table(reloaded, expected)
+    assert reloaded.insert({"name": "Next", "description": "", "price": 1.0, "stock": 0, "category": "Tools",
+                            "sku": "NEXT"})["id"] == 32
+
+    # Loading a snapshot into a store with changes drops them
+    store.load_snapshot(str(tmp_path / "base.snap"))
+    assert_same_table(store, snapshot_rows())
@@ -0,0 +1,140 @@
+"""
+Report index caching: unchanged files, good or unreadable, are parsed once
+"""
+
+import json
+import os
+import time
+
+import report_api
+
+
+def write_report(reports_dir, name: str, content: str, age_seconds: float = 60):
+    # Write then rename, the way report generators publish files
+    path = os.path.join(reports_dir, name)
+    tmp_path = os.path.join(reports_dir, f".{name}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    # Older than SETTLE_SECONDS, so the index treats the file as complete
+    mtime = time.time() - age_seconds
+    os.utime(tmp_path, (mtime, mtime))
+    os.rename(tmp_path, path)
+
+
+def good_report(timestamp: str) -> str:
+    return json.dumps({
+        "timestamp": timestamp,
+        "summary": {"total": 1, "passed": 1, "failed": 0},
+        "results": [{"name": "test_ok", "status": "passed", "duration": 0.01}]
+    })
+
+
+def counting_index(monkeypatch):
+    index = report_api.ReportIndex()
+    parsed = []
+    parse = index._parse
+
+    def counting_parse(json_file, test_type):
+        parsed.append(os.path.basename(json_file))
+        return parse(json_file, test_type)
+
+    monkeypatch.setattr(index, "_parse", counting_parse)
+    return index, parsed
+
+
+def test_unchanged_files_are_parsed_once(tmp_path, monkeypatch):
+    write_report(tmp_path, "test_results_20250101_000000.json", good_report("2025-01-01T00:00:00"))
+    write_report(tmp_path, "test_results_20250102_000000.json", good_report("2025-01-02T00:00:00"))
+    index, parsed = counting_index(monkeypatch)
+
+    first = index.reports(str(tmp_path), "sanity")
+    assert [report["id"] for report in first] == ["20250102_000000", "20250101_000000"]
+    assert index.reports(str(tmp_path), "sanity") is first
+    assert len(parsed) == 2
+
+
+def test_unreadable_file_is_not_retried_until_it_changes(tmp_path, monkeypatch, capsys):
+    write_report(tmp_path, "test_results_20250101_000000.json", good_report("2025-01-01T00:00:00"))
+    write_report(tmp_path, "test_results_20250102_000000.json", good_report("2025-01-02")[:40])
+    index, parsed = counting_index(monkeypatch)
+
+    reports = index.reports(str(tmp_path), "sanity")
+    assert [report["id"] for report in reports] == ["20250101_000000"]
+    for _ in range(5):
+        assert index.reports(str(tmp_path), "sanity") is reports
+    assert parsed.count("test_results_20250102_000000.json") == 1
+    assert capsys.readouterr().out.count("Error reading") == 1
+
+    # A new file rescans the directory; the unchanged broken file is still not re-parsed
+    write_report(tmp_path, "test_results_20250103_000000.json", good_report("2025-01-03T00:00:00"))
+    index.reports(str(tmp_path), "sanity")
+    assert parsed.count("test_results_20250102_000000.json") == 1
+
+    # Once the file is rewritten it is parsed again
+    write_report(tmp_path, "test_results_20250102_000000.json", good_report("2025-01-02T00:00:00"), age_seconds=30)
+    reports = index.reports(str(tmp_path), "sanity")
+    assert [report["id"] for report in reports] == ["20250103_000000", "20250102_000000", "20250101_000000"]
+    assert parsed.count("test_results_20250102_000000.json") == 2
+
+
+def test_report_rewritten_in_place_is_picked_up(tmp_path, monkeypatch):
+    reports_dir = tmp_path / "sanity" / "reports"
+    reports_dir.mkdir(parents=True)
+    write_report(reports_dir, "test_results_20250101_000000.json", good_report("2025-01-01T00:00:00"))
+    monkeypatch.setattr(report_api, "TESTCASES_DIR", str(tmp_path))
+    monkeypatch.setattr(report_api, "report_index", report_api.ReportIndex())
+    monkeypatch.setattr(report_api, "report_rollups", report_api.ReportRollups())
+    report_api.on_reports_changed("sanity")
+    assert report_api.get_reports_for_type("sanity")[0]["summary"]["total"] == 1
+
+    # Rewritten without a rename: the directory mtime does not change
+    dir_mtime = os.stat(reports_dir).st_mtime_ns
+    path = reports_dir / "test_results_20250101_000000.json"
+    path.write_text(json.dumps({
+        "timestamp": "2025-01-01T00:00:00",
+        "summary": {"total": 5, "passed": 4, "failed": 1},
+        "results": []
+    }))
+    mtime = time.time() - 60
+    os.utime(path, (mtime, mtime))
+    assert os.stat(reports_dir).st_mtime_ns == dir_mtime
+
+    # The watcher reports the change
+    report_api.on_reports_changed("sanity")
+    assert report_api.get_reports_for_type("sanity")[0]["summary"]["total"] == 5
+    assert report_api.report_rollups.all_time(["sanity"])["total_tests"] == 5
+
+
+def test_stats_are_served_from_the_rollups(tmp_path, monkeypatch):
+    reports_dir = tmp_path / "sanity" / "reports"
+    reports_dir.mkdir(parents=True)
+    write_report(reports_dir, "test_results_20250101_000000.json", good_report("2025-01-01T00:00:00"))
+    monkeypatch.setattr(report_api, "TESTCASES_DIR", str(tmp_path))
+    monkeypatch.setattr(report_api, "report_index", report_api.ReportIndex())
+    monkeypatch.setattr(report_api, "report_rollups", report_api.ReportRollups())
+    report_api.sync_all_rollups()
+    stats = report_api.get_stats()
+    assert stats["by_type"] == {"sanity": {"total": 1, "passed": 1, "failed": 0}}
+    assert stats["overall_summary"]["pass_rate"] == "100.0%"
+
+    # Request handlers neither scan the directory nor read report files
+    def no_scan(*args, **kwargs):
+        raise AssertionError("report index used in a request handler")
+
+    write_report(reports_dir, "test_results_20250102_000000.json", json.dumps({
+        "timestamp": "2025-01-02T00:00:00",
+        "summary": {"total": 4, "passed": 1, "failed": 3},
+        "results": []
+    }))
+    with monkeypatch.context() as m:
+        m.setattr(report_api.report_index, "reports", no_scan)
+        assert report_api.get_stats()["overall_summary"]["total_tests"] == 1
+        assert len(report_api.get_test_history("sanity")["history"]) == 1
+        report_api.get_trends(days=30)
+
+    # The watcher brings the rollups up to date
+    report_api.on_reports_changed("sanity")
+    stats = report_api.get_stats()
+    assert stats["overall_summary"] == {"total_tests": 4, "passed": 1, "failed": 3, "pass_rate": "25.0%"}
+    assert stats["all_time"]["total_tests"] == 5
+    assert len(report_api.get_test_history("sanity")["history"]) == 2
@@ -0,0 +1,105 @@
+"""
+The live report feed picks up report files dropped into TESTCASES_DIR, with
+inotify and with the polling fallback
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import report_api
+from report_watcher import ReportWatcher
+
+EVENT_TIMEOUT_SECONDS = 5
+POLL_INTERVAL = 0.05
+
+
+def write_report(root, test_type: str, timestamp: datetime) -> str:
+    reports_dir = os.path.join(root, test_type, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+    name = f"test_results_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+    data = {
+        "timestamp": timestamp.isoformat(),
+        "summary": {"total": 1, "passed": 1, "failed": 0},
+        "results": [{"name": "test_ok", "status": "passed", "duration": 0.01}]
+    }
+    tmp_path = os.path.join(reports_dir, f".{name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.rename(tmp_path, os.path.join(reports_dir, name))
+    return name
+
+
+async def wait_for_latest(queue: asyncio.Queue, test_type: str, json_file: str):
+    """Wait for an event making json_file the latest report of test_type"""
+    # Startup events may still be in flight, so earlier events are skipped
+    while True:
+        event = await asyncio.wait_for(queue.get(), EVENT_TIMEOUT_SECONDS)
+        if event["test_type"] == test_type and event["latest"]["json_file"] == json_file:
+            return
+
+
+async def run_feed(root, use_inotify: bool, scenario):
+    feed = report_api.LiveReportFeed()
+    feed.bind(asyncio.get_running_loop())
+    watcher = ReportWatcher(root, report_api.TEST_TYPES, feed.refresh, POLL_INTERVAL, use_inotify)
+    queue = feed.subscribe()
+    watcher.start()
+    try:
+        # Wait for the startup pass over every type
+        while len(feed.latest) < len(report_api.TEST_TYPES):
+            await asyncio.sleep(0.01)
+        while not queue.empty():
+            queue.get_nowait()
+        await scenario(feed, queue)
+        return watcher.mode
+    finally:
+        watcher.stop()
+        feed.unsubscribe(queue)
+
+
+@pytest.fixture
+def testcases_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_api, "TESTCASES_DIR", str(tmp_path))
+    for test_type in report_api.TEST_TYPES:
+        write_report(tmp_path, test_type, datetime(2025, 1, 1))
+    return tmp_path
+
+
+@pytest.mark.parametrize("use_inotify", [True, False], ids=["inotify", "poll"])
+def test_drops_produce_events(testcases_dir, use_inotify):
+    async def scenario(feed, queue):
+        base = datetime(2030, 1, 1)
+        for i, test_type in enumerate(report_api.TEST_TYPES):
+            name = await asyncio.to_thread(write_report, testcases_dir, test_type, base + timedelta(seconds=i))
+            await wait_for_latest(queue, test_type, name)
+            assert feed.latest[test_type]["json_file"] == name
+
+    mode = asyncio.run(run_feed(testcases_dir, use_inotify, scenario))
+    if not use_inotify:
+        assert mode == "poll"
+
+
+@pytest.mark.parametrize("use_inotify", [True, False], ids=["inotify", "poll"])
+def test_removed_report_falls_back_to_previous(testcases_dir, use_inotify):
+    test_type = report_api.TEST_TYPES[0]
+
+    async def scenario(feed, queue):
+        name = await asyncio.to_thread(write_report, testcases_dir, test_type, datetime(2030, 1, 1))
+        await wait_for_latest(queue, test_type, name)
+        os.remove(os.path.join(testcases_dir, test_type, "reports", name))
+        await wait_for_latest(queue, test_type, "test_results_20250101_000000.json")
+        assert feed.latest[test_type]["json_file"] == "test_results_20250101_000000.json"
+
+    asyncio.run(run_feed(testcases_dir, use_inotify, scenario))
+
+
+def test_startup_pass_covers_every_type(testcases_dir):
+    async def scenario(feed, queue):
+        assert set(feed.latest) == set(report_api.TEST_TYPES)
+        assert all(latest["json_file"] == "test_results_20250101_000000.json" for latest in feed.latest.values())
+
+    asyncio.run(run_feed(testcases_dir, True, scenario))
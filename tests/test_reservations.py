@@ -0,0 +1,269 @@
+"""
+Stock reservations: committed reservations are released by id at most once,
+cancelling an order releases its reservation, and orders stored before a
+crash get their reservations committed at startup
+"""
+
+import asyncio
+import datetime
+import importlib
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from jwt_config import SECRET_KEY, ALGORITHM
+
+ProductStore = importlib.import_module("product-service.models").ProductStore
+product_main = importlib.import_module("product-service.main")
+order_main = importlib.import_module("order-service.main")
+
+
+def make_store() -> ProductStore:
+    return ProductStore([
+        {"id": 1, "name": "Laptop", "description": "", "price": 999.99, "stock": 10, "category": "Electronics",
+         "sku": "LAP-001"},
+        {"id": 2, "name": "Mouse", "description": "", "price": 29.99, "stock": 10, "category": "Electronics",
+         "sku": "MOU-001"}
+    ])
+
+
+def stock(store: ProductStore, product_id: int) -> int:
+    return store.get(product_id)["stock"]
+
+
+def test_committed_reservation_is_released_once():
+    store = make_store()
+    reservation = store.reserve({1: 3, 2: 1})
+    store.commit(reservation["id"])
+    # Committing again (a retried call) is a no-op
+    assert store.commit(reservation["id"])["status"] == "committed"
+    assert (stock(store, 1), stock(store, 2)) == (7, 9)
+
+    assert store.release(reservation["id"])["status"] == "released"
+    assert (stock(store, 1), stock(store, 2)) == (10, 10)
+    # A retried release gives nothing back
+    assert store.release(reservation["id"])["status"] == "released"
+    assert (stock(store, 1), stock(store, 2)) == (10, 10)
+
+    with pytest.raises(KeyError):
+        store.commit(reservation["id"])
+    with pytest.raises(KeyError):
+        store.release("unknown")
+
+
+def test_expiry_releases_only_open_reservations():
+    store = make_store()
+    committed = store.reserve({1: 2})
+    store.commit(committed["id"])
+    store.RESERVATION_TTL_SECONDS = -1
+    store.reserve({1: 3})
+    # Reserving expires the reservations that are past their time
+    store.reserve({2: 1})
+    assert stock(store, 1) == 8
+    assert [reservation["items"] for reservation in store.open_reservations()] == [{2: 1}]
+    assert store.get_reservation(committed["id"])["status"] == "committed"
+
+
+def test_reservations_past_their_retention_are_forgotten(tmp_path):
+    stores = []
+    for _ in range(2):
+        store = make_store()
+        store.share(str(tmp_path / "products.db"), sync=False)
+        stores.append(store)
+    store, other = stores
+    kept = store.reserve({1: 1})
+    store.commit(kept["id"])
+    old = store.reserve({1: 2})
+    store.commit(old["id"])
+    released = store.reserve({2: 1})
+    store.release(released["id"])
+    # Age the entries in both workers as if they were committed and released long ago
+    other.refresh()
+    for worker in stores:
+        worker._committed[old["id"]]["committed_at"] -= worker.COMMITTED_RETENTION_SECONDS + 10
+        worker._released[released["id"]] -= worker.RELEASED_RETENTION_SECONDS + 10
+        worker._committed.move_to_end(old["id"], last=False)
+    store._next_forget_at = 0
+
+    store.reserve({2: 1})
+    assert list(store._committed) == [kept["id"]]
+    assert not store._released
+    with pytest.raises(KeyError):
+        store.release(old["id"])
+    with pytest.raises(KeyError):
+        store.release(released["id"])
+    # The other worker applies the same cutoffs from the log
+    other.refresh()
+    assert list(other._committed) == [kept["id"]] and not other._released
+    assert stock(other, 1) == stock(store, 1) == 7
+    for store in stores:
+        store._shared.close()
+
+
+def make_token() -> str:
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    return jwt.encode(
+        {"user_id": 1, "username": "test", "role": "admin", "exp": expires}, SECRET_KEY, algorithm=ALGORITHM
+    )
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """The order service calling the product service in-process; both reset to their seed data"""
+    # Orders in memory only; the lifespan reads the setting when the app starts
+    monkeypatch.setattr(order_main, "ORDER_DATA_DIR", "")
+    inventory = order_main.inventory
+    open_client = inventory.open
+
+    def open_in_process():
+        # The client is reopened on every new event loop; each one goes to the product app
+        open_client()
+        inventory._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=product_main.app), base_url="http://product"
+        )
+
+    monkeypatch.setattr(inventory, "open", open_in_process)
+    headers = {"Authorization": f"Bearer {make_token()}"}
+    products = TestClient(product_main.app, headers=headers)
+    with TestClient(order_main.app, headers=headers) as orders:
+        products.post("/reset-db")
+        orders.post("/reset-db")
+        yield products, orders
+
+
+def product_stock(products: TestClient, product_id: int) -> int:
+    return products.get(f"/products/{product_id}").json()["stock"]
+
+
+def place_order(orders: TestClient, product_id: int, quantity: int) -> dict:
+    response = orders.post("/orders", json={
+        "user_id": 1, "shipping_address": "1 Main St",
+        "items": [{"product_id": product_id, "product_name": "x", "quantity": quantity, "price": 1.0}]
+    })
+    assert response.status_code == 201, response.json()
+    return response.json()
+
+
+def test_cancel_releases_the_reservation_once(services):
+    products, orders = services
+    before = product_stock(products, 1)
+    order = place_order(orders, 1, 2)
+    assert product_stock(products, 1) == before - 2
+
+    # The release went through but the cancel timed out and is retried
+    reservation_id = order_main.orders_db.get(order["id"]).reservation_id
+    products.post("/internal/reservations", json={"release": [reservation_id]})
+    assert orders.post(f"/orders/{order['id']}/cancel").status_code == 200
+    assert product_stock(products, 1) == before
+
+
+def test_orders_without_reservation_are_not_restocked(services):
+    products, orders = services
+    # Seed order 2 (pending) never reserved stock
+    before = product_stock(products, 4)
+    assert orders.post("/orders/2/cancel").status_code == 200
+    assert product_stock(products, 4) == before
+
+
+def test_shipped_order_cannot_be_cancelled_through_update(services):
+    products, orders = services
+    before = product_stock(products, 3)
+    response = orders.put("/orders/3", json={"status": "cancelled"})
+    assert response.status_code == 400
+    assert orders.get("/orders/3").json()["status"] == "shipped"
+    assert product_stock(products, 3) == before
+
+
+def test_startup_commits_reservations_of_stored_orders(services):
+    products, orders = services
+    before = product_stock(products, 1)
+    # The service stopped after storing the order but before committing its reservation
+    reserved = products.post("/internal/reservations", json={
+        "reserve": [{"items": [{"product_id": 1, "quantity": 2}]}]
+    }).json()["reserved"][0]
+    new_order = order_main.OrderCreate(user_id=1, shipping_address="1 Main St", items=[
+        {"product_id": 1, "product_name": "Laptop", "quantity": 2, "price": 999.99}
+    ])
+    order = order_main.orders_db.insert(
+        order_main.build_order(new_order, order_main.datetime.now(), reservation_id=reserved["reservation_id"])
+    )
+    # A reservation of an order that was never stored is left to expire
+    products.post("/internal/reservations", json={"reserve": [{"items": [{"product_id": 2, "quantity": 1}]}]})
+
+    asyncio.run(order_main.reconcile_reservations())
+    open_reservations = products.get("/internal/reservations").json()["reservations"]
+    assert len(open_reservations) == 1
+    assert open_reservations[0]["reservation_id"] != reserved["reservation_id"]
+    assert product_main.products_db.get_reservation(reserved["reservation_id"])["status"] == "committed"
+
+    assert orders.post(f"/orders/{order.id}/cancel").status_code == 200
+    assert product_stock(products, 1) == before
+
+
+def test_cancel_in_progress_elsewhere_is_refused(services):
+    products, orders = services
+    before = product_stock(products, 1)
+    order = place_order(orders, 1, 2)
+    # Another worker has claimed the cancel and is releasing the stock
+    order_main.orders_db.update(order["id"], status=order_main.CANCELLING_STATUS, updated_at=datetime.datetime.now())
+    assert orders.post(f"/orders/{order['id']}/cancel").status_code == 409
+    assert orders.put(f"/orders/{order['id']}", json={"status": "cancelled"}).status_code == 409
+    assert orders.put(f"/orders/{order['id']}", json={"shipping_address": "2 Main St"}).status_code == 409
+    assert product_stock(products, 1) == before - 2
+
+    # That worker stopped mid-cancel: once the claim is old enough it is taken over
+    abandoned = datetime.datetime.now() - datetime.timedelta(seconds=order_main.CANCEL_CLAIM_SECONDS + 1)
+    order_main.orders_db.update(order["id"], updated_at=abandoned)
+    assert orders.post(f"/orders/{order['id']}/cancel").status_code == 200
+    assert orders.get(f"/orders/{order['id']}").json()["status"] == "cancelled"
+    assert product_stock(products, 1) == before
+
+
+def test_unreachable_product_service_gives_the_claim_back(services, monkeypatch):
+    products, orders = services
+    order = place_order(orders, 1, 2)
+
+    async def unavailable(reservation_id):
+        raise order_main.InventoryUnavailable("down")
+
+    monkeypatch.setattr(order_main.inventory, "release", unavailable)
+    assert orders.post(f"/orders/{order['id']}/cancel").status_code == 503
+    stored = orders.get(f"/orders/{order['id']}").json()
+    assert (stored["status"], stored["updated_at"]) == ("pending", order["updated_at"])
+
+
+def test_failed_bulk_reservation_releases_the_rest_of_the_batch(services, monkeypatch):
+    products, orders = services
+    before = product_stock(products, 1)
+    reserve = order_main.inventory.reserve
+
+    async def failing_reserve(items):
+        if items[0]["quantity"] == 3:
+            raise RuntimeError("unexpected")
+        return await reserve(items)
+
+    monkeypatch.setattr(order_main.inventory, "reserve", failing_reserve)
+    batch = [
+        {"user_id": 1, "shipping_address": "1 Main St",
+         "items": [{"product_id": 1, "product_name": "x", "quantity": quantity, "price": 1.0}]}
+        for quantity in (1, 3, 2)
+    ]
+    with pytest.raises(RuntimeError):
+        orders.post("/orders/bulk", json={"orders": batch})
+    assert product_stock(products, 1) == before
+    assert products.get("/internal/reservations").json()["reservations"] == []
+
+
+def test_client_of_another_loop_is_closed_when_replaced(services):
+    inventory = order_main.inventory
+
+    async def call():
+        await inventory.open_reservations()
+        return inventory._client
+
+    first = asyncio.run(call())
+    second = asyncio.run(call())
+    assert first is not second
+    assert first.is_closed and not second.is_closed
@@ -0,0 +1,206 @@
+"""
+Stores of several worker processes sharing one change log: writes that
+depend on the current state are checked against every worker's writes
+"""
+
+import asyncio
+import copy
+import importlib
+import sqlite3
+import time
+
+import pytest
+
+product_models = importlib.import_module("product-service.models")
+ProductStore = product_models.ProductStore
+OrderStore = importlib.import_module("order-service.models").OrderStore
+
+
+def new_product(sku: str) -> dict:
+    return {"name": "Widget", "description": "", "price": 5.0, "stock": 1, "category": "Tools", "sku": sku}
+
+
+def new_order() -> dict:
+    return {
+        "user_id": 1,
+        "items": [{"product_id": 1, "product_name": "Laptop", "quantity": 1, "price": 999.99}],
+        "total_amount": 999.99,
+        "status": "pending",
+        "shipping_address": "1 Main St",
+        "created_at": "2025-01-01T10:00:00",
+        "updated_at": "2025-01-01T10:00:00"
+    }
+
+
+@pytest.fixture
+def product_workers(tmp_path):
+    """Two product stores sharing one log, like two uvicorn workers"""
+    path = str(tmp_path / "products.db")
+    workers = []
+    for _ in range(2):
+        store = ProductStore(copy.deepcopy(product_models.SEED_PRODUCTS))
+        store.share(path, sync=False)
+        workers.append(store)
+    yield workers
+    for store in workers:
+        store._shared.close()
+
+
+def test_duplicate_sku_is_rejected_across_workers(product_workers):
+    first, second = product_workers
+    created = first.insert(new_product("DUP"))
+    # The second worker has not seen the insert yet, but checks under the log's write lock
+    assert second.get_by_sku("DUP") is None
+    with pytest.raises(ValueError):
+        second.insert(new_product("DUP"))
+    with pytest.raises(ValueError):
+        second.update(1, sku="DUP")
+
+    second.delete(created["id"])
+    first.refresh()
+    assert first.get_by_sku("DUP") is None
+    assert second.insert(new_product("DUP"))["sku"] == "DUP"
+    first.refresh()
+    assert first.get_by_sku("DUP")["id"] == second.get_by_sku("DUP")["id"]
+
+
+def test_update_of_product_deleted_by_another_worker(product_workers):
+    first, second = product_workers
+    created = second.insert(new_product("GONE"))
+    first.refresh()
+    first.delete(created["id"])
+    # The second worker still holds the product until its write catches up
+    assert second.get(created["id"]) is not None
+    with pytest.raises(KeyError):
+        second.update(created["id"], price=9.0)
+    assert second.get(created["id"]) is None
+
+
+def test_shared_writes_leave_the_event_loop_free(tmp_path):
+    path = str(tmp_path / "orders.db")
+    store = OrderStore()
+    store.share(path, sync=False)
+    other = OrderStore()
+    other.share(path, sync=False)
+    # Another worker holds the write lock for a while
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, blocker.execute, "COMMIT")
+        started = time.perf_counter()
+        write = asyncio.create_task(store.ainsert(new_order()))
+        # The loop keeps serving: ticks, the data_version check and a refresh all go on meanwhile
+        ticks = 0
+        while not write.done():
+            tick = time.perf_counter()
+            store._shared.changed()
+            await other.arefresh()
+            await asyncio.sleep(0.01)
+            assert time.perf_counter() - tick < 0.2
+            ticks += 1
+        order = await write
+        return order, ticks, time.perf_counter() - started
+
+    order, ticks, elapsed = asyncio.run(scenario())
+    assert elapsed >= 0.3 and ticks >= 10
+    other.refresh()
+    assert other.get(order.id).to_dict() == order.to_dict()
+    blocker.close()
+    store.close()
+    other.close()
+
+
+def test_conditional_update_checks_every_workers_writes(tmp_path):
+    path = str(tmp_path / "orders.db")
+    first = OrderStore()
+    first.share(path, sync=False)
+    second = OrderStore()
+    second.share(path, sync=False)
+    order = first.insert(new_order())
+    second.refresh()
+
+    def pending(order):
+        return order.status == "pending"
+
+    # Two workers claim the same order; the second has not seen the first claim
+    assert first.update_if(order.id, pending, status="cancelling").status == "cancelling"
+    assert second.get(order.id).status == "pending"
+    assert second.update_if(order.id, pending, status="cancelling") is None
+    assert second.get(order.id).status == "cancelling"
+    assert second.update_if(order.id + 1, pending, status="cancelling") is None
+    first.close()
+    second.close()
+
+
+def log_records(path: str) -> int:
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT COUNT(*) FROM log").fetchone()[0]
+
+
+def test_checkpoints_bound_the_log_and_keep_workers_in_step(tmp_path):
+    path = str(tmp_path / "products.db")
+    writer = ProductStore(copy.deepcopy(product_models.SEED_PRODUCTS))
+    writer.share(path, sync=False, checkpoint_every=5)
+    # Catches up every few writes, so it sometimes lags by more than a checkpoint interval
+    reader = ProductStore(copy.deepcopy(product_models.SEED_PRODUCTS))
+    reader.share(path, sync=False, checkpoint_every=5)
+
+    for i in range(40):
+        product = writer.insert(new_product(f"SKU-{i}"))
+        reservation = writer.reserve({product["id"]: 1, 1: 1})
+        if i % 3:
+            writer.commit(reservation["id"])
+        if i % 3 == 2:
+            writer.release(reservation["id"])
+        if i % 4 == 0:
+            writer.update(product["id"], price=7.5)
+        if i % 7 == 0:
+            reader.refresh()
+        assert log_records(path) <= 2 * 5 + 4
+
+    reader.refresh()
+    assert reader._shared.stats()["checkpoints_restored"] > 0
+    assert writer._shared.stats()["checkpoints_written"] >= 40 * 2 // 5
+    # A worker starting now restores the checkpoint instead of replaying every record
+    newcomer = ProductStore(copy.deepcopy(product_models.SEED_PRODUCTS))
+    newcomer.share(path, sync=False, checkpoint_every=5)
+    assert newcomer._shared.stats()["checkpoints_restored"] == 1
+    assert newcomer._shared.stats()["records_applied"] < 2 * 5 + 4
+    for store in (reader, newcomer):
+        assert store._dump() == writer._dump()
+        assert store.version == writer.version and store.catalog_version == writer.catalog_version
+
+    # The restored reservations behave like the writer's
+    released = next(iter(writer._released))
+    assert newcomer.release(released)["status"] == "released"
+    committed = next(iter(writer._committed))
+    stock = newcomer.get(1)["stock"]
+    newcomer.release(committed)
+    assert newcomer.get(1)["stock"] == stock + 1
+    for store in (writer, reader, newcomer):
+        store._shared.close()
+
+
+def test_order_checkpoint_restores_rows_and_versions(tmp_path):
+    path = str(tmp_path / "orders.db")
+    writer = OrderStore()
+    writer.share(path, sync=False, checkpoint_every=3)
+    for i in range(10):
+        order = writer.insert({**new_order(), "user_id": i % 3})
+        if i % 2:
+            writer.update(order.id, status="shipped")
+        if i % 5 == 4:
+            writer.delete(order.id)
+
+    newcomer = OrderStore()
+    newcomer.share(path, sync=False, checkpoint_every=3)
+    assert newcomer._shared.stats()["checkpoints_restored"] == 1
+    assert newcomer._dump() == writer._dump()
+    for user_id in range(4):
+        assert newcomer.user_version(user_id) == writer.user_version(user_id)
+    # Ids of deleted orders are not handed out again
+    assert newcomer.insert(new_order()).id == writer._next_id
+    writer.close()
+    newcomer.close()
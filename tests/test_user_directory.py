@@ -0,0 +1,45 @@
+"""
+User directory: the id and username indexes always agree, also when a row
+re-uses an id or a username
+"""
+
+from login.models import UserDirectory
+
+
+def user(user_id: int, username: str) -> dict:
+    return {"id": user_id, "username": username, "password": "hash", "email": f"{username}@example.com",
+            "role": "user"}
+
+
+def assert_consistent(directory: UserDirectory):
+    for record in directory:
+        assert directory.get(record.id) is record
+        assert directory.get_by_username(record.username) is record
+    assert len({record.username for record in directory}) == len(directory)
+
+
+def test_username_reused_under_another_id_replaces_the_old_record():
+    directory = UserDirectory([user(1, "alice"), user(2, "bob")])
+    record = directory.add(user(3, "alice"))
+    assert directory.get_by_username("alice") is record
+    assert directory.get(1) is None
+    assert [r.id for r in directory] == [2, 3]
+    assert_consistent(directory)
+
+
+def test_id_reused_with_another_username_frees_the_old_username():
+    directory = UserDirectory([user(1, "alice"), user(2, "bob")])
+    directory.add(user(1, "carol"))
+    assert directory.get_by_username("alice") is None
+    assert directory.get(1).username == "carol"
+    assert_consistent(directory)
+
+
+def test_row_taking_both_an_id_and_a_username_replaces_both_records():
+    directory = UserDirectory([user(1, "alice"), user(2, "bob")])
+    # Id 1's username becomes bob, which belonged to id 2
+    record = directory.add(user(1, "bob"))
+    assert len(directory) == 1
+    assert directory.get(2) is None and directory.get_by_username("alice") is None
+    assert directory.get_by_username("bob") is record
+    assert_consistent(directory)
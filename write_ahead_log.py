@@ -0,0 +1,307 @@
+# Shared write-ahead log and snapshot files for the service stores
+# A data directory holds numbered log segments (wal-<n>.log) and snapshots
+# (snapshot-<n>.dat). Snapshot n contains the full table as of the start of
+# segment n, so recovery loads the newest snapshot and replays segments >= n.
+#
+# Both file types are sequences of frames: a 4-byte payload length, a 4-byte
+# CRC32 of the payload, then the payload (compact JSON). A crash can leave a
+# partial frame at the end of the last segment; readers stop at the first
+# incomplete or corrupt frame and the log is truncated there before new
+# records are appended.
+
+import asyncio
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from typing import Iterator, Optional
+
+_FRAME_HEADER = struct.Struct(">II")
+_SEGMENT_NAME = re.compile(r"^wal-(\d+)\.log$")
+_SNAPSHOT_NAME = re.compile(r"^snapshot-(\d+)\.dat$")
+
+
+class CorruptSnapshot(Exception):
+    """Raised when a snapshot file is incomplete or fails its checksum."""
+
+
+def encode_frame(record) -> bytes:
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+_NO_FRAME = object()
+
+
+def _read_frame(f):
+    """Next intact frame's record, or _NO_FRAME at end of file or a torn/corrupt frame"""
+    header = f.read(_FRAME_HEADER.size)
+    if len(header) < _FRAME_HEADER.size:
+        return _NO_FRAME
+    length, checksum = _FRAME_HEADER.unpack(header)
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) != checksum:
+        return _NO_FRAME
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return _NO_FRAME
+
+
+def read_frames(path: str) -> tuple[list, int]:
+    """
+    Decode every intact frame of a file.
+    Returns (records, valid_length): the byte offset just past the last
+    intact frame, where a torn or corrupt tail begins.
+    """
+    records = []
+    valid_length = 0
+    with open(path, "rb") as f:
+        while True:
+            record = _read_frame(f)
+            if record is _NO_FRAME:
+                return records, valid_length
+            records.append(record)
+            valid_length = f.tell()
+
+
+def segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"wal-{number:06d}.log")
+
+
+def snapshot_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"snapshot-{number:06d}.dat")
+
+
+def list_files(directory: str) -> tuple[list[int], list[int]]:
+    """Numbers of the log segments and snapshots in a directory, ascending"""
+    segments, snapshots = [], []
+    for name in os.listdir(directory):
+        match = _SEGMENT_NAME.match(name)
+        if match:
+            segments.append(int(match.group(1)))
+        match = _SNAPSHOT_NAME.match(name)
+        if match:
+            snapshots.append(int(match.group(1)))
+    return sorted(segments), sorted(snapshots)
+
+
+def write_snapshot(directory: str, number: int, header: dict, batches: Iterator[list]):
+    """Atomically write snapshot <number>: a header frame then one frame per batch of rows."""
+    path = snapshot_path(directory, number)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_frame(header))
+        for batch in batches:
+            f.write(encode_frame(batch))
+        f.write(encode_frame({"end": True}))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(directory)
+
+
+def read_snapshot(directory: str, number: int) -> tuple[dict, list]:
+    """Return (header, rows) of a snapshot."""
+    rows = []
+    with open(snapshot_path(directory, number), "rb") as f:
+        header = _read_frame(f)
+        while header is not _NO_FRAME:
+            batch = _read_frame(f)
+            if batch == {"end": True}:
+                return header, rows
+            if not isinstance(batch, list):
+                break
+            rows.extend(batch)
+    raise CorruptSnapshot(f"Snapshot {number} is incomplete")
+
+
+def fsync_directory(directory: str):
+    # Makes file creation, renames and deletes durable; not supported everywhere
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _Rotation:
+    """Marks the point in the queued frames where the log continues in a new segment file"""
+
+    __slots__ = ("file",)
+
+    def __init__(self, file):
+        self.file = file
+
+
+class WriteAheadLog:
+    """
+    Append-only log with group commit.
+
+    append() only queues an encoded frame and returns its sequence number;
+    a background thread writes everything queued so far with a single
+    write + fsync, so concurrent writers share one fsync. wait() blocks until
+    a sequence number is durable; wait_async() returns a future that the
+    flusher resolves on the caller's event loop instead.
+    """
+
+    def __init__(self, directory: str, segment: int, valid_length: Optional[int] = None, sync: bool = True):
+        self.directory = directory
+        self.segment = segment
+        self.sync = sync
+        self._file = self._open_segment(segment, valid_length)
+        self._cond = threading.Condition()
+        # Encoded frames, and _Rotation markers, waiting for the flusher
+        self._pending: list = []
+        self._appended = 0
+        self._durable = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        # (sequence, loop, future) of wait_async() callers
+        self._waiters: list[tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.records_written = 0
+        self.batches_written = 0
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, record) -> int:
+        frame = encode_frame(record)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-ahead log is closed")
+            self._pending.append(frame)
+            self._appended += 1
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, sequence: int):
+        """Block until the record with this sequence number has been fsynced."""
+        with self._cond:
+            while self._durable < sequence:
+                if self._error is not None:
+                    raise IOError("Write-ahead log flush failed") from self._error
+                self._cond.wait()
+
+    def wait_async(self, sequence: int) -> asyncio.Future:
+        """Future (of the running event loop) that completes once this sequence number is fsynced."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if self._durable >= sequence:
+                future.set_result(None)
+            elif self._error is not None:
+                future.set_exception(IOError("Write-ahead log flush failed"))
+            else:
+                self._waiters.append((sequence, loop, future))
+        return future
+
+    def rotate(self) -> tuple[int, int]:
+        """
+        Continue in a new segment: records appended from now on go to it,
+        while the flusher still writes the ones already queued to the old
+        segment, so this never waits for an fsync. The caller must stop
+        concurrent appends meanwhile (the store holds its write lock).
+        Returns the new segment number and the sequence number of the last
+        record in the old segment.
+        """
+        with self._cond:
+            self.segment += 1
+            self._pending.append(_Rotation(self._open_segment(self.segment, None)))
+            self._cond.notify_all()
+            return self.segment, self._appended
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def stats(self) -> dict:
+        return {
+            "segment": self.segment,
+            "records": self.records_written,
+            "fsyncs": self.batches_written,
+            "records_per_fsync": round(self.records_written / self.batches_written, 2) if self.batches_written else 0.0
+        }
+
+    def _open_segment(self, segment: int, valid_length: Optional[int]):
+        f = open(segment_path(self.directory, segment), "ab")
+        if valid_length is not None and f.tell() > valid_length:
+            # Drop a torn record left by a crash so new records follow intact ones
+            f.truncate(valid_length)
+            os.fsync(f.fileno())
+        return f
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                sequence = self._appended
+
+            records = 0
+            try:
+                frames = []
+                for item in batch:
+                    if isinstance(item, _Rotation):
+                        # Finish the old segment, then make the new file's directory entry durable
+                        self._write(frames)
+                        self._file.close()
+                        self._file = item.file
+                        fsync_directory(self.directory)
+                        frames = []
+                    else:
+                        frames.append(item)
+                        records += 1
+                self._write(frames)
+            except BaseException as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                    waiters, self._waiters = self._waiters, []
+                for _, loop, future in waiters:
+                    loop.call_soon_threadsafe(_fail, future)
+                return
+
+            with self._cond:
+                self._durable = sequence
+                self.records_written += records
+                self.batches_written += 1
+                self._cond.notify_all()
+                ready = [waiter for waiter in self._waiters if waiter[0] <= sequence]
+                if ready:
+                    self._waiters = [waiter for waiter in self._waiters if waiter[0] > sequence]
+            for _, loop, future in ready:
+                loop.call_soon_threadsafe(_resolve, future)
+
+
+    def _write(self, frames: list[bytes]):
+        """Write frames to the current segment (flusher thread only)"""
+        if not frames:
+            return
+        self._file.write(b"".join(frames))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+
+def _resolve(future: asyncio.Future):
+    # The waiting coroutine may have been cancelled in the meantime
+    if not future.done():
+        future.set_result(None)
+
+
+def _fail(future: asyncio.Future):
+    if not future.done():
+        future.set_exception(IOError("Write-ahead log flush failed"))